@@ -0,0 +1,108 @@
+from collections import OrderedDict
+from typing import *
+import threading
+
+class LRUCache:
+    """
+    Least recently used cache bounded by an estimate of its memory footprint.
+
+    `sizeof` estimates the size in bytes of a stored value. Values bigger than
+    the whole budget are handed back but never stored. max_bytes=None only
+    bounds the number of entries. Safe to share between worker threads.
+    """
+    def __init__(self, max_bytes: Optional[int], sizeof: Callable[[Any], int] = lambda value: 0,
+                 max_entries: Optional[int] = None):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.sizeof = sizeof
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+        self._entries: "OrderedDict[Hashable, tuple[Any, int]]" = OrderedDict()
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any):
+        size = self.sizeof(value)
+        with self._lock:
+            self.pop(key)
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+            self._entries[key] = (value, size)
+            self.nbytes += size
+            while (self.max_bytes is not None and self.nbytes > self.max_bytes) or (
+                self.max_entries is not None and len(self._entries) > self.max_entries
+            ):
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.nbytes -= evicted
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return default
+            self.nbytes -= entry[1]
+            return entry[0]
+
+    def get_or_create(self, key: Hashable, create: Callable[[], Any]) -> Any:
+        """
+        Returns the cached value for key, calling create() & storing its result
+        on a miss. create() runs without holding the lock.
+        """
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = create()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "nbytes": self.nbytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else None,
+        }
+
+# yt data objects keep per-object chunk & field_data state, so every worker
+# selecting or pixelizing from one dataset takes its lock
+_dataset_locks_lock = threading.Lock()
+
+def dataset_lock(ds) -> threading.RLock:
+    """
+    The lock serializing yt access to ds across workers, e.g. the render
+    workers of linked view panes. Compositing & colorizing run without it.
+
+    Kept on the dataset itself, since yt data objects only hold weak proxies
+    of it.
+    """
+    with _dataset_locks_lock:
+        lock = getattr(ds, "_access_lock", None)
+        if lock is None:
+            lock = threading.RLock()
+            ds._access_lock = lock
+        return lock
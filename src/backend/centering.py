@@ -0,0 +1,79 @@
+from typing import *
+
+from backend.caching import dataset_lock
+from backend.column_cache import column_cache, snapshot_source
+from backend.options import *
+
+import weakref
+import numpy as np
+
+SUBSAMPLE_STRIDE = 64
+
+# dataset -> {CenterMethodOption: center}
+_centers: "weakref.WeakKeyDictionary[Any, dict[CenterMethodOption, np.ndarray]]" = weakref.WeakKeyDictionary()
+
+def particle_center(ds, ptype: str = "star", weight: Optional[str] = None, stride: int = 1) -> Optional[np.ndarray]:
+    """
+    Mean particle position, in code units, streamed one IO chunk at a time.
+
+    Only running sums are kept between chunks, so peak memory is a single
+    chunk's positions rather than every particle at once. With a weight field
+    the mean is weighted by it, with stride > 1 only every stride-th particle
+    of each chunk is used. Returns None if there are no such particles.
+
+    With a column cache the columns are read whole, once, & memory-mapped
+    afterwards.
+    """
+    if (ptype, "particle_position_x") not in ds.derived_field_list:
+        return None
+    cache = column_cache()
+    if cache is not None and cache.cacheable((ptype, "particle_position_x")):
+        chunks = [snapshot_source(ds)]
+    else:
+        chunks = ds.all_data().chunks([], "io")
+    sums = np.zeros(3)
+    total = 0.0
+    for chunk in chunks:
+        positions = [
+            chunk[ptype, f"particle_position_{ax}"].to("code_length").d[::stride]
+            for ax in "xyz"
+        ]
+        if weight is None:
+            sums += [p.sum() for p in positions]
+            total += positions[0].size
+        else:
+            w = chunk[ptype, weight].d[::stride]
+            sums += [np.dot(p, w) for p in positions]
+            total += w.sum()
+    if total == 0:
+        return None
+    return sums / total
+
+def max_density_center(ds) -> np.ndarray:
+    _, center = ds.find_max(("gas", "density"))
+    return center.to("code_length").d
+
+def find_center(ds, method: CenterMethodOption) -> np.ndarray:
+    """
+    Default plot center for a dataset, cached per dataset & method.
+
+    Falls back on the domain center if there are no star particles. Reads
+    the dataset holding its lock, the view panes may be plotting it.
+    """
+    with dataset_lock(ds):
+        cached = _centers.setdefault(ds, dict())
+        center = cached.get(method)
+        if center is None:
+            match method:
+                case CenterMethodOption.STAR_MASS_WEIGHTED:
+                    center = particle_center(ds, weight="particle_mass")
+                case CenterMethodOption.MAX_DENSITY:
+                    center = max_density_center(ds)
+                case CenterMethodOption.STAR_SUBSAMPLED:
+                    center = particle_center(ds, stride=SUBSAMPLE_STRIDE)
+                case _:
+                    center = particle_center(ds)
+            if center is None:
+                center = ds.domain_center.to("code_length").d
+            cached[method] = center
+    return center
@@ -0,0 +1,266 @@
+from typing import *
+
+import hashlib
+import json
+import os
+import re
+import threading
+import weakref
+import numpy as np
+
+COLUMN_CACHE_DIR = os.environ.get(
+    "INTERACTIVE_YT_COLUMN_CACHE",
+    os.path.join(os.path.expanduser("~"), ".cache", "interactive-yt", "columns"),
+)
+
+COLUMN_CACHE_BYTES = 8 << 30
+
+CACHED_PARTICLE_TYPES = ("star", "io")
+
+MANIFEST = "manifest.json"
+
+def snapshot_files(ds) -> list[str]:
+    """
+    Files a snapshot is read from: every file of its output folder for
+    RAMSES, the parameter file otherwise.
+    """
+    root = getattr(ds, "root_folder", None)
+    if root is not None and os.path.isdir(root):
+        return sorted(entry.path for entry in os.scandir(root) if entry.is_file())
+    return [ds.parameter_filename]
+
+def snapshot_identity(ds) -> dict[str, Any]:
+    """
+    What cached columns are valid for: the snapshot's path, newest mtime &
+    total size, & the particle schema (EPF) it was loaded with.
+    """
+    stats = [os.stat(path) for path in snapshot_files(ds)]
+    return {
+        "path": os.path.abspath(ds.parameter_filename),
+        "mtime": max(stat.st_mtime for stat in stats),
+        "size": sum(stat.st_size for stat in stats),
+        "schema": repr(getattr(ds, "_extra_particle_fields", None)),
+    }
+
+class ColumnCache:
+    """
+    Particle columns of whole snapshots on disk, one .npy per field in a
+    folder per snapshot, listed with their units in the folder's manifest.
+    Cached columns are memory-mapped read-only, not copied.
+
+    A manifest whose snapshot identity no longer matches, because the
+    snapshot was rewritten or loaded with another EPF, empties its folder.
+    Loads touch the file, the least recently used columns are removed once
+    the cache holds more than max_bytes, & columns larger than that are
+    never stored. Files & manifests are written under
+    a temporary name & moved in place.
+    """
+    def __init__(self, directory: str = COLUMN_CACHE_DIR, max_bytes: int = COLUMN_CACHE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.RLock()
+        # checked once per loaded dataset, RAMSES outputs have many files to stat
+        self._manifests: "weakref.WeakKeyDictionary[Any, dict[str, Any]]" = weakref.WeakKeyDictionary()
+        os.makedirs(directory, exist_ok=True)
+        # the limit may have been lowered since the last session
+        self.evict()
+
+    @staticmethod
+    def cacheable(field: tuple[str, str]) -> bool:
+        return field[0] in CACHED_PARTICLE_TYPES
+
+    def folder(self, ds) -> str:
+        name = hashlib.sha1(os.path.abspath(ds.parameter_filename).encode()).hexdigest()
+        return os.path.join(self.directory, name)
+
+    def path(self, ds, field: tuple[str, str]) -> str:
+        return os.path.join(self.folder(ds), re.sub(r"[^\w.-]", "_", "-".join(field)) + ".npy")
+
+    def manifest(self, ds) -> dict[str, Any]:
+        """
+        The snapshot's manifest, a fresh one in an emptied folder if it is
+        missing or out of date.
+        """
+        manifest = self._manifests.get(ds)
+        if manifest is None:
+            manifest = self.read_manifest(ds)
+            self._manifests[ds] = manifest
+        return manifest
+
+    def read_manifest(self, ds) -> dict[str, Any]:
+        folder = self.folder(ds)
+        identity = snapshot_identity(ds)
+        try:
+            with open(os.path.join(folder, MANIFEST)) as f:
+                manifest = json.load(f)
+            if manifest.get("snapshot") == identity:
+                return manifest
+        except (OSError, ValueError):
+            pass
+        os.makedirs(folder, exist_ok=True)
+        for entry in os.scandir(folder):
+            if entry.name.endswith(".npy"):
+                os.remove(entry.path)
+        manifest = {"snapshot": identity, "columns": dict()}
+        self.write_manifest(ds, manifest)
+        return manifest
+
+    def write_manifest(self, ds, manifest: dict[str, Any]):
+        path = os.path.join(self.folder(ds), MANIFEST)
+        partial = f"{path}.{os.getpid()}.{threading.get_ident()}.part"
+        with open(partial, "w") as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(partial, path)
+
+    def get(self, ds, field: tuple[str, str]):
+        """
+        The cached column as a memory-mapped unyt array, None on a miss.
+        """
+        with self._lock:
+            units = self.manifest(ds)["columns"].get(repr(field))
+            column = None
+            if units is not None:
+                try:
+                    column = np.load(self.path(ds, field), mmap_mode="r")
+                    os.utime(self.path(ds, field))
+                except (OSError, ValueError):
+                    column = None
+            if column is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return ds.arr(column, units)
+
+    def put(self, ds, field: tuple[str, str], column):
+        """
+        Stores column & returns it memory-mapped from the cache, without
+        counting a lookup. Columns larger than max_bytes are not stored,
+        None is returned for them.
+        """
+        if column.nbytes > self.max_bytes:
+            return None
+        path = self.path(ds, field)
+        partial = f"{path}.{os.getpid()}.{threading.get_ident()}.part"
+        with self._lock:
+            manifest = self.manifest(ds)
+            with open(partial, "wb") as f:
+                np.save(f, np.asarray(column.d))
+            os.replace(partial, path)
+            manifest["columns"][repr(field)] = str(column.units)
+            self.write_manifest(ds, manifest)
+        self.evict(keep=path)
+        try:
+            return ds.arr(np.load(path, mmap_mode="r"), str(column.units))
+        except (OSError, ValueError):
+            return None
+
+    def entries(self) -> list[tuple[float, int, str]]:
+        """
+        (last use, size, path) of every cached column, oldest first.
+        """
+        entries = list()
+        with os.scandir(self.directory) as folders:
+            for folder in folders:
+                if not folder.is_dir():
+                    continue
+                for entry in os.scandir(folder.path):
+                    if entry.name.endswith(".npy"):
+                        try:
+                            stat = entry.stat()
+                        except OSError:
+                            continue
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return sorted(entries)
+
+    def evict(self, keep: Optional[str] = None):
+        """
+        Removes the least recently used columns but keep, the one just
+        written, until the cache fits in max_bytes.
+        """
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def stats(self) -> dict[str, Any]:
+        entries = self.entries()
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(entries),
+            "nbytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else None,
+        }
+
+class SnapshotColumns:
+    """
+    Stand-in for ds.all_data() when reading whole particle columns.
+    get_data() reads every cacheable column the cache lacks in one pass &
+    stores it, indexing returns cached columns memory-mapped. Each column is
+    looked up in the cache once, columns too large for it are kept in memory
+    until clear_data(). Other fields go through ds.all_data().
+    """
+    def __init__(self, cache: ColumnCache, ds):
+        self.cache = cache
+        self.ds = ds
+        self.dd = ds.all_data()
+        self.columns: dict[tuple[str, str], Any] = dict()
+
+    def get_data(self, fields: list[tuple[str, str]]):
+        missing = list()
+        for field in fields:
+            if self.cache.cacheable(field) and field not in self.columns:
+                column = self.cache.get(self.ds, field)
+                if column is None:
+                    missing.append(field)
+                else:
+                    self.columns[field] = column
+        if missing:
+            self.dd.get_data(missing)
+            for field in missing:
+                column = self.cache.put(self.ds, field, self.dd[field])
+                self.columns[field] = column if column is not None else self.dd[field]
+            self.dd.clear_data()
+
+    def __getitem__(self, field: tuple[str, str]):
+        if self.cache.cacheable(field):
+            if field not in self.columns:
+                self.get_data([field])
+            return self.columns[field]
+        return self.dd[field]
+
+    def clear_data(self):
+        self.columns.clear()
+        self.dd.clear_data()
+
+# yt reads particles from plot buffers & centering, which share no caller, so
+# the cache is process-wide & off unless set
+_column_cache: Optional[ColumnCache] = None
+
+def use_column_cache(cache: Optional[ColumnCache]):
+    global _column_cache
+    _column_cache = cache
+
+def column_cache() -> Optional[ColumnCache]:
+    return _column_cache
+
+def snapshot_source(ds):
+    """
+    Whole-snapshot data source for particle columns: SnapshotColumns with a
+    column cache, ds.all_data() without.
+    """
+    if _column_cache is None:
+        return ds.all_data()
+    return SnapshotColumns(_column_cache, ds)
@@ -0,0 +1,212 @@
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import *
+
+from backend.info_handling import *
+from backend.loading import load_dataset
+from backend.options import *
+from backend.plot_management import PlotMaker, PlotRequest, build_plot
+from backend.rendering import rgba_as
+from backend.workers import Job, Worker
+
+import json
+import os
+import traceback
+import matplotlib.image
+
+FRAME_NAME = "frame_{:05d}.png"
+MANIFEST_NAME = "export.json"
+
+# Snapshot size on disk to the memory needed to plot it, a rough guess.
+MEMORY_PER_DISK_BYTE = 2
+
+# Worker processes are replaced after this many frames, yt tends to hold on
+# to memory between datasets.
+FRAMES_PER_PROCESS = 8
+
+ExportSpec = dict[str, Any]
+
+def export_spec(request: PlotRequest, mode: RenderModeOption, fields: list[str],
+                epf: list[tuple[str, str]]) -> ExportSpec:
+    """
+    Picklable version of a plot request, with the dataset left out.
+
+    Data sources belong to one dataset & cannot be sent to other processes,
+    so they are dropped. Regions are kept & built again on every snapshot.
+    """
+    params = {key: value for key, value in request["params"].items() if key != "data_source"}
+    return {
+        "plot_type": request["plot_type"],
+        "args": request["args"][1:],
+        "params": params,
+        "region": request.get("region"),
+        "mode": mode,
+        "cell_fields": fields,
+        "epf": epf,
+    }
+
+def render_frame(spec: ExportSpec, path: str, out_path: str) -> str:
+    """
+    Runs in a worker process. Loads one snapshot, plots it & writes the frame.
+
+    Frames are written to a temporary name & moved in place, so a frame on
+    disk is always complete.
+    """
+    ds = load_dataset(path, spec["cell_fields"], spec["epf"])
+    plot = build_plot({
+        "plot_type": spec["plot_type"],
+        "args": (ds, *spec["args"]),
+        "params": spec["params"],
+        "region": spec.get("region"),
+    })
+    partial = out_path + ".part"
+    matplotlib.image.imsave(partial, rgba_as(plot, spec["mode"]), format="png")
+    os.replace(partial, out_path)
+    return out_path
+
+def snapshot_bytes(path: str) -> int:
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(path)
+        for name in names
+    )
+
+def physical_memory() -> Optional[int]:
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+def export_frames(spec: ExportSpec, paths: list[str], out_dir: str,
+                  workers: Optional[int] = None, memory_budget: Optional[int] = None,
+                  progress: Callable[[int, int, int], None] = lambda done, total, failed: None,
+                  cancelled: Callable[[], bool] = lambda: False) -> list[str]:
+    """
+    Renders spec on every snapshot in paths, one worker process per core.
+    Returns the frames on disk.
+
+    At most as many snapshots are in flight as fit in memory_budget (half of
+    physical memory by default), estimated from their size on disk. Frames
+    are written as they finish. A snapshot failing to render is counted as
+    failed & the export carries on, unless the pool itself broke, in which
+    case the frames not started yet are counted as failed too. Rerunning an
+    interrupted export with the same spec & snapshots skips the frames
+    already on disk, & retries failed or cancelled ones.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = {"spec": repr(spec), "paths": paths}
+    manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+    resume = False
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            resume = json.load(f) == manifest
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f)
+
+    frames = [os.path.join(out_dir, FRAME_NAME.format(i)) for i in range(len(paths))]
+    todo = [i for i in range(len(paths)) if not (resume and os.path.exists(frames[i]))]
+    written = set(range(len(paths))) - set(todo)
+    done = len(written)
+    failed: list[int] = list()
+    progress(done, len(paths), 0)
+    if not todo:
+        return frames
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if memory_budget is None:
+        memory = physical_memory()
+        memory_budget = memory // 2 if memory is not None else None
+    in_flight = workers
+    if memory_budget is not None:
+        per_frame = max(1, MEMORY_PER_DISK_BYTE * snapshot_bytes(paths[todo[0]]))
+        in_flight = max(1, min(workers, memory_budget // per_frame))
+
+    # max_tasks_per_child implies spawned processes, forking a process running
+    # Qt & worker threads is not safe anyway
+    with ProcessPoolExecutor(max_workers=in_flight, max_tasks_per_child=FRAMES_PER_PROCESS) as pool:
+        pending: dict[Any, int] = dict()
+        queue = iter(todo)
+        broken = False
+        while True:
+            while not (cancelled() or broken) and len(pending) < in_flight:
+                i = next(queue, None)
+                if i is None:
+                    break
+                pending[pool.submit(render_frame, spec, paths[i], frames[i])] = i
+            if not pending:
+                break
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                i = pending.pop(future)
+                try:
+                    future.result()
+                    written.add(i)
+                except BrokenProcessPool:
+                    traceback.print_exc()
+                    failed.append(i)
+                    broken = True
+                except Exception:
+                    traceback.print_exc()
+                    failed.append(i)
+                done += 1
+                progress(done, len(paths), len(failed))
+        if broken:
+            # never started, left for a resume
+            rest = list(queue)
+            failed.extend(rest)
+            done += len(rest)
+            progress(done, len(paths), len(failed))
+    return [frame for i, frame in enumerate(frames) if i in written]
+
+class SeriesExporter(Subscriber, Publisher):
+    """
+    Backend element exporting the current plot across a time series.
+
+    Subscribed to UserAction.EXPORT_SERIES, the output folder, &
+    UserAction.CANCEL_EXPORT. Snapshots come from Data.SERIES, or the current
+    dataset if no series is open. Progress is published as
+    Data.EXPORT_PROGRESS, a (frames done, frame count, frames failed) tuple,
+    failed frames count as done. Cancelling lets
+    the frames in flight finish & keeps them for a later resume. The plot is
+    plot_maker's, the active view pane's with several panes.
+    """
+    def __init__(self, broker: EventBroker, worker: Worker, plot_maker: PlotMaker):
+        super().__init__(broker)
+        self.worker = worker
+        self.plot_maker = plot_maker
+        self.subscribe([UserAction.EXPORT_SERIES, UserAction.CANCEL_EXPORT])
+
+    def handle_update(self, name: V3Option):
+        match name:
+            case UserAction.EXPORT_SERIES:
+                out_dir = self.query(name)
+                request = self.plot_maker.plot_request()
+                if out_dir is not None and request is not None:
+                    paths = self.query(Data.SERIES)
+                    if not paths:
+                        paths = [self.query(PlotOption.DATASET).parameter_filename]
+                    spec = export_spec(
+                        request,
+                        self.plot_maker.query(PlotOption.RENDER_MODE),
+                        self.query(PlotOption.CELL_FIELDS),
+                        self.query(PlotOption.EPF),
+                    )
+                    self.worker.submit(lambda job: self.export(job, spec, paths, out_dir))
+            case UserAction.CANCEL_EXPORT:
+                if self.query(name):
+                    self.worker.cancel()
+            case _:
+                pass
+
+    def export(self, job: Job, spec: ExportSpec, paths: list[str], out_dir: str):
+        """
+        Runs on the worker, the process pool does the actual rendering.
+        """
+        export_frames(
+            spec, paths, out_dir,
+            progress=lambda done, total, failed: job.deliver(self.publish, Data.EXPORT_PROGRESS, (done, total, failed)),
+            cancelled=job.stale,
+        )
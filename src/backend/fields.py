@@ -0,0 +1,39 @@
+from typing import *
+
+import weakref
+
+FieldKey = tuple[str, str]
+
+# dataset -> {field type: [(field type, field name), ...]}
+_field_groups: "weakref.WeakKeyDictionary[Any, dict[str, list[FieldKey]]]" = weakref.WeakKeyDictionary()
+
+def field_groups(ds) -> dict[str, list[FieldKey]]:
+    """
+    The dataset's derived fields grouped by field type, sorted by name within
+    each type.
+
+    Listing derived fields detects every field yt can build, which takes a
+    while on RAMSES outputs, so the result is kept for as long as the dataset
+    lives. The loaders call this on their worker so panels only hit the cache.
+    """
+    groups = _field_groups.get(ds)
+    if groups is None:
+        groups = dict()
+        for ftype, fname in sorted(ds.derived_field_list):
+            groups.setdefault(ftype, []).append((ftype, fname))
+        _field_groups[ds] = groups
+    return groups
+
+def requested_parameters(ds, fields: list, weight_field=None) -> set[str]:
+    """
+    Field parameters, such as "center" or "bulk_velocity", the values of
+    fields depend on.
+    """
+    if weight_field is not None:
+        fields = [*fields, weight_field]
+    params = set()
+    for field in ds.all_data()._determine_fields(fields):
+        dependencies = ds.field_dependencies.get(field)
+        if dependencies is not None:
+            params.update(dependencies.requested_parameters)
+    return params
@@ -0,0 +1,93 @@
+from typing import *
+
+import math
+import numpy as np
+
+HISTORY_BYTES = 128 << 20
+
+HISTORY_LENGTH = 64
+
+THUMBNAIL_SIZE = 96
+
+View = dict[str, Any]
+
+# describe the image shown for a view rather than the view itself
+LAYOUT_KEYS = ("grid", "extent")
+
+def same_view(a: View, b: View) -> bool:
+    """
+    Whether two views only differ in the layout of their images, like a
+    progressive preview's & the annotated figure that follows it.
+    """
+    strip = lambda view: {k: v for k, v in view.items() if k not in LAYOUT_KEYS}
+    return strip(a) == strip(b)
+
+def thumbnail(image: np.ndarray, size: int = THUMBNAIL_SIZE) -> np.ndarray:
+    """
+    Strided copy of an RGBA image, no side longer than size.
+    """
+    step = max(1, math.ceil(max(image.shape[:2]) / size))
+    return np.ascontiguousarray(image[::step, ::step])
+
+class HistoryEntry:
+    __slots__ = ("view", "thumbnail", "image")
+
+    def __init__(self, view: View, image: np.ndarray):
+        self.view = view
+        self.thumbnail = thumbnail(image)
+        self.image: Optional[np.ndarray] = image
+
+    @property
+    def nbytes(self) -> int:
+        return self.thumbnail.nbytes + (self.image.nbytes if self.image is not None else 0)
+
+class PlotHistory:
+    """
+    Recently shown images, oldest first, with the view (Data.VIEW) each one
+    was rendered for.
+
+    Every entry keeps a thumbnail. Full images are dropped oldest first once
+    the history holds more than max_bytes, and entries beyond max_entries are
+    dropped entirely.
+    """
+    def __init__(self, max_bytes: int = HISTORY_BYTES, max_entries: int = HISTORY_LENGTH):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.entries: list[HistoryEntry] = list()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __getitem__(self, index: int) -> HistoryEntry:
+        return self.entries[index]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(entry.nbytes for entry in self.entries)
+
+    def add(self, view: View, image: np.ndarray) -> bool:
+        """
+        Records an image. A new image of the newest entry's view, e.g. the
+        full image after a progressive preview, replaces it.
+
+        Returns whether a new entry was appended.
+        """
+        last = self.entries[-1] if self.entries else None
+        if last is not None and same_view(last.view, view):
+            self.entries[-1] = HistoryEntry(view, image)
+            appended = False
+        else:
+            self.entries.append(HistoryEntry(view, image))
+            appended = True
+        del self.entries[:-self.max_entries]
+        self.evict()
+        return appended
+
+    def evict(self):
+        total = self.nbytes
+        for entry in self.entries:
+            if total <= self.max_bytes:
+                break
+            if entry.image is not None:
+                total -= entry.image.nbytes
+                entry.image = None
@@ -1,47 +1,167 @@
 from typing import *
+from backend.instrumentation import Instrumentation
 from backend.options import *
 
+class Topic:
+    """
+    Broker entry for one option: current data, the default queries fall back
+    to, whether queries consume the data (UserAction), & its subscribers.
+
+    Mutated in place. Subscribers are kept in subscription order in a list,
+    which notify() can safely iterate while handlers subscribe, plus a set
+    for membership checks.
+    """
+    __slots__ = ("data", "default", "consume", "declared", "subs", "sub_set")
+
+    def __init__(self):
+        self.data: Any = None
+        self.default: Any = None
+        self.consume = False
+        # set once a publisher registered the option's default
+        self.declared = False
+        self.subs: list["Subscriber"] = list()
+        self.sub_set: set["Subscriber"] = set()
+
 class EventBroker:
     """
     Handles incoming/outgoing requests for information.
     """
     
-    def __init__(self):
-        self.entries: dict[str, tuple[Any, Any, bool, list["Subscriber"]]] = dict()
+    def __init__(self, label: Optional[str] = None):
+        self.entries: dict[V3Option, Topic] = dict()
+        self.instrumentation: Optional[Instrumentation] = None
+        # tells the handlers of its subscribers apart in instrumentation
+        self.label = label
+
+    def instrument(self, instrumentation: Optional[Instrumentation] = None) -> Instrumentation:
+        """
+        Starts recording publish counts, handler latencies & publish chains,
+        into an existing Instrumentation if given.
+
+        Replaces publish/notify on this broker only, so brokers that are not
+        instrumented pay nothing.
+        """
+        if self.instrumentation is None:
+            if instrumentation is None:
+                instrumentation = Instrumentation()
+            def publish(name: V3Option, data: Any):
+                if data is not None:
+                    entry = self.topic(name)
+                    entry.data = data
+                    instrumentation.notify(entry, name)
+            def notify(name: V3Option):
+                entry = self.entries.get(name)
+                if entry is not None:
+                    instrumentation.notify(entry, name)
+            self.publish = publish
+            self.notify = notify
+            self.bind = instrumentation.bind
+            self.instrumentation = instrumentation
+        return self.instrumentation
+
+    def bind(self, callback: Callable[..., Any]) -> Callable[..., Any]:
+        """
+        Wraps a callback that will run later, e.g. a worker result, so its
+        publishes count as part of the current publish chain. Returns callback
+        unchanged unless instrumented.
+        """
+        return callback
+
+    def topic(self, name: V3Option) -> Topic:
+        entry = self.entries.get(name)
+        if entry is None:
+            entry = Topic()
+            self.entries[name] = entry
+        return entry
 
-    def publish(self, name: str, data: Any):
+    def publish(self, name: V3Option, data: Any):
         if data is not None:
-            _, default, consume, subs = self.entries.get(name, (None, None, False, []))
-            self.entries[name] = (data, default, consume, subs)
-            self.notify(name)
-
-    def reset(self, name: str):
-        pass
+            entry = self.entries.get(name)
+            if entry is None:
+                entry = self.topic(name)
+            entry.data = data
+            for sub in entry.subs:
+                sub.notify(name)
+
+    def reset(self, name: V3Option):
+        entry = self.entries.get(name)
+        if entry is not None:
+            entry.data = entry.default
 
     def subscribe(self, s: "Subscriber", to: list[V3Option]):
         for name in to:
-            data, reset, consume, subs = self.entries.get(name, (None, None, False, []))
-            if s not in subs:
-                subs += [s]
-            self.entries[name] = (data, reset, consume, subs)
+            entry = self.topic(name)
+            if s not in entry.sub_set:
+                entry.sub_set.add(s)
+                entry.subs.append(s)
 
     def notify(self, name: V3Option):
-        _, _, _, subs = self.entries.get(name, (None, None, []))
-        for sub in subs:
-            sub.notify(name)
+        entry = self.entries.get(name)
+        if entry is not None:
+            for sub in entry.subs:
+                sub.notify(name)
 
     def query(self, name: V3Option) -> Any:
-        data, default, consume, subs = self.entries.get(name, (None, None, False, []))
-        if consume:
-            self.entries[name] = (default, default, consume, subs)
-        if data is None and default is not None:
-            return default
+        entry = self.entries.get(name)
+        if entry is None:
+            return None
+        data = entry.data
+        if entry.consume:
+            entry.data = entry.default
+        if data is None:
+            return entry.default
         return data
 
     def add_field(self, name: V3Option, data: Any, default: Any, consume: bool):
-        if name not in self.entries.keys():
-            _, _, _, subs = self.entries.get(name, (None, None, False, []))
-            self.entries[name] = (data, default, consume, subs)
+        """
+        First declaration wins. Topics subscribed to before being declared
+        still pick up their default & consume flag here.
+        """
+        entry = self.topic(name)
+        if not entry.declared:
+            entry.declared = True
+            entry.default = default
+            entry.consume = consume
+            if entry.data is None:
+                entry.data = data
+
+# dataset-wide topics, every view pane sees the same ones
+PANE_SHARED = [
+    PlotOption.DATASET,
+    PlotOption.CENTER_METHOD,
+    PlotOption.CELL_FIELDS,
+    PlotOption.EPF,
+    Data.LOAD_PROGRESS,
+    Data.SERIES,
+    Data.SERIES_POSITION,
+    Data.PREFETCHED,
+    Data.EXPORT_PROGRESS,
+    Data.DATASET_CENTER,
+    UserAction.LOAD_DATASET,
+    UserAction.CANCEL_LOAD,
+    UserAction.LOAD_SERIES,
+    UserAction.STEP_SERIES,
+    UserAction.EXPORT_SERIES,
+    UserAction.CANCEL_EXPORT,
+]
+
+class PaneBroker(EventBroker):
+    """
+    Broker of an additional view pane.
+
+    The shared topics are the parent's own Topic entries, so the dataset,
+    loading & series state is published, queried & subscribed to in one
+    place. Every other topic is the pane's own plot state. Instrumented along
+    with the parent, its handlers labelled with label.
+    """
+    def __init__(self, parent: EventBroker, shared: list[V3Option] = PANE_SHARED,
+                 label: Optional[str] = None):
+        super().__init__(label)
+        self.parent = parent
+        for name in shared:
+            self.entries[name] = parent.topic(name)
+        if parent.instrumentation is not None:
+            self.instrument(parent.instrumentation)
 
 class AuthorUser:
     """
@@ -0,0 +1,129 @@
+from typing import *
+
+from backend.options import *
+
+from collections import Counter, defaultdict
+from enum import Enum
+import json
+import time
+
+# Handler times are bucketed by powers of two microseconds, bucket i holds
+# times below 2**i us.
+HISTOGRAM_BUCKETS = 24
+
+def topic_name(name: V3Option) -> str:
+    if isinstance(name, Enum):
+        return f"{type(name).__name__}.{name.name}"
+    return str(name)
+
+def handler_name(sub) -> str:
+    """
+    The subscriber's class, followed by its broker's label if it has one, so
+    the handlers of every view pane are told apart.
+    """
+    label = getattr(getattr(sub, "broker", None), "label", None)
+    if label:
+        return f"{type(sub).__name__} [{label}]"
+    return type(sub).__name__
+
+class HandlerStats:
+    """
+    Wall time of one subscriber class, per view pane, handling one topic.
+    Times include any publishes the handler makes itself.
+    """
+    __slots__ = ("count", "total_ns", "max_ns", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.buckets = [0] * HISTOGRAM_BUCKETS
+
+    def add(self, ns: int):
+        self.count += 1
+        self.total_ns += ns
+        self.max_ns = max(self.max_ns, ns)
+        self.buckets[min((ns // 1000).bit_length(), HISTOGRAM_BUCKETS - 1)] += 1
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "total_ms": self.total_ns / 1e6,
+            "mean_ms": self.total_ns / self.count / 1e6 if self.count else None,
+            "max_ms": self.max_ns / 1e6,
+            "histogram_us": {
+                f"<{1 << i}": n for i, n in enumerate(self.buckets) if n
+            },
+        }
+
+class Instrumentation:
+    """
+    Publish counts, handler latencies & publish chains of one EventBroker.
+
+    Installed with EventBroker.instrument(), which swaps in the measuring
+    publish/notify; an uninstrumented broker runs no extra code. A chain is
+    the sequence of topics being published when a publish happens, e.g.
+    CREATE_PLOT -> Data.PLOT -> Data.IMAGE. Results delivered from workers
+    continue the chain of the publish that submitted them (see
+    EventBroker.bind).
+
+    Only touched from the thread owning the broker.
+    """
+    def __init__(self):
+        self.publishes: Counter = Counter()
+        self.handlers: dict[tuple[str, str], HandlerStats] = defaultdict(HandlerStats)
+        self.chains: Counter = Counter()
+        self.stack: list[str] = list()
+        self.started = time.time()
+
+    def notify(self, entry, name: V3Option):
+        topic = topic_name(name)
+        self.publishes[topic] += 1
+        if self.stack:
+            self.chains[(*self.stack, topic)] += 1
+        self.stack.append(topic)
+        try:
+            for sub in entry.subs:
+                start = time.perf_counter_ns()
+                sub.notify(name)
+                self.handlers[(handler_name(sub), topic)].add(time.perf_counter_ns() - start)
+        finally:
+            self.stack.pop()
+
+    def bind(self, callback: Callable[..., Any]) -> Callable[..., Any]:
+        """
+        Wraps callback so publishes it makes continue the current chain.
+        """
+        chain = list(self.stack)
+        def bound(*args, **kwargs):
+            stack = self.stack
+            self.stack = list(chain)
+            try:
+                return callback(*args, **kwargs)
+            finally:
+                self.stack = stack
+        return bound
+
+    def clear(self):
+        self.publishes.clear()
+        self.handlers.clear()
+        self.chains.clear()
+        self.started = time.time()
+
+    def as_dict(self) -> dict[str, Any]:
+        handlers: dict[str, dict[str, Any]] = defaultdict(dict)
+        for (sub, topic), stats in sorted(self.handlers.items(), key=lambda item: -item[1].total_ns):
+            handlers[sub][topic] = stats.as_dict()
+        return {
+            "seconds": time.time() - self.started,
+            "publishes": dict(self.publishes.most_common()),
+            "handlers": dict(handlers),
+            "chains": [
+                {"chain": list(chain), "count": count}
+                for chain, count in self.chains.most_common()
+            ],
+        }
+
+    def dump(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.as_dict(), f, indent=2)
@@ -0,0 +1,300 @@
+from typing import *
+
+from backend.caching import LRUCache
+from backend.centering import find_center
+from backend.fields import field_groups
+from backend.info_handling import *
+from backend.options import *
+from backend.workers import Job, Worker
+
+import os
+import yt
+import numpy as np
+
+LOAD_STAGES = ["header parsed", "index built", "fields listed", "center computed"]
+
+# stages done of a load that raised
+LOAD_FAILED = -1
+
+SERIES_PATTERN = "output_?????"
+
+DATASET_REGISTRY_BYTES = 4 << 30
+
+# rough footprint of one oct in an octree index
+OCT_BYTES = 64
+
+def load_dataset(path: str, fields: Optional[list[str]], epf: Optional[list[tuple[str, str]]]):
+    """
+    yt.load with the RAMSES field configuration, left out when not set or
+    empty, e.g. for other codes.
+    """
+    params = {"fields": fields, "extra_particle_fields": epf}
+    existing_params = {key: value for key, value in params.items() if value}
+    return yt.load(path, **existing_params)
+
+def dataset_size(ds) -> int:
+    """
+    Estimate of the memory held by a dataset's index: every numpy array the
+    index holds directly, plus its octs for octree codes such as RAMSES.
+    """
+    index = ds.index
+    size = sum(value.nbytes for value in vars(index).values() if isinstance(value, np.ndarray))
+    for domain in getattr(index, "domains", []):
+        oct_handler = getattr(domain, "oct_handler", None)
+        if oct_handler is not None:
+            size += oct_handler.nocts * OCT_BYTES
+    return size
+
+class DatasetRegistry:
+    """
+    Keeps recently opened datasets, and their built indexes, alive.
+
+    Keyed by path & field configuration, since yt builds different field info
+    for different CELL_FIELDS/EPF. Evicts least recently used datasets once
+    their estimated size exceeds max_bytes.
+    """
+    def __init__(self, max_bytes: int = DATASET_REGISTRY_BYTES, max_entries: Optional[int] = None):
+        self.cache = LRUCache(max_bytes, dataset_size, max_entries)
+
+    @staticmethod
+    def key(path: str, fields: Optional[list[str]], epf: Optional[list[tuple[str, str]]]) -> Hashable:
+        return os.path.abspath(path), repr(fields), repr(epf)
+
+    def get(self, key: Hashable) -> Any:
+        return self.cache.get(key)
+
+    def add(self, key: Hashable, ds):
+        self.cache.put(key, ds)
+
+    def open(self, path: str, fields: list[str], epf: list[tuple[str, str]]):
+        """
+        Registered dataset for path, loading it, building its index & listing
+        its fields if needed.
+        """
+        key = self.key(path, fields, epf)
+        ds = self.get(key)
+        if ds is None:
+            ds = load_dataset(path, fields, epf)
+            ds.index
+            field_groups(ds)
+            self.add(key, ds)
+        return ds
+
+    def stats(self) -> dict[str, Any]:
+        return self.cache.stats()
+
+class DatasetLoader(Subscriber, Publisher):
+    """
+    Backend element responsible for opening datasets.
+
+    Subscribed to UserAction.LOAD_DATASET & UserAction.CANCEL_LOAD, and to
+    PlotOption.CENTER_METHOD to recompute the center of the open dataset. Loading runs
+    on its own worker; progress is published as Data.LOAD_PROGRESS, a
+    (stages done, stage count, description) tuple. Data.DATASET_CENTER, the
+    center every view pane starts from, & PlotOption.DATASET are only
+    published once every stage is done. A load
+    that raises publishes LOAD_FAILED stages done, with the error. Loads,
+    centering & series steps are separate kinds of jobs on the worker, so one
+    doesn't make another stale.
+
+    Cancelling cannot interrupt yt mid-stage, the load stops at the next stage
+    boundary & its result is discarded. Datasets found in the registry skip
+    straight past the header, index & field stages.
+    """
+    def __init__(self, broker: EventBroker, worker: Worker, registry: Optional[DatasetRegistry] = None):
+        super().__init__(broker)
+        self.worker = worker
+        self.registry = registry if registry is not None else DatasetRegistry()
+        self.subscribe([UserAction.LOAD_DATASET, UserAction.CANCEL_LOAD, PlotOption.CENTER_METHOD])
+
+        self.add_field(Data.LOAD_PROGRESS)
+        self.add_field(Data.DATASET_CENTER)
+
+    def handle_update(self, name: V3Option):
+        match name:
+            case UserAction.LOAD_DATASET:
+                path = self.query(name)
+                if path is not None:
+                    fields = self.query(PlotOption.CELL_FIELDS)
+                    epf = self.query(PlotOption.EPF)
+                    method = self.query(PlotOption.CENTER_METHOD)
+                    self.publish(Data.LOAD_PROGRESS, (0, len(LOAD_STAGES), f"loading {path}"))
+                    self.worker.submit(
+                        lambda job: self.load(job, path, fields, epf, method),
+                        self.load_done,
+                        kind="load",
+                        on_error=lambda error: self.load_failed(path, error),
+                    )
+            case UserAction.CANCEL_LOAD:
+                if self.query(name):
+                    self.worker.cancel()
+            case PlotOption.CENTER_METHOD:
+                ds = self.query(PlotOption.DATASET)
+                method = self.query(name)
+                if ds is not None:
+                    self.worker.submit(
+                        lambda job: find_center(ds, method),
+                        lambda center: self.publish(Data.DATASET_CENTER, center),
+                        kind="center",
+                    )
+            case _:
+                pass
+
+    def progress(self, job: Job, stage: int):
+        if not job.stale():
+            job.deliver(self.publish, Data.LOAD_PROGRESS, (stage + 1, len(LOAD_STAGES), LOAD_STAGES[stage]))
+
+    def load(self, job: Job, path: str, fields: list[str], epf: list[tuple[str, str]],
+             method: CenterMethodOption):
+        """
+        Runs on the worker, checking for cancellation between stages.
+        """
+        if job.stale():
+            return None
+        key = self.registry.key(path, fields, epf)
+        ds = self.registry.get(key)
+        if ds is None:
+            ds = load_dataset(path, fields, epf)
+            self.progress(job, 0)
+
+            if job.stale():
+                return None
+            ds.index
+            self.registry.add(key, ds)
+        self.progress(job, 1)
+
+        if job.stale():
+            return None
+        field_groups(ds)
+        self.progress(job, 2)
+
+        if job.stale():
+            return None
+        center = find_center(ds, method)
+        self.progress(job, 3)
+
+        return job, ds, center
+
+    def load_done(self, result: tuple[Job, Any, np.ndarray]):
+        job, ds, center = result
+        # cancelled while the result was on its way
+        if job.stale():
+            return
+        self.publish(Data.DATASET_CENTER, center)
+        self.publish(PlotOption.DATASET, ds)
+
+    def load_failed(self, path: str, error: Exception):
+        self.publish(Data.LOAD_PROGRESS, (LOAD_FAILED, len(LOAD_STAGES), f"could not load {path}: {error}"))
+
+class TimeSeriesLoader(Subscriber, Publisher):
+    """
+    Backend element stepping through a folder of outputs.
+
+    Subscribed to UserAction.LOAD_SERIES, a folder matched against
+    SERIES_PATTERN as a yt.DatasetSeries, & UserAction.STEP_SERIES, a relative
+    step. Stepping only swaps PlotOption.DATASET, every other option is kept,
+    and re-creates the current plot if there is one, in every followed view
+    pane.
+
+    The outputs on either side of the current one are loaded into the registry
+    on the prefetch worker & announced as Data.PREFETCHED, which PlotMaker
+    pre-renders with the current options.
+    """
+    def __init__(self, broker: EventBroker, worker: Worker, prefetch_worker: Worker,
+                 registry: DatasetRegistry):
+        super().__init__(broker)
+        self.worker = worker
+        self.prefetch_worker = prefetch_worker
+        self.registry = registry
+        self.outputs: list[str] = list()
+        self.index = 0
+        self.prefetch_generation = 0
+        self.panes: list[EventBroker] = [broker]
+        self.subscribe([UserAction.LOAD_SERIES, UserAction.STEP_SERIES, Data.PLOT])
+
+    def follow(self, broker: EventBroker):
+        """
+        Also re-creates the plot of another view pane when stepping.
+        """
+        self.panes.append(broker)
+        broker.subscribe(self, [Data.PLOT])
+
+    def handle_update(self, name: V3Option):
+        match name:
+            case UserAction.LOAD_SERIES:
+                path = self.query(name)
+                if path is not None:
+                    self.worker.submit(
+                        lambda job: yt.DatasetSeries(os.path.join(path, SERIES_PATTERN)).outputs,
+                        self.series_loaded,
+                        kind="series",
+                    )
+            case UserAction.STEP_SERIES:
+                step = self.query(name)
+                if step and self.outputs:
+                    self.step_to(self.index + step, False)
+            case Data.PLOT:
+                # neighbours are pre-rendered with the options of the latest plot
+                if self.outputs:
+                    self.prefetch()
+            case _:
+                pass
+
+    def series_loaded(self, outputs: list[str]):
+        self.outputs = outputs
+        self.publish(Data.SERIES, outputs)
+        if outputs:
+            self.step_to(0, True)
+
+    def step_to(self, index: int, recenter: bool):
+        self.index = min(max(index, 0), len(self.outputs) - 1)
+        path = self.outputs[self.index]
+        fields = self.query(PlotOption.CELL_FIELDS)
+        epf = self.query(PlotOption.EPF)
+        method = self.query(PlotOption.CENTER_METHOD)
+        position = (self.index, len(self.outputs))
+        self.publish(Data.SERIES_POSITION, position)
+        self.worker.submit(
+            lambda job: self.open(job, path, fields, epf, method if recenter else None),
+            lambda result: self.opened(position, *result),
+            kind="series",
+        )
+
+    def open(self, job: Job, path: str, fields: list[str], epf: list[tuple[str, str]],
+             method: Optional[CenterMethodOption]):
+        # skipped if the user already stepped further
+        if job.stale():
+            return None
+        ds = self.registry.open(path, fields, epf)
+        center = find_center(ds, method) if method is not None else None
+        return ds, center
+
+    def opened(self, position: tuple[int, int], ds, center: Optional[np.ndarray]):
+        if position != (self.index, len(self.outputs)):
+            return
+        if center is not None:
+            self.publish(Data.DATASET_CENTER, center)
+        self.publish(PlotOption.DATASET, ds)
+        plotted = [pane for pane in self.panes if pane.query(Data.PLOT) is not None]
+        for pane in plotted:
+            pane.publish(UserAction.CREATE_PLOT, True)
+        if not plotted:
+            self.prefetch()
+
+    def prefetch(self):
+        fields = self.query(PlotOption.CELL_FIELDS)
+        epf = self.query(PlotOption.EPF)
+        self.prefetch_generation += 1
+        generation = self.prefetch_generation
+        for index in (self.index + 1, self.index - 1):
+            if 0 <= index < len(self.outputs):
+                path = self.outputs[index]
+                self.prefetch_worker.submit(
+                    lambda job, path=path: self.prefetch_one(generation, path, fields, epf),
+                    lambda ds: self.publish(Data.PREFETCHED, ds),
+                )
+
+    def prefetch_one(self, generation: int, path: str, fields: list[str], epf: list[tuple[str, str]]):
+        if generation != self.prefetch_generation:
+            return None
+        return self.registry.open(path, fields, epf)
@@ -0,0 +1,225 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import *
+
+from backend.caching import LRUCache
+from backend.loading import load_dataset
+from backend.regions import Region, region_source
+
+import multiprocessing
+import os
+import numpy as np
+import yt
+from yt.data_objects.image_array import ImageArray
+from yt.visualization.fixed_resolution import OffAxisProjectionFixedResolutionBuffer
+from yt.visualization.volume_rendering.off_axis_projection import off_axis_projection
+
+# slabs per worker process, more than one so uneven slabs even out
+SLABS_PER_WORKER = 2
+
+# datasets each worker process keeps loaded between projections
+WORKER_DATASETS = 2
+
+# root grid cells below which projecting serially beats starting & feeding
+# worker processes
+OFF_AXIS_MIN_CELLS = 128 ** 3
+
+# Everything a worker process needs to project one slab, in code units & plain
+# values: the dataset is loaded again from its file in the worker.
+SlabTask = dict[str, Any]
+
+def dataset_source(ds) -> Optional[tuple[str, Any, Any]]:
+    """
+    Path & RAMSES field configuration a dataset was loaded with, enough to
+    load it again in another process. None for datasets without a file, e.g.
+    in-memory ones.
+    """
+    path = ds.parameter_filename
+    if not isinstance(path, str) or not os.path.exists(path):
+        return None
+    return path, getattr(ds, "_fields_in_file", None), getattr(ds, "_extra_particle_fields", None)
+
+def code_values(value) -> np.ndarray:
+    if hasattr(value, "units"):
+        return value.to_value("code_length")
+    return np.asarray(value, dtype="float64")
+
+def slab_bounds(left: np.ndarray, right: np.ndarray, count: int,
+                origin: np.ndarray, cell: np.ndarray) -> list[tuple[np.ndarray, np.ndarray]]:
+    """
+    Splits the box from left to right into at most count slabs along its
+    longest axis. Slab edges fall on the root grid of cells of size cell
+    starting at origin, so no cell, whatever its level, straddles two slabs &
+    is projected twice.
+    """
+    axis = int(np.argmax(right - left))
+    start = np.floor((left[axis] - origin[axis]) / cell[axis])
+    stop = np.ceil((right[axis] - origin[axis]) / cell[axis])
+    steps = np.unique(np.linspace(start, stop, int(min(count, stop - start)) + 1).round())
+    edges = origin[axis] + steps * cell[axis]
+    slabs = list()
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        slab_left, slab_right = left.copy(), right.copy()
+        slab_left[axis], slab_right[axis] = lo, hi
+        slabs.append((slab_left, slab_right))
+    return slabs
+
+# in worker processes, (path, fields, epf) -> dataset
+_datasets = LRUCache(None, max_entries=WORKER_DATASETS)
+
+def project_slab(task: SlabTask) -> tuple[np.ndarray, Optional[np.ndarray], str]:
+    """
+    Runs in a worker process. Projects the part of the data source inside one
+    slab, returning the image, the projected weight if weighted, & the
+    image's units.
+
+    Projections are sums over cells, so slab images add up. Weighted ones are
+    averages, added up weighted by the projected weight of their slab.
+    """
+    path, fields, epf = task["dataset"]
+    ds = _datasets.get_or_create(task["dataset"], lambda: load_dataset(path, fields, epf))
+    source = region_source(ds, task["region"], task["region_center"])
+    slab = ds.region(
+        ds.arr(task["center"], "code_length"),
+        ds.arr(task["left"], "code_length"),
+        ds.arr(task["right"], "code_length"),
+        data_source=source,
+    )
+    params = dict(
+        center=ds.arr(task["center"], "code_length"),
+        normal_vector=task["normal"],
+        width=ds.arr(task["width"], "code_length"),
+        resolution=task["resolution"],
+        no_ghost=task["no_ghost"],
+        north_vector=task["north_vector"],
+        depth=ds.quan(task["depth"], "code_length") if task["depth"] is not None else None,
+        method=task["method"],
+    )
+    image = off_axis_projection(slab, item=task["field"], weight=task["weight_field"], **params)
+    weight = None
+    if task["weight_field"] is not None:
+        weight = off_axis_projection(slab, item=task["weight_field"], **params).d
+    return image.d, weight, str(image.units)
+
+class OffAxisPool:
+    """
+    Off-axis projections split into slabs & projected in worker processes,
+    whose images are summed into one.
+
+    Workers load the dataset from its file the first time they see it & keep
+    it, so following projections of it, e.g. while rotating the view, skip
+    loading. Datasets without a file are projected serially, as are ones
+    with fewer than min_cells root grid cells, see splits().
+    """
+    def __init__(self, workers: Optional[int] = None, min_cells: int = OFF_AXIS_MIN_CELLS):
+        self.workers = workers if workers is not None else os.cpu_count() or 1
+        self.min_cells = min_cells
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def splits(self, ds) -> bool:
+        """
+        Whether projections of ds are worth splitting. Refined cells aren't
+        counted, octree indices don't know how many they hold before reading.
+        """
+        return self.workers > 1 and int(np.prod(ds.domain_dimensions)) >= self.min_cells
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        # spawned, forking a process running Qt & worker threads is not safe
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    def project(self, tasks: list[SlabTask]) -> tuple[np.ndarray, str]:
+        parts = list(self.pool.map(project_slab, tasks))
+        units = parts[0][2]
+        if parts[0][1] is None:
+            return sum(image for image, _, _ in parts), units
+        total = sum(weight for _, weight, _ in parts)
+        image = sum(image * weight for image, weight, _ in parts)
+        weighted = total != 0
+        image[weighted] /= total[weighted]
+        image[~weighted] = 0
+        return image, units
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+class ParallelProjectionBuffer(OffAxisProjectionFixedResolutionBuffer):
+    """
+    OffAxisProjectionFixedResolutionBuffer projecting through an OffAxisPool.
+    The pool, & the region the plot's data source was built from, are bound
+    by ParallelOffAxisProjectionPlot. Falls back on yt for what the workers
+    can't rebuild: datasets without a file, second moments, custom volumes &
+    max levels.
+    """
+    def __init__(self, off_axis: OffAxisPool, region: Optional[Region], region_center, *args, **kwargs):
+        self.off_axis = off_axis
+        self.region = region
+        self.region_center = region_center
+        super().__init__(*args, **kwargs)
+
+    def tasks(self, item) -> Optional[list[SlabTask]]:
+        dd = self.data_source
+        ds = self.ds
+        dataset = dataset_source(ds)
+        if (dataset is None or dd.moment != 1 or dd.volume is not None or dd.interpolated
+                or getattr(dd.dd, "_max_level", None) is not None):
+            return None
+        if hasattr(dd.dd, "get_bbox"):
+            left, right = (edge.to_value("code_length") for edge in dd.dd.get_bbox())
+        else:
+            left, right = ds.domain_left_edge.to_value("code_length"), ds.domain_right_edge.to_value("code_length")
+        width = code_values(ds.arr((
+            self.bounds[1] - self.bounds[0],
+            self.bounds[3] - self.bounds[2],
+            self.bounds[5] - self.bounds[4],
+        )))
+        task = {
+            "dataset": dataset,
+            "region": self.region,
+            "region_center": self.region_center,
+            "center": code_values(dd.center),
+            "normal": np.asarray(dd.normal_vector, dtype="float64"),
+            "width": width,
+            "resolution": tuple(int(n) for n in self.buff_size),
+            "field": item,
+            "weight_field": dd.weight_field,
+            "no_ghost": dd.no_ghost,
+            "north_vector": None if dd.north_vector is None else np.asarray(dd.north_vector, dtype="float64"),
+            "depth": None if dd.depth is None else float(code_values(dd.depth)),
+            "method": dd.method,
+        }
+        origin = ds.domain_left_edge.to_value("code_length")
+        cell = (ds.domain_width / ds.domain_dimensions).to_value("code_length")
+        slabs = slab_bounds(left, right, self.off_axis.workers * SLABS_PER_WORKER, origin, cell)
+        return [{**task, "left": slab_left, "right": slab_right} for slab_left, slab_right in slabs]
+
+    def _generate_image_and_mask(self, item):
+        item = self.data_source.dd._determine_fields([item])[0]
+        tasks = self.tasks(item)
+        if tasks is None or self.off_axis.workers < 2:
+            return super()._generate_image_and_mask(item)
+        image, units = self.off_axis.project(tasks)
+        self.data[item] = ImageArray(self.ds.arr(image.swapaxes(0, 1), units), info=self._get_info(item))
+        self.mask[item] = None
+
+class ParallelOffAxisProjectionPlot(yt.OffAxisProjectionPlot):
+    """
+    yt.OffAxisProjectionPlot whose buffers are ParallelProjectionBuffers.
+    Its data source is the whole dataset, or the region around region_center
+    the workers build again, see backend.regions.
+    """
+    def __new__(cls, *args, **kwargs):
+        # yt.ProjectionPlot.__new__ dispatches on the normal, which is off-axis here
+        return object.__new__(cls)
+
+    def __init__(self, off_axis: OffAxisPool, ds, *args, region: Optional[Region] = None,
+                 region_center=None, **kwargs):
+        kwargs["data_source"] = region_source(ds, region, region_center)
+
+        def buffer(*buffer_args, **buffer_kwargs):
+            return ParallelProjectionBuffer(off_axis, region, region_center, *buffer_args, **buffer_kwargs)
+        self._frb_generator = buffer
+        super().__init__(ds, *args, **kwargs)
@@ -15,6 +15,24 @@ class PlotTypeOption(Enum):
     PARTICLE_PLOT = 3,
     PARTICLE_PHASE_PLOT = 4
 
+class RenderModeOption(Enum):
+    ANNOTATED = 1,
+    INTERACTIVE = 2,
+    TILED = 3,
+
+class CenterMethodOption(Enum):
+    STAR_MEAN = 1,
+    STAR_MASS_WEIGHTED = 2,
+    MAX_DENSITY = 3,
+    STAR_SUBSAMPLED = 4,
+
+class RegionOption(Enum):
+    DOMAIN = 1,
+    SPHERE = 2,
+    BOX = 3,
+    DISK = 4,
+    ELLIPSOID = 5,
+
 def data_tuple(data: Any, default: Any):
     return data, default
 
@@ -100,6 +118,22 @@ class PlotOption(Enum):
                 ("particle_metallicity", "d"),
             ]
     ),
+    RENDER_MODE = 17, data_tuple(
+        data=None,
+        default=RenderModeOption.ANNOTATED
+    ),
+    CENTER_METHOD = 18, data_tuple(
+        data=None,
+        default=CenterMethodOption.STAR_MEAN
+    ),
+    PROGRESSIVE = 19, data_tuple(
+        data=None,
+        default=False
+    ),
+    REGION = 20, data_tuple(
+        data=None,
+        default=None
+    ),
 
 class SliceProjPlotOption(Enum):
     NORMAL = 1, data_tuple(
@@ -158,6 +192,34 @@ class Data(Enum):
         data=None,
         default=None
     ),
+    LOAD_PROGRESS = 3, data_tuple(
+        data=None,
+        default=None
+    ),
+    SERIES = 4, data_tuple(
+        data=None,
+        default=None
+    ),
+    SERIES_POSITION = 5, data_tuple(
+        data=None,
+        default=None
+    ),
+    PREFETCHED = 6, data_tuple(
+        data=None,
+        default=None
+    ),
+    EXPORT_PROGRESS = 7, data_tuple(
+        data=None,
+        default=None
+    ),
+    VIEW = 8, data_tuple(
+        data=None,
+        default=None
+    ),
+    DATASET_CENTER = 9, data_tuple(
+        data=None,
+        default=None
+    ),
 
 class UserAction(Enum):
     CREATE_PLOT = 1, data_tuple(
@@ -203,4 +265,36 @@ class UserAction(Enum):
     SWAP_AXES = 11, data_tuple(
         data=None,
         default=False
+    ),
+    SAVE_PLOT = 12, data_tuple(
+        data=None,
+        default=False
+    ),
+    LOAD_DATASET = 13, data_tuple(
+        data=None,
+        default=None
+    ),
+    CANCEL_LOAD = 14, data_tuple(
+        data=None,
+        default=False
+    ),
+    LOAD_SERIES = 15, data_tuple(
+        data=None,
+        default=None
+    ),
+    STEP_SERIES = 16, data_tuple(
+        data=None,
+        default=0
+    ),
+    EXPORT_SERIES = 17, data_tuple(
+        data=None,
+        default=None
+    ),
+    CANCEL_EXPORT = 18, data_tuple(
+        data=None,
+        default=False
+    ),
+    SET_VIEW = 19, data_tuple(
+        data=None,
+        default=None
     ),
\ No newline at end of file
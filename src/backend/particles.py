@@ -0,0 +1,232 @@
+from typing import *
+
+from backend.caching import LRUCache
+from backend.column_cache import snapshot_source
+
+import numpy as np
+import yt
+from yt.data_objects.image_array import ImageArray
+from yt.visualization.fixed_resolution import ParticleImageBuffer
+from yt.visualization.particle_plots import AxisAlignedParticleProjectionPlot
+
+PARTICLE_CACHE_BYTES = 1 << 30
+
+def particle_axis(ds, x_field, y_field, data_source=None) -> Optional[int]:
+    """
+    The axis a particle plot of x_field against y_field projects along, None
+    if they aren't particle positions. Same test as yt.ParticlePlot.
+    """
+    dd = data_source if data_source is not None else ds.all_data()
+    x_field = dd._determine_fields(x_field)[0]
+    y_field = dd._determine_fields(y_field)[0]
+    for axis in (0, 1, 2):
+        xf = f"particle_position_{ds.coordinates.axis_name[ds.coordinates.x_axis[axis]]}"
+        yf = f"particle_position_{ds.coordinates.axis_name[ds.coordinates.y_axis[axis]]}"
+        if (x_field[1], y_field[1]) in [(xf, yf), (yf, xf)]:
+            return axis
+    return None
+
+class ParticleColumns:
+    """
+    One particle field of a data source, read once: positions along all three
+    axes in code_length, values & optional weights, all float32 & sorted along
+    the image x axis, so the particles of a window are found by binary search
+    on x & a mask on the other two axes.
+
+    Holds a reference to the data source, which keeps it & its dataset alive
+    while cached.
+    """
+    def __init__(self, source, positions: np.ndarray, values: np.ndarray,
+                 weights: Optional[np.ndarray], units: str, xax: int):
+        order = np.argsort(positions[xax], kind="stable")
+        self.source = source
+        self.xax = xax
+        self.positions = np.ascontiguousarray(positions[:, order])
+        # extent of the particles along each axis, for periodic windows
+        self.low = self.positions.min(axis=1) if self.positions.size else np.zeros(3)
+        self.high = self.positions.max(axis=1) if self.positions.size else np.zeros(3)
+        self.values = values[order]
+        self.weights = weights[order] if weights is not None else None
+        self.units = units
+
+    @classmethod
+    def read(cls, ds, source, field: tuple[str, str], weight_field: Optional[tuple[str, str]],
+             xax: int) -> "ParticleColumns":
+        names = [(field[0], f"particle_position_{ds.coordinates.axis_name[axis]}") for axis in range(3)]
+        fields = names + [field] + ([weight_field] if weight_field is not None else [])
+        # one pass over the particle files for every column
+        source.get_data(fields)
+        positions = np.stack([source[name].to_value("code_length").astype("float32") for name in names])
+        values = source[field]
+        units = str(values.units)
+        values = values.d.astype("float32")
+        weights = source[weight_field].d.astype("float32") if weight_field is not None else None
+        return cls(source, positions, values, weights, units, xax)
+
+    @property
+    def nbytes(self) -> int:
+        weights = self.weights.nbytes if self.weights is not None else 0
+        return self.positions.nbytes + self.values.nbytes + weights
+
+    def window(self, bounds: tuple[float, float, float, float], depth: tuple[float, float],
+               yax: int, zax: int, period: Optional[tuple[float, float]] = None) -> np.ndarray:
+        """
+        Indices of the particles inside the image bounds (x0, x1, y0, y1) &
+        the depth range along the projection axis, edges included. With the
+        domain's period along the image axes, particles a whole number of
+        periods away from the bounds are included too, sorted & once each.
+        """
+        x0, x1, y0, y1 = bounds
+        if period is not None:
+            px, py = period
+            shifts = [
+                (kx * px, ky * py)
+                for kx in range(int(np.ceil((self.low[self.xax] - x1) / px)),
+                                int(np.floor((self.high[self.xax] - x0) / px)) + 1)
+                for ky in range(int(np.ceil((self.low[yax] - y1) / py)),
+                                int(np.floor((self.high[yax] - y0) / py)) + 1)
+            ]
+            found = [self.window((x0 + sx, x1 + sx, y0 + sy, y1 + sy), depth, yax, zax) for sx, sy in shifts]
+            return np.unique(np.concatenate(found)) if found else np.zeros(0, dtype="int64")
+        start = np.searchsorted(self.positions[self.xax], x0, side="left")
+        stop = np.searchsorted(self.positions[self.xax], x1, side="right")
+        y = self.positions[yax, start:stop]
+        z = self.positions[zax, start:stop]
+        inside = (y >= y0) & (y <= y1) & (z >= depth[0]) & (z <= depth[1])
+        return start + np.nonzero(inside)[0]
+
+columns = LRUCache(PARTICLE_CACHE_BYTES, lambda column: column.nbytes)
+
+def particle_columns(ds, data_source, field: tuple[str, str], weight_field: Optional[tuple[str, str]],
+                     xax: int) -> ParticleColumns:
+    """
+    Cached columns of field for the whole data source, the dataset if None,
+    shared by every plot of it whatever its window. Whole datasets are read
+    through the column cache, if one is in use.
+    """
+    def read() -> ParticleColumns:
+        if data_source is not None:
+            return ParticleColumns.read(ds, data_source, field, weight_field, xax)
+        dd = snapshot_source(ds)
+        column = ParticleColumns.read(ds, dd, field, weight_field, xax)
+        # only the float32 copies are kept
+        dd.clear_data()
+        return column
+
+    key = (id(ds), id(data_source), repr(field), repr(weight_field), xax)
+    return columns.get_or_create(key, read)
+
+def deposit(px: np.ndarray, py: np.ndarray, values: np.ndarray, shape: tuple[int, int],
+            method: str) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Sums values onto a (rows, columns) grid, px & py being positions in
+    [0, 1] across it. ngp adds each particle to the pixel it falls in, cic
+    shares it between the four nearest pixel centers. Returns the sums & the
+    pixels that received any particle.
+    """
+    ny, nx = shape
+    if method == "ngp":
+        ix = (px * nx).astype("int64")
+        iy = (py * ny).astype("int64")
+        pixels = [(ix, iy, values)]
+    elif method == "cic":
+        fx = px * nx - 0.5
+        fy = py * ny - 0.5
+        ix = np.floor(fx).astype("int64")
+        iy = np.floor(fy).astype("int64")
+        wx = (fx - ix).astype(values.dtype)
+        wy = (fy - iy).astype(values.dtype)
+        pixels = [
+            (ix, iy, values * (1 - wx) * (1 - wy)),
+            (ix + 1, iy, values * wx * (1 - wy)),
+            (ix, iy + 1, values * (1 - wx) * wy),
+            (ix + 1, iy + 1, values * wx * wy),
+        ]
+    else:
+        raise ValueError(f"Received unknown deposition method '{method}'")
+
+    buff = np.zeros(nx * ny)
+    hits = np.zeros(nx * ny, dtype="bool")
+    for ix, iy, weights in pixels:
+        keep = (ix >= 0) & (ix < nx) & (iy >= 0) & (iy < ny)
+        index = iy[keep] * nx + ix[keep]
+        buff += np.bincount(index, weights[keep], minlength=nx * ny)
+        hits[index] = True
+    return buff.reshape(ny, nx), hits.reshape(ny, nx)
+
+class ColumnImageBuffer(ParticleImageBuffer):
+    """
+    ParticleImageBuffer depositing from cached ParticleColumns instead of
+    reading its data source, with NumPy histogramming. Panning & zooming only
+    re-bins the particles inside the new window, wrapped around the domain
+    when periodic. Images are (rows, columns) like other buffers.
+    """
+    def _generate_image_and_mask(self, item):
+        source = self.data_source
+        dd = source.dd
+        ds = self.ds
+        xax, yax, zax = self.xax, self.yax, self.axis
+        bounds = tuple(b.to_value("code_length") if hasattr(b, "to_value") else b for b in self.bounds)
+        depth = (float(dd.left_edge[zax].to("code_length")), float(dd.right_edge[zax].to("code_length")))
+        # the bounding region selects from the plot's data_source, if any
+        column = particle_columns(ds, getattr(dd, "_data_source", None), item, source.weight_field, xax)
+
+        period = None
+        if self.periodic:
+            period = (float(ds.domain_width[xax].to("code_length")), float(ds.domain_width[yax].to("code_length")))
+        inside = column.window(bounds, depth, yax, zax, period)
+        dx = column.positions[xax, inside] - bounds[0]
+        dy = column.positions[yax, inside] - bounds[2]
+        if period is not None:
+            # wrapped like yt's ParticleImageBuffer
+            dx %= period[0]
+            dy %= period[1]
+        px = dx / (bounds[1] - bounds[0])
+        py = dy / (bounds[3] - bounds[2])
+        values = column.values[inside]
+        weights = column.weights[inside] if column.weights is not None else None
+        shape = (int(self.buff_size[1]), int(self.buff_size[0]))
+
+        buff, hits = deposit(px, py, values * weights if weights is not None else values,
+                             shape, source.deposition)
+        units = ds.quan(1, column.units).units
+        info = self._get_info(item)
+        if source.density:
+            dpx = (bounds[1] - bounds[0]) / shape[1]
+            dpy = (bounds[3] - bounds[2]) / shape[0]
+            norm = ds.quan(dpx * dpy, "code_length**2").in_base()
+            buff /= norm.v
+            units = units / norm.units
+            info["label"] += " $\\rm{Density}$"
+        if weights is not None:
+            weight_buff, _ = deposit(px, py, weights, shape, source.deposition)
+            weighted = weight_buff > 0
+            buff[weighted] /= weight_buff[weighted]
+        buff[~hits] = np.nan
+
+        self.data[item] = ImageArray(buff, units=units, info=info)
+        self.mask[item] = hits
+
+class ColumnParticlePlot(AxisAlignedParticleProjectionPlot):
+    """
+    Axis-aligned particle projection whose buffers are ColumnImageBuffers.
+    """
+    _frb_generator = ColumnImageBuffer
+
+def particle_plot(ds, x_field, y_field, **params):
+    """
+    yt.ParticlePlot, except that projections are ColumnParticlePlots. Their
+    buffer is x_bins x y_bins when given.
+    """
+    axis = particle_axis(ds, x_field, y_field, params.get("data_source"))
+    if axis is None:
+        return yt.ParticlePlot(ds, x_field, y_field, **params)
+    x_bins = params.pop("x_bins", None)
+    y_bins = params.pop("y_bins", None)
+    figure_size = params.pop("figure_size", None)
+    plot = ColumnParticlePlot(ds, axis, params.pop("z_fields", None), **params)
+    if x_bins is not None or y_bins is not None:
+        plot.set_buff_size((x_bins or plot.buff_size[0], y_bins or plot.buff_size[1]))
+    if figure_size is not None:
+        plot.set_figure_size(figure_size)
+    return plot
@@ -1,11 +1,23 @@
-from PySide6.QtWidgets import *
-from PySide6.QtGui import QImage
 from typing import *
 
+from backend.caching import LRUCache, dataset_lock
+from backend.fields import requested_parameters
+from backend.history import View
 from backend.info_handling import *
+from backend.offaxis import OffAxisPool, ParallelOffAxisProjectionPlot
 from backend.options import *
+from backend.particles import particle_plot
+from backend.regions import region_source
+from backend.render_cache import RenderCache, canonical
+from backend.rendering import ProgressiveRenderer, data_extent, grid_shape, plot_fields, plot_lock, rgba_as
+from backend.tiles import TilePyramid
+from backend.workers import Job, Worker
 
+import numpy as np
+import threading
 import yt
+from yt.funcs import fix_axis
+from yt.visualization.plot_window import PWViewerMPL, get_axes_unit, get_window_parameters
 
 PlotType = Union[ 
     yt.AxisAlignedSlicePlot,
@@ -16,12 +28,301 @@ PlotType = Union[
     yt.ParticlePhasePlot
 ]
 
+PlotRequest = dict[str, Any]
+
+PROJECTION_CACHE_BYTES = 1 << 30
+
+# yt.AxisAlignedProjectionPlot parameters passed on to ds.proj(), with the center
+PROJ_PARAMS = ("weight_field", "data_source", "field_parameters", "method", "max_level", "moment")
+
+PRERENDERED_PLOTS = 4
+
+# plots whose history entries can still be restored, see PlotManager.restore_view()
+RECENT_PLOTS = 8
+
+# seconds of quiet after a pan or zoom before the view is re-rendered
+VIEW_DEBOUNCE = 0.15
+
+# what yt.OffAxisProjectionPlot takes of a projection request's parameters
+OFF_AXIS_PARAMS = {
+    "center",
+    "width",
+    "axes_unit",
+    "fontsize",
+    "data_source",
+    "buff_size",
+    "weight_field",
+}
+
+VIEW_ACTIONS = {
+    UserAction.PAN_X,
+    UserAction.PAN_Y,
+    UserAction.PAN_REL_X,
+    UserAction.PAN_REL_Y,
+    UserAction.ZOOM,
+}
+
+class CachedProjectionPlot(yt.AxisAlignedProjectionPlot):
+    """
+    Axis-aligned projection plot around an already computed YTProjection.
+
+    Same as yt.AxisAlignedProjectionPlot.__init__ minus the ds.proj() call, so
+    plots that only differ in center, width, units or fonts share the integral
+    & only need to be pixelized again.
+    """
+    def __new__(cls, *args, **kwargs):
+        # yt.ProjectionPlot.__new__ dispatches on the normal, which we don't take
+        return object.__new__(cls)
+
+    def __init__(self, proj, fields, center="center", width=None, axes_unit=None,
+                 origin="center-window", fontsize=18, window_size=8.0,
+                 buff_size=(800, 800), aspect=None):
+        ds = proj.ds
+        if proj.weight_field is None and proj.method == "integrate":
+            self.projected = True
+        (bounds, center, display_center) = get_window_parameters(
+            proj.axis, center, width, ds
+        )
+        self.moment = proj.moment
+        PWViewerMPL.__init__(
+            self,
+            proj,
+            bounds,
+            fields=fields,
+            origin=origin,
+            fontsize=fontsize,
+            window_size=window_size,
+            aspect=aspect,
+            buff_size=buff_size,
+            geometry=ds.geometry,
+        )
+        if axes_unit is None:
+            axes_unit = get_axes_unit(width, ds)
+        self.set_axes_unit(axes_unit)
+
+def view_state(plot, number: int, mode: Optional[RenderModeOption] = None) -> View:
+    """
+    What Data.VIEW holds: the plot's number (PlotMaker's request ticket) and,
+    for plot windows, its limits in code units, flips & swap. Enough to bring
+    the same plot back to this view with apply_view().
+
+    Plot windows also describe their image for ImagePanel's mouse pans &
+    zooms: the grid of per-field cells & where the data sits in each, see
+    rendering.data_extent(). Pass the mode once the image is rendered.
+    """
+    view: View = {"plot": number}
+    if hasattr(plot, "xlim") and hasattr(plot, "_flip_horizontal"):
+        view.update({
+            "xlim": tuple(float(lim.to("code_length")) for lim in plot.xlim),
+            "ylim": tuple(float(lim.to("code_length")) for lim in plot.ylim),
+            "flip_horizontal": plot._flip_horizontal,
+            "flip_vertical": plot._flip_vertical,
+            "swap_axes": plot._has_swapped_axes,
+            "grid": grid_shape(len(plot_fields(plot))),
+            "extent": data_extent(plot, mode),
+        })
+    return view
+
+def view_center(plot, view: View) -> Optional[np.ndarray]:
+    """
+    3D center in code units of an axis-aligned plot brought to view: its
+    data source's center, moved in the plane to the middle of the view.
+    None for off-axis plots.
+    """
+    source = getattr(plot, "data_source", None)
+    axis = getattr(source, "axis", None)
+    if axis not in (0, 1, 2) or getattr(source, "center", None) is None:
+        return None
+    coordinates = plot.ds.coordinates
+    center = source.center.to_value("code_length").copy()
+    center[coordinates.x_axis[axis]] = sum(view["xlim"]) / 2
+    center[coordinates.y_axis[axis]] = sum(view["ylim"]) / 2
+    return center
+
+def apply_view(plot, view: View):
+    if "xlim" not in view:
+        return
+    (x0, x1), (y0, y1) = view["xlim"], view["ylim"]
+    plot.set_width((x1 - x0, y1 - y0), "code_length")
+    plot.set_center(((x0 + x1) / 2, (y0 + y1) / 2), "code_length")
+    if plot._flip_horizontal != view["flip_horizontal"]:
+        plot.flip_horizontal()
+    if plot._flip_vertical != view["flip_vertical"]:
+        plot.flip_vertical()
+    if plot._has_swapped_axes != view["swap_axes"]:
+        plot.swap_axes()
+
+class ViewChange:
+    """
+    Net effect of a run of pans & zooms.
+
+    Kept as an absolute pan, a pan relative to the width before the run, and
+    a zoom factor, applied in that order. A relative pan after zooming by Z
+    moves 1/Z as far in units of the original width, so it is scaled on the
+    way in.
+    """
+    def __init__(self):
+        self.pan = [0.0, 0.0]
+        self.pan_rel = [0.0, 0.0]
+        self.zoom = 1.0
+
+    def add(self, name: V3Option, data: Any):
+        match name:
+            case UserAction.PAN_X:
+                self.pan[0] += data
+            case UserAction.PAN_Y:
+                self.pan[1] += data
+            case UserAction.PAN_REL_X:
+                self.pan_rel[0] += data / self.zoom
+            case UserAction.PAN_REL_Y:
+                self.pan_rel[1] += data / self.zoom
+            case UserAction.ZOOM:
+                # yt rejects non-positive factors, and so would the division above
+                if data > 0:
+                    self.zoom *= data
+            case _:
+                pass
+
+    def edits(self) -> list[tuple[V3Option, Any]]:
+        edits = list()
+        if self.pan[0] or self.pan[1]:
+            edits += [(UserAction.PAN_X, self.pan[0]), (UserAction.PAN_Y, self.pan[1])]
+        if self.pan_rel[0] or self.pan_rel[1]:
+            edits += [(UserAction.PAN_REL_X, self.pan_rel[0]), (UserAction.PAN_REL_Y, self.pan_rel[1])]
+        if self.zoom != 1.0:
+            edits += [(UserAction.ZOOM, self.zoom)]
+        return edits
+
+def projection_size(proj) -> int:
+    return sum(array.nbytes for array in proj.field_data.values())
+
+def build_projection_plot(request: PlotRequest, projections: Optional[LRUCache],
+                          off_axis: Optional[OffAxisPool] = None) -> PlotType:
+    """
+    Off-axis projections are not cached, they go through yt.ProjectionPlot, or
+    are split across off_axis's worker processes when the workers can build
+    their data source again, the whole dataset or a region, & the dataset is
+    large enough to gain from it. They only take OFF_AXIS_PARAMS.
+
+    Axis-aligned projections are made about the window's center like yt
+    does, & only plots about the same center share one if a field depends on
+    it, e.g. radial velocity. Cache entries keep their dataset & data source
+    alive, so their ids are enough to identify them.
+    """
+    ds, normal, fields = request["args"]
+    if not isinstance(normal, str):
+        params = {key: value for key, value in request["params"].items() if key in OFF_AXIS_PARAMS}
+        if off_axis is not None and "data_source" not in params and off_axis.splits(ds):
+            return ParallelOffAxisProjectionPlot(off_axis, ds, normal, fields, region=request.get("region"),
+                                                 region_center=params.get("center"), **params)
+        params = with_region({**request, "params": params})["params"]
+        return yt.ProjectionPlot(ds, normal, fields, **params)
+    params = dict(with_region(request)["params"])
+    if projections is None:
+        return yt.ProjectionPlot(ds, normal, fields, **params)
+
+    axis = fix_axis(normal, ds)
+    proj_params = {key: params.pop(key) for key in PROJ_PARAMS if key in params}
+    _, proj_params["center"], _ = get_window_parameters(axis, params.get("center", "center"),
+                                                        params.get("width"), ds)
+    weight_field = proj_params.get("weight_field")
+    depends = requested_parameters(ds, [fields] if isinstance(fields, tuple) else fields, weight_field)
+    key = (
+        id(ds),
+        axis,
+        repr(fields),
+        repr(weight_field),
+        id(proj_params.get("data_source")),
+        repr(proj_params.get("field_parameters")),
+        repr([proj_params.get(name) for name in ("method", "max_level", "moment")]),
+        canonical(proj_params["center"]) if "center" in depends else None,
+    )
+    proj = projections.get_or_create(key, lambda: ds.proj(fields, axis, **proj_params))
+    return CachedProjectionPlot(proj, fields, **params)
+
+def request_key(request: PlotRequest) -> Hashable:
+    """
+    Identifies the plot a request would build. Datasets & data sources are
+    compared by identity.
+    """
+    ds, *args = request["args"]
+    params = dict(request["params"])
+    data_source = params.pop("data_source", None)
+    return (request["plot_type"], id(ds), repr(args), repr(sorted(params.items())), id(data_source),
+            repr(request.get("region")))
+
+def with_region(request: PlotRequest) -> PlotRequest:
+    """
+    The request with its region, if any, built into its data_source. A
+    data_source given directly takes precedence.
+    """
+    ds = request["args"][0]
+    params = request["params"]
+    if "data_source" in params:
+        return request
+    data_source = region_source(ds, request.get("region"), params.get("center"))
+    if data_source is None:
+        return request
+    return {**request, "params": {**params, "data_source": data_source}}
+
+def build_plot(request: PlotRequest, projections: Optional[LRUCache] = None,
+               off_axis: Optional[OffAxisPool] = None) -> PlotType:
+    """
+    Constructs the yt plot described by a request from PlotMaker.create_*_plot().
+
+    Safe to call off the GUI thread, requests hold no reference to the broker.
+    Holds the dataset's lock, view panes build plots of one dataset in turn.
+    """
+    args = request["args"]
+    with dataset_lock(args[0]):
+        params = with_region(request)["params"]
+        match request["plot_type"]:
+            case PlotTypeOption.SLICE_PLOT:
+                return yt.SlicePlot(*args, **params)
+            case PlotTypeOption.PROJECTION_PLOT:
+                return build_projection_plot(request, projections, off_axis)
+            case PlotTypeOption.PARTICLE_PLOT:
+                return particle_plot(*args, **params)
+
+class DeferredPlot:
+    """
+    Stands in for a plot whose image came from the render cache, as
+    Data.PLOT & the render worker's current plot. Built by current_plot() the
+    first time something edits, restores or saves it.
+    """
+    def __init__(self, request: PlotRequest, projections: Optional[LRUCache] = None,
+                 off_axis: Optional[OffAxisPool] = None):
+        self.request = request
+        self.projections = projections
+        self.off_axis = off_axis
+
+    def build(self) -> PlotType:
+        return build_plot(self.request, self.projections, self.off_axis)
+
+def current_plot(worker: Worker) -> Optional[PlotType]:
+    """
+    Runs on the worker. The plot edits apply to, built first if deferred.
+    """
+    plot = worker.context.get("plot")
+    if isinstance(plot, DeferredPlot):
+        plot = plot.build()
+        worker.context["plot"] = plot
+    return plot
+
 class PlotMaker(Subscriber, Publisher):
     """
     Backend element responsible for making plots.
 
     Subscribed to UserAction.CREATE_PLOT, creates new plot based on user-selected
-    arguments.
+    arguments. Arguments are collected on the GUI thread, the plot itself is built
+    & rendered on the render worker, then published as Data.PLOT & Data.IMAGE.
+    With a render_cache, images of plots made before are published straight
+    from disk with their view, & the plot is only built once edited, see
+    DeferredPlot. With prerender, the same plot of the outputs a series
+    prefetches (Data.PREFETCHED) is rendered ahead while the render worker
+    idles. With off_axis, off-axis projections are split across its
+    worker processes. Each view pane has its own PlotOption.CENTER, reset to
+    Data.DATASET_CENTER whenever the loaders publish one.
 
     TODO: 
         It is possible to consolidate create_slice_plot() and create_projection_plot().
@@ -30,37 +331,145 @@ class PlotMaker(Subscriber, Publisher):
         Not sure if its possible to do particle_plot as well as its a method not a constructor.
         Something to look into.
     """
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.subscribe([UserAction.CREATE_PLOT])
+    def __init__(self, broker: EventBroker, worker: Worker, projections: Optional[LRUCache] = None,
+                 prerender: bool = False, tiles: Optional[TilePyramid] = None,
+                 render_cache: Optional[RenderCache] = None, off_axis: Optional[OffAxisPool] = None):
+        super().__init__(broker)
+        self.worker = worker
+        self.prerender_enabled = prerender
+        self.off_axis = off_axis
+        self.latest_request = 0
+        if projections is None:
+            projections = LRUCache(PROJECTION_CACHE_BYTES, projection_size)
+        self.projections = projections
+        self.tiles = tiles if tiles is not None else TilePyramid()
+        self.render_cache = render_cache
+        # (request key, render mode) -> (plot, image), filled from Data.PREFETCHED
+        self.prerendered = LRUCache(None, max_entries=PRERENDERED_PLOTS)
+        self.progressive = ProgressiveRenderer()
+        self.subscribe([UserAction.CREATE_PLOT, Data.PREFETCHED, Data.DATASET_CENTER])
         
         for op in Data:
             self.add_field(op)
+        # panes added after loading start from the dataset's center too
+        self.publish(PlotOption.CENTER, self.query(Data.DATASET_CENTER))
 
     def handle_update(self, name: V3Option):
         match name:
             case UserAction.CREATE_PLOT:
-                success: bool = False
-                match self.query(PlotOption.PLOT_TYPE):
-                    case PlotTypeOption.SLICE_PLOT:
-                        success = self.create_slice_plot()
-                    case PlotTypeOption.PROJECTION_PLOT:
-                        success = self.create_projection_plot()
-                    case PlotTypeOption.PARTICLE_PLOT:
-                        success = self.create_particle_plot()
-                    case _:
-                        pass
-                if success:
-                    plot: PlotType = self.query(Data.PLOT)
-                    if plot is not None:
-                        path: str = self.query(PlotOption.SAVE_TO)
-                        plot.save(path)
-                        self.publish(Data.IMAGE, QImage(path))
+                request = self.plot_request()
+                if request is not None:
+                    self.latest_request += 1
+                    ticket = self.latest_request
+                    mode = self.query(PlotOption.RENDER_MODE)
+                    progressive = self.query(PlotOption.PROGRESSIVE)
+                    key = (request_key(request), mode)
+                    self.worker.submit(
+                        lambda job: self.make_plot(job, ticket, request, mode, key, progressive),
+                        self.plot_done,
+                    )
+            case Data.DATASET_CENTER:
+                self.publish(PlotOption.CENTER, self.query(name))
+            case Data.PREFETCHED:
+                ds = self.query(name)
+                request = self.plot_request(ds)
+                if request is not None and self.prerender_enabled and self.query(Data.PLOT) is not None:
+                    mode = self.query(PlotOption.RENDER_MODE)
+                    key = (request_key(request), mode)
+                    if key not in self.prerendered:
+                        self.worker.submit(lambda job: self.prerender(key, request, mode),
+                                           kind="prerender", idle=True)
             case _:
                 pass
 
-    def create_slice_plot(self):
-        ds = self.query(PlotOption.DATASET)
+    def plot_request(self, ds = None) -> Optional[PlotRequest]:
+        """
+        Request for the currently selected plot, on PlotOption.DATASET unless
+        another dataset is given.
+        """
+        match self.query(PlotOption.PLOT_TYPE):
+            case PlotTypeOption.SLICE_PLOT:
+                return self.create_slice_plot(ds)
+            case PlotTypeOption.PROJECTION_PLOT:
+                return self.create_projection_plot(ds)
+            case PlotTypeOption.PARTICLE_PLOT:
+                return self.create_particle_plot(ds)
+            case _:
+                return None
+
+    def prerender(self, key: Hashable, request: PlotRequest, mode: RenderModeOption):
+        """
+        Runs on the render worker once it has nothing else to do, so it
+        shares the projection & tile caches & datasets with plots safely.
+        Gives way between building & rendering if the user asked for more.
+        """
+        plot = build_plot(request, self.projections, self.off_axis)
+        if self.worker.busy():
+            return
+        self.prerendered.put(key, (plot, rgba_as(plot, mode, self.tiles)))
+
+    def make_plot(self, job: Job, ticket: int, request: PlotRequest, mode: RenderModeOption,
+                  key: Hashable, progressive: bool = False):
+        """
+        Runs on the worker. Skipped entirely if a newer plot was requested
+        before this one started, & only rendered if nothing newer is queued.
+        Progressive plots publish a preview first.
+        """
+        if ticket != self.latest_request:
+            return None
+        # popped, the plot is about to be edited
+        prerendered = self.prerendered.pop(key)
+        if prerendered is not None:
+            plot, image = prerendered
+            self.set_current(plot, ticket, request)
+            return plot, view_state(plot, ticket, mode), image
+        cache_key = None
+        if self.render_cache is not None:
+            cache_key = self.render_cache.key(request, mode)
+            cached = self.render_cache.get(cache_key)
+            if cached is not None:
+                image, view = cached
+                plot = DeferredPlot(request, self.projections, self.off_axis)
+                self.set_current(plot, ticket, request)
+                return plot, {**view, "plot": ticket}, image
+        plot = build_plot(request, self.projections, self.off_axis)
+        self.set_current(plot, ticket, request)
+        view = view_state(plot, ticket)
+        if job.stale():
+            return plot, view, None
+        show = lambda preview: job.deliver(self.show, view, preview)
+        if progressive:
+            image = self.progressive.render(job, plot, mode, show, self.tiles)
+        else:
+            image = rgba_as(plot, mode, self.tiles, show)
+        view = view_state(plot, ticket, mode)
+        if image is not None and self.render_cache is not None:
+            self.render_cache.put(cache_key, image, view)
+        return plot, view, image
+
+    def set_current(self, plot: Union[PlotType, DeferredPlot], number: int, request: PlotRequest):
+        """
+        Runs on the worker, makes plot the one PlotManager edits. The last
+        RECENT_PLOTS requests are kept to build their plots again, each
+        keeping its dataset alive.
+        """
+        self.worker.context["plot"] = plot
+        self.worker.context["plot_number"] = number
+        recent = self.worker.context.setdefault("recent", LRUCache(None, max_entries=RECENT_PLOTS))
+        recent.put(number, DeferredPlot(request, self.projections, self.off_axis))
+
+    def plot_done(self, result: tuple[Union[PlotType, DeferredPlot], View, Optional[np.ndarray]]):
+        plot, view, image = result
+        self.publish(Data.PLOT, plot)
+        self.show(view, image)
+
+    def show(self, view: View, image: Optional[np.ndarray]):
+        self.publish(Data.VIEW, view)
+        self.publish(Data.IMAGE, image)
+
+    def create_slice_plot(self, ds = None) -> Optional[PlotRequest]:
+        if ds is None:
+            ds = self.query(PlotOption.DATASET)
         normal = self.query(SliceProjPlotOption.NORMAL)
         fields = self.query(SliceProjPlotOption.FIELDS)
         if ds is not None and normal is not None and fields is not None:
@@ -78,15 +487,17 @@ class PlotMaker(Subscriber, Publisher):
             }
             
             existing_params = {key: value for key, value in params.items() if value is not None}
-            plot = yt.SlicePlot(
-                ds, normal, fields, **existing_params 
-            )
-            self.publish(Data.PLOT, plot)
-            return True
-        return False
-
-    def create_projection_plot(self):
-        ds = self.query(PlotOption.DATASET)
+            return {
+                "plot_type": PlotTypeOption.SLICE_PLOT,
+                "args": (ds, normal, fields),
+                "params": existing_params,
+                "region": self.query(PlotOption.REGION),
+            }
+        return None
+
+    def create_projection_plot(self, ds = None) -> Optional[PlotRequest]:
+        if ds is None:
+            ds = self.query(PlotOption.DATASET)
         normal = self.query(SliceProjPlotOption.NORMAL)
         fields = self.query(SliceProjPlotOption.FIELDS)
         if ds is not None and normal is not None and fields is not None:
@@ -101,20 +512,21 @@ class PlotMaker(Subscriber, Publisher):
                 "aspect": self.query(PlotOption.ASPECT),
                 "data_source": self.query(PlotOption.DATA_SOURCE),
                 "buff_size": self.query(PlotOption.BUFF_SIZE),
+                "weight_field": self.query(PlotOption.WEIGHT_FIELD),
             }
 
             existing_params = {key: value for key, value in params.items() if value is not None}
+            return {
+                "plot_type": PlotTypeOption.PROJECTION_PLOT,
+                "args": (ds, normal, fields),
+                "params": existing_params,
+                "region": self.query(PlotOption.REGION),
+            }
+        return None
 
-            plot = yt.ProjectionPlot(
-                ds, normal, fields, **existing_params
-            )
-
-            self.publish(Data.PLOT, plot)
-            return True
-        return False
-
-    def create_particle_plot(self):
-        ds = self.query(PlotOption.DATASET)
+    def create_particle_plot(self, ds = None) -> Optional[PlotRequest]:
+        if ds is None:
+            ds = self.query(PlotOption.DATASET)
         x_field = self.query(ParticlePlotOption.X_FIELD)
         y_field = self.query(ParticlePlotOption.Y_FIELD)
         
@@ -140,27 +552,73 @@ class PlotMaker(Subscriber, Publisher):
             }
 
             existing_params = {key: value for key, value in params.items() if value is not None}
+            return {
+                "plot_type": PlotTypeOption.PARTICLE_PLOT,
+                "args": (ds, x_field, y_field),
+                "params": existing_params,
+                "region": self.query(PlotOption.REGION),
+            }
+        return None
 
-            plot = yt.ParticlePlot(
-                ds, x_field, y_field, **existing_params
-            )
-            
-            self.publish(Data.PLOT, plot)
-            return True
-        return False
+class ViewLink:
+    """
+    Pans & zooms of a linked view pane are published to every other linked
+    pane, whose PlotManagers render them on their own workers. Runs on the
+    GUI thread.
+    """
+    def __init__(self):
+        self.linked: list[EventBroker] = list()
+        self.relaying = False
+
+    def set_linked(self, broker: EventBroker, linked: bool):
+        if linked and broker not in self.linked:
+            self.linked.append(broker)
+        elif not linked and broker in self.linked:
+            self.linked.remove(broker)
+
+    def relay(self, source: EventBroker, name: V3Option, data: Any):
+        # relayed actions reach the other panes' PlotManagers, which relay back
+        if self.relaying or source not in self.linked:
+            return
+        self.relaying = True
+        try:
+            for broker in self.linked:
+                if broker is not source:
+                    broker.publish(name, data)
+        finally:
+            self.relaying = False
 
 class PlotManager(Subscriber, Publisher):
     """
     Backend element responsible for handling user-input plot manipulation.
 
+    Edits run on the same render worker as PlotMaker, so they always apply to
+    the most recently created plot. Pans & zooms arriving within `debounce`
+    seconds of each other are folded into one net view change & rendered once;
+    every action is still recorded in `history`. debounce=0 applies them
+    immediately, for callers without an event loop. Tiled rendering uses
+    `tiles`, normally PlotMaker's. UserAction.SET_VIEW brings the plot back to
+    a view published earlier as Data.VIEW. With a link, pans & zooms are
+    passed on to the other linked panes.
+
     TODO:
         Do we need to handle particle phase plots? If yes, what are they good for.
 
         Add functionality for annotations.
     """
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
+    def __init__(self, broker: EventBroker, worker: Worker, debounce: float = VIEW_DEBOUNCE,
+                 tiles: Optional[TilePyramid] = None, link: Optional[ViewLink] = None):
+        super().__init__(broker)
+        self.worker = worker
+        self.tiles = tiles
+        self.link = link
         self.activated = False
+        self.debounce = debounce
+        # every edit applied to the current plot, in order
+        self.history: list[tuple[V3Option, Any]] = list()
+        self.view = ViewChange()
+        self.timer: Optional[threading.Timer] = None
+        self.progressive = ProgressiveRenderer()
         self.subscribe([Data.PLOT, 
                         UserAction.PAN_X,
                         UserAction.PAN_Y,
@@ -172,50 +630,193 @@ class PlotManager(Subscriber, Publisher):
                         UserAction.FLIP_HORIZONTAL,
                         UserAction.FLIP_VERTICAL,
                         UserAction.SWAP_AXES,
+                        UserAction.SAVE_PLOT,
+                        UserAction.SET_VIEW,
                         ])
 
     def handle_update(self, name: V3Option):
-        if not self.activated and name is Data.PLOT:
+        if name is Data.PLOT:
+            # PlotMaker already rendered the new plot.
             self.activated = True
+            self.view = ViewChange()
+            self.history = list()
+            return
         if self.activated:
-            match self.query(PlotOption.PLOT_TYPE):
-                case PlotTypeOption.SLICE_PLOT | PlotTypeOption.PROJECTION_PLOT | PlotTypeOption.PARTICLE_PLOT:
-                    plot: PlotType = self.query(Data.PLOT)
-                    data = self.query(name)
-                    if plot is not None and data is not None:
-                        match name:
-                            case UserAction.PAN_X:
-                                plot.pan((data, 0))
-                            case UserAction.PAN_Y:
-                                plot.pan((0, data))
-                            case UserAction.PAN_REL_X:
-                                plot.pan_rel((data, 0))
-                            case UserAction.PAN_REL_Y:
-                                plot.pan_rel((0, data))
-                            case UserAction.ZOOM:
-                                plot.zoom(data)
-                            case UserAction.AXES_UNIT:
-                                plot.set_axes_unit(data)
-                            case UserAction.IMG_UNIT:
-                                plot.set_unit(data)
-                            case UserAction.FLIP_HORIZONTAL:
-                                plot.flip_horizontal()
-                            case UserAction.FLIP_VERTICAL:
-                                plot.flip_vertical()
-                            case UserAction.SWAP_AXES:
-                                plot.swap_axes()
-                            case _:
-                                pass
-                        path: str = self.query(PlotOption.SAVE_TO)
-                        plot.save(path)
-                        self.publish(Data.IMAGE, QImage(path))
-                case PlotTypeOption.PARTICLE_PHASE_PLOT:
-                    phase_plot: yt.ParticlePhasePlot = self.query(PlotOption.PLOT_TYPE)
-                    data = self.query(name)
-                    match name:
-                        case UserAction.IMG_UNIT:
-                            phase_plot.set_unit(data)
-                        case _:
-                            pass
-                case _:
-                    pass
+            data = self.query(name)
+            if name is UserAction.SAVE_PLOT:
+                if data:
+                    self.flush_view()
+                    path: str = self.query(PlotOption.SAVE_TO)
+                    self.worker.submit(lambda job: self.save_plot(path))
+            elif name is UserAction.SET_VIEW:
+                if data is not None:
+                    self.flush_view()
+                    self.history.append((name, data["view"]))
+                    self.submit_view(data["view"], data["render"])
+            elif data is not None:
+                self.history.append((name, data))
+                if name in VIEW_ACTIONS:
+                    self.queue_view(name, data)
+                    if self.link is not None:
+                        self.link.relay(self.broker, name, data)
+                else:
+                    # keeps edits in order with the pending view change
+                    self.flush_view()
+                    self.submit_edits([(name, data)])
+
+    def queue_view(self, name: V3Option, data: Any):
+        self.view.add(name, data)
+        if not self.debounce:
+            self.flush_view()
+            return
+        if self.timer is not None:
+            self.timer.cancel()
+        self.timer = threading.Timer(self.debounce, lambda: self.worker.dispatch(self.flush_view))
+        self.timer.daemon = True
+        self.timer.start()
+
+    def flush_view(self):
+        """
+        Submits the pending view change, if any. Runs on the GUI thread.
+        """
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        edits = self.view.edits()
+        self.view = ViewChange()
+        if edits:
+            self.submit_edits(edits)
+
+    def submit_edits(self, edits: list[tuple[V3Option, Any]]):
+        plot_type = self.query(PlotOption.PLOT_TYPE)
+        mode = self.query(PlotOption.RENDER_MODE)
+        progressive = self.query(PlotOption.PROGRESSIVE)
+        self.worker.submit(
+            lambda job: self.edit_plot(job, plot_type, mode, edits, progressive),
+            self.edit_done,
+        )
+
+    def submit_view(self, view: View, render: bool):
+        plot_type = self.query(PlotOption.PLOT_TYPE)
+        mode = self.query(PlotOption.RENDER_MODE)
+        progressive = self.query(PlotOption.PROGRESSIVE)
+        self.worker.submit(
+            lambda job: self.restore_view(job, plot_type, mode, view, render, progressive),
+            self.edit_done,
+        )
+
+    def save_plot(self, path: str):
+        """
+        Runs on the worker. Writes the current plot to disk, the only place
+        PlotOption.SAVE_TO is used.
+        """
+        plot = current_plot(self.worker)
+        if plot is not None:
+            with plot_lock(plot):
+                plot.save(path)
+
+    def edit_plot(self, job: Job, plot_type: PlotTypeOption, mode: RenderModeOption,
+                  edits: list[tuple[V3Option, Any]], progressive: bool = False):
+        """
+        Runs on the worker. Edits are always applied so the plot state stays
+        consistent, but only the newest batch is rendered.
+        """
+        plot = current_plot(self.worker)
+        if plot is None:
+            return None
+        with plot_lock(plot):
+            for name, data in edits:
+                self.apply_edit(plot, plot_type, name, data)
+        return self.render(job, plot, plot_type, mode, progressive)
+
+    def restore_view(self, job: Job, plot_type: PlotTypeOption, mode: RenderModeOption,
+                     view: View, render: bool, progressive: bool = False):
+        """
+        Runs on the worker. Puts the plot a view from Data.VIEW was taken from
+        back to it, building that plot again & making it current if it is one
+        of the RECENT_PLOTS. Older plots can't be edited anymore, the current
+        one is rendered instead so it is the one on screen. Without render
+        only the plot state changes, the caller already shows an image.
+
+        PlotOption.WIDTH & PlotOption.CENTER follow the restored view.
+        """
+        number = view.get("plot")
+        if number != self.worker.context.get("plot_number"):
+            deferred = self.worker.context.get("recent", dict()).get(number)
+            if deferred is None:
+                plot = current_plot(self.worker)
+                return self.render(job, plot, plot_type, mode, progressive) if plot is not None else None
+            self.worker.context["plot"] = deferred
+            self.worker.context["plot_number"] = number
+            plot_type = deferred.request["plot_type"]
+        plot = current_plot(self.worker)
+        if plot is None:
+            return None
+        with plot_lock(plot):
+            apply_view(plot, view)
+        if "xlim" in view:
+            (x0, x1), (y0, y1) = view["xlim"], view["ylim"]
+            job.deliver(self.publish, PlotOption.WIDTH, ((x1 - x0, "code_length"), (y1 - y0, "code_length")))
+            job.deliver(self.publish, PlotOption.CENTER, view_center(plot, view))
+        if not render:
+            return None
+        return self.render(job, plot, plot_type, mode, progressive)
+
+    def render(self, job: Job, plot: PlotType, plot_type: PlotTypeOption, mode: RenderModeOption,
+               progressive: bool):
+        match plot_type:
+            case PlotTypeOption.SLICE_PLOT | PlotTypeOption.PROJECTION_PLOT | PlotTypeOption.PARTICLE_PLOT:
+                if job.stale():
+                    return None
+                view = view_state(plot, self.worker.context.get("plot_number"))
+                show = lambda preview: job.deliver(self.edit_done, (view, preview))
+                if progressive:
+                    image = self.progressive.render(job, plot, mode, show, self.tiles)
+                else:
+                    image = rgba_as(plot, mode, self.tiles, show)
+                if image is None:
+                    return None
+                return view_state(plot, self.worker.context.get("plot_number"), mode), image
+            case _:
+                pass
+        return None
+
+    def apply_edit(self, plot: PlotType, plot_type: PlotTypeOption, name: V3Option, data: Any):
+        match plot_type:
+            case PlotTypeOption.SLICE_PLOT | PlotTypeOption.PROJECTION_PLOT | PlotTypeOption.PARTICLE_PLOT:
+                match name:
+                    case UserAction.PAN_X:
+                        plot.pan((data, 0))
+                    case UserAction.PAN_Y:
+                        plot.pan((0, data))
+                    case UserAction.PAN_REL_X:
+                        plot.pan_rel((data, 0))
+                    case UserAction.PAN_REL_Y:
+                        plot.pan_rel((0, data))
+                    case UserAction.ZOOM:
+                        plot.zoom(data)
+                    case UserAction.AXES_UNIT:
+                        plot.set_axes_unit(data)
+                    case UserAction.IMG_UNIT:
+                        plot.set_unit(data)
+                    case UserAction.FLIP_HORIZONTAL:
+                        plot.flip_horizontal()
+                    case UserAction.FLIP_VERTICAL:
+                        plot.flip_vertical()
+                    case UserAction.SWAP_AXES:
+                        plot.swap_axes()
+                    case _:
+                        pass
+            case PlotTypeOption.PARTICLE_PHASE_PLOT:
+                match name:
+                    case UserAction.IMG_UNIT:
+                        plot.set_unit(data)
+                    case _:
+                        pass
+            case _:
+                pass
+
+    def edit_done(self, result: tuple[View, np.ndarray]):
+        view, image = result
+        self.publish(Data.VIEW, view)
+        self.publish(Data.IMAGE, image)
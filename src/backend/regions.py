@@ -0,0 +1,85 @@
+from typing import *
+
+from backend.caching import LRUCache
+from backend.options import *
+from backend.render_cache import canonical
+
+import numpy as np
+from yt.funcs import parse_center_array
+
+# A region is described by a plain dict, so requests holding one can still be
+# compared, hashed & sent to export processes:
+#
+#     {"shape": RegionOption.SPHERE, "size": (10,), "unit": "kpc", "normal": "z"}
+#
+# size is the radius of a sphere, the half widths of a box along x, y & z,
+# the radius & half height of a disk, the semi-axes of an ellipsoid, longest
+# first as yt requires. normal is the axis of a disk & the direction of an
+# ellipsoid's first semi-axis.
+# Every region is placed around the plot's center.
+Region = dict[str, Any]
+
+REGION_CACHE_ENTRIES = 16
+
+regions = LRUCache(None, max_entries=REGION_CACHE_ENTRIES)
+
+def region_shape(region: Optional[Region]) -> RegionOption:
+    """
+    Shapes may also be given by name, as in headless specs.
+    """
+    if region is None:
+        return RegionOption.DOMAIN
+    shape = region.get("shape", RegionOption.DOMAIN)
+    return RegionOption[shape.upper()] if isinstance(shape, str) else shape
+
+def region_normal(normal: Union[str, Sequence[float], None]) -> np.ndarray:
+    if isinstance(normal, str):
+        return np.eye(3)["xyz".index(normal)]
+    vector = np.asarray(normal if normal is not None else (0, 0, 1), dtype="float64")
+    return vector / np.linalg.norm(vector)
+
+def ellipsoid_axes(size) -> tuple[float, float, float]:
+    """
+    An ellipsoid's semi-axes, one size or three. Raises ValueError unless
+    they're longest first, rather than reordering them.
+    """
+    size = tuple(float(r) for r in np.atleast_1d(size))
+    if len(size) not in (1, 3):
+        raise ValueError(f"an ellipsoid takes 1 or 3 semi-axes, got {size}")
+    a, b, c = size * (3 // len(size))
+    if not a >= b >= c:
+        raise ValueError(f"ellipsoid semi-axes must be longest first, got {size}")
+    return a, b, c
+
+def build_region(ds, region: Region, center):
+    shape = region_shape(region)
+    size = tuple(np.atleast_1d(region.get("size", 1)))
+    unit = region.get("unit", "code_length")
+    center = parse_center_array(center if center is not None else "c", ds)
+    match shape:
+        case RegionOption.SPHERE:
+            return ds.sphere(center, (size[0], unit))
+        case RegionOption.BOX:
+            half = ds.arr(np.broadcast_to(size, 3), unit).to("code_length")
+            return ds.region(center, center - half, center + half)
+        case RegionOption.DISK:
+            return ds.disk(center, region_normal(region.get("normal")), (size[0], unit),
+                           (size[-1], unit))
+        case RegionOption.ELLIPSOID:
+            radii = [ds.quan(r, unit).to("code_length") for r in ellipsoid_axes(size)]
+            return ds.ellipsoid(center, *radii, region_normal(region.get("normal")), 0.0)
+        case _:
+            return None
+
+def region_source(ds, region: Optional[Region], center=None):
+    """
+    yt selection object for a region around center, None for the whole
+    domain. Plots of the same region share one object, & with it the
+    projections & particle columns cached by its id.
+
+    Cache entries keep their dataset alive, so its id is enough to identify it.
+    """
+    if region_shape(region) is RegionOption.DOMAIN:
+        return None
+    key = (id(ds), canonical(region), canonical(center))
+    return regions.get_or_create(key, lambda: build_region(ds, region, center))
@@ -0,0 +1,163 @@
+from typing import *
+
+from backend.options import *
+
+from enum import Enum
+import hashlib
+import json
+import os
+import threading
+import numpy as np
+import yt
+
+RENDER_CACHE_DIR = os.environ.get(
+    "INTERACTIVE_YT_RENDER_CACHE",
+    os.path.join(os.path.expanduser("~"), ".cache", "interactive-yt", "renders"),
+)
+
+RENDER_CACHE_BYTES = 2 << 30
+
+def canonical(value: Any) -> Any:
+    """
+    Exact, hashable stand-in for a plot parameter. reprs of arrays & unyt
+    quantities round, so their values are spelled out.
+    """
+    if isinstance(value, Enum):
+        return f"{type(value).__name__}.{value.name}"
+    if hasattr(value, "units") and hasattr(value, "d"):
+        return canonical(value.d), str(value.units)
+    if isinstance(value, np.ndarray):
+        return tuple(value.tolist())
+    if isinstance(value, (list, tuple)):
+        return tuple(canonical(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((str(key), canonical(item)) for key, item in value.items()))
+    if isinstance(value, (str, int, float, bool, type(None))):
+        return value
+    # data sources, their repr lists their defining parameters
+    return repr(value)
+
+def dataset_identity(ds) -> tuple[str, float, int, str, str]:
+    """
+    The dataset's file & the field configuration it was loaded with, which
+    changes what its fields are, like DatasetRegistry.key.
+    """
+    path = os.path.abspath(ds.parameter_filename)
+    stat = os.stat(path)
+    return (path, stat.st_mtime, stat.st_size,
+            repr(getattr(ds, "_fields_in_file", None)), repr(getattr(ds, "_extra_particle_fields", None)))
+
+class RenderCache:
+    """
+    Rendered images on disk, addressed by a hash of everything that went into
+    them: the plot request's arguments & parameters, the render mode, the
+    dataset's path, mtime, size & field configuration (CELL_FIELDS & EPF),
+    and the yt version. Each image is stored
+    with the view (Data.VIEW) it shows, so a hit is shown & panned without
+    building the plot.
+
+    Safe to share between sessions & users: files are written under a
+    temporary name & moved in place, and an image that disappears while being
+    read is a miss. Hits touch the file, the least recently used files are
+    removed once the directory holds more than max_bytes.
+    """
+    def __init__(self, directory: str = RENDER_CACHE_DIR, max_bytes: int = RENDER_CACHE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, request: dict[str, Any], mode: RenderModeOption) -> Optional[str]:
+        """
+        None for datasets that don't live in a file, e.g. in-memory ones.
+        """
+        ds, *args = request["args"]
+        try:
+            identity = dataset_identity(ds)
+        except (OSError, TypeError, AttributeError):
+            return None
+        description = canonical((
+            yt.__version__,
+            identity,
+            request["plot_type"],
+            args,
+            request["params"],
+            mode,
+            request.get("region"),
+        ))
+        return hashlib.sha256(repr(description).encode()).hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".npz")
+
+    def get(self, key: Optional[str]) -> Optional[tuple[np.ndarray, dict[str, Any]]]:
+        """
+        The image & its view, without the plot number.
+        """
+        entry = None
+        if key is not None:
+            try:
+                with np.load(self.path(key)) as f:
+                    view = json.loads(str(f["view"]))
+                    entry = f["image"], {k: tuple(v) if isinstance(v, list) else v for k, v in view.items()}
+                os.utime(self.path(key))
+            except (OSError, ValueError, KeyError):
+                entry = None
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return entry
+
+    def put(self, key: Optional[str], image: np.ndarray, view: dict[str, Any]):
+        if key is None:
+            return
+        view = {k: v for k, v in view.items() if k != "plot"}
+        partial = f"{self.path(key)}.{os.getpid()}.{threading.get_ident()}.part"
+        with open(partial, "wb") as f:
+            np.savez(f, image=image, view=np.array(json.dumps(view)))
+        os.replace(partial, self.path(key))
+        self.evict()
+
+    def entries(self) -> list[tuple[float, int, str]]:
+        """
+        (last use, size, path) of every cached image, oldest first.
+        """
+        entries = list()
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                # .npy images of older versions are only left to evict
+                if entry.name.endswith((".npz", ".npy")):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return sorted(entries)
+
+    def evict(self):
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def stats(self) -> dict[str, Any]:
+        entries = self.entries()
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(entries),
+            "nbytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else None,
+        }
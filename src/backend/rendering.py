@@ -0,0 +1,302 @@
+from typing import *
+
+from backend.caching import dataset_lock
+from backend.options import *
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.colors import Colormap, LogNorm, Normalize, SymLogNorm
+from yt.funcs import matplotlib_style_context
+import contextlib
+import math
+import numpy as np
+import time
+
+# seconds a preview may take before the next one is made coarser
+PREVIEW_BUDGET = 0.1
+
+# preview buffer = full buffer // factor, adapted between these
+PREVIEW_FACTORS = (2, 4, 8, 16)
+
+def plot_lock(plot) -> ContextManager:
+    """
+    dataset_lock of the plot's dataset, nothing for plots without one.
+    """
+    ds = getattr(plot, "ds", None)
+    if ds is None:
+        ds = getattr(getattr(plot, "data_source", None), "ds", None)
+    return dataset_lock(ds) if ds is not None else contextlib.nullcontext()
+
+def figure_rgba(plot, field=None) -> np.ndarray:
+    """
+    Draws the figure of one of the plot's fields, the first by default, into
+    an in-memory Agg canvas & returns the canvas' RGBA buffer as an array,
+    without copying it.
+
+    Replaces the plot.save() -> QImage(path) round trip, no PNG is encoded or
+    written to disk. Use plot.save() for actual exports.
+    """
+    with plot_lock(plot):
+        plot.render()
+    if field is None:
+        figure = next(iter(plot.plots.values())).figure
+    else:
+        figure = plot.plots[field].figure
+    # A fresh canvas per render, the previous image may still point into the
+    # old canvas' buffer.
+    canvas = FigureCanvasAgg(figure)
+    with matplotlib_style_context():
+        canvas.draw()
+    return np.asarray(canvas.buffer_rgba())
+
+_luts: dict[str, np.ndarray] = dict()
+
+def colormap_lut(cmap: Colormap) -> np.ndarray:
+    """
+    256 entry RGBA lookup table for a matplotlib colormap, cached by name.
+    """
+    lut = _luts.get(cmap.name)
+    if lut is None:
+        lut = cmap(np.linspace(0.0, 1.0, 256), bytes=True)
+        _luts[cmap.name] = lut
+    return lut
+
+def _limit(value: Any) -> Optional[float]:
+    # yt also accepts "min"/"max" & unyt quantities as color limits
+    if value is None or isinstance(value, str):
+        return None
+    return float(value)
+
+def resolve_norm(handler, values: np.ndarray, vmin: Optional[float] = None,
+                 vmax: Optional[float] = None) -> Normalize:
+    """
+    The matplotlib norm yt would draw values with, following
+    NormHandler.get_norm(): the handler's own norm or norm type if set, else
+    log for strictly positive data, symlog if it reaches zero or below &
+    linear if it is flat. Limits left out follow the finite values.
+    """
+    if handler.norm is not None:
+        return handler.norm
+    finite = np.isfinite(values)
+    if vmin is None:
+        vmin = float(values[finite].min()) if finite.any() else 1.0
+    if vmax is None:
+        vmax = float(values[finite].max()) if finite.any() else 1.0
+    if handler.dynamic_range is not None:
+        vmin, vmax = handler.get_dynamic_range(vmin, vmax)
+    if handler.norm_type is not None:
+        norm_type = handler.norm_type
+    elif not handler.prefer_log or vmin == vmax or not finite.any():
+        norm_type = Normalize
+    elif vmin <= 0:
+        norm_type = SymLogNorm
+    else:
+        norm_type = LogNorm
+    if norm_type is SymLogNorm:
+        linthresh = handler.linthresh
+        if linthresh is None:
+            linthresh = handler._guess_linthresh(values[finite])
+        elif hasattr(linthresh, "units"):
+            linthresh = handler.to_float(linthresh)
+        return SymLogNorm(float(linthresh), vmin=vmin, vmax=vmax, base=10)
+    return norm_type(vmin=vmin, vmax=vmax)
+
+def colorize(values: np.ndarray, cmap: Colormap, norm: Normalize) -> np.ndarray:
+    """
+    Maps a 2D array to (height, width, 4) uint8 RGBA through a lookup table.
+
+    Pixels the norm can't place, non-finite or not positive under a log norm,
+    get the colormap's "bad" color.
+    """
+    values = np.asarray(values, dtype="float64")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scaled = np.ma.filled(norm(values), np.nan)
+    bad = ~np.isfinite(scaled)
+
+    index = np.nan_to_num(scaled * 256.0, nan=0.0)
+    np.clip(index, 0, 255, out=index)
+    rgba = colormap_lut(cmap)[index.astype("uint8")]
+    rgba[bad] = np.array(cmap.get_bad()) * 255
+    return rgba
+
+def frb_rgba(plot, field=None) -> np.ndarray:
+    """
+    Fast path for pan & zoom, skips matplotlib entirely.
+
+    Colormaps the plot's fixed resolution buffer directly, so no axes,
+    colorbar or annotations are drawn. Plots without a buffer (phase plots)
+    fall back to the figure.
+    """
+    frb = getattr(plot, "frb", None)
+    if frb is None:
+        return figure_rgba(plot, field)
+    if field is None:
+        field = plot.fields[0]
+    norm = plot.plots[field].norm_handler
+    with plot_lock(plot):
+        values = frb[field].d
+    return plot_rgba(plot, values, _limit(norm.vmin), _limit(norm.vmax), field)
+
+def tiled_rgba(plot, tiles, field=None) -> np.ndarray:
+    """
+    Like frb_rgba, but composited from a backend.tiles.TilePyramid. Tiles
+    hold values in default units, so color limits follow the visible data.
+    Plots that can't be tiled use frb_rgba.
+    """
+    values = tiles.composite(plot, field)
+    if values is None:
+        return frb_rgba(plot, field)
+    return plot_rgba(plot, values, field=field)
+
+def plot_rgba(plot, values: np.ndarray, vmin: Optional[float] = None,
+              vmax: Optional[float] = None, field=None) -> np.ndarray:
+    """
+    Colors buffer-shaped values with the colormap & scaling of one of the
+    plot's fields, the first by default, & orients them the way the plot is
+    displayed.
+    """
+    handlers = plot.plots[field if field is not None else plot.fields[0]]
+    norm = resolve_norm(handlers.norm_handler, values, vmin, vmax)
+
+    rgba = colorize(values, handlers.colorbar_handler.cmap, norm)
+    # The buffer's first row is the bottom of the plot
+    rgba = rgba[::-1]
+    if plot._has_swapped_axes:
+        rgba = rgba.transpose(1, 0, 2)[::-1, ::-1]
+    if plot._flip_horizontal:
+        rgba = rgba[:, ::-1]
+    if plot._flip_vertical:
+        rgba = rgba[::-1]
+    return np.ascontiguousarray(rgba)
+
+def field_rgba(plot, mode: RenderModeOption, field=None, tiles=None) -> np.ndarray:
+    match mode:
+        case RenderModeOption.INTERACTIVE:
+            return frb_rgba(plot, field)
+        case RenderModeOption.TILED:
+            return frb_rgba(plot, field) if tiles is None else tiled_rgba(plot, tiles, field)
+        case _:
+            return figure_rgba(plot, field)
+
+def plot_fields(plot) -> list:
+    fields = getattr(plot, "fields", None)
+    return list(fields) if fields else [None]
+
+def select_fields(plot, fields: list):
+    """
+    Reads every field of a slice plot from its data source in one pass over
+    the data, instead of one pass per field when each is pixelized.
+    Projections already compute all their fields together.
+    """
+    source = getattr(plot, "data_source", None)
+    if source is None or getattr(source, "_type_name", None) != "slice":
+        return
+    with plot_lock(plot):
+        missing = [field for field in fields if field not in source.field_data]
+        if len(missing) > 1:
+            source.get_data(missing)
+
+def grid_shape(count: int) -> tuple[int, int]:
+    """
+    Rows & columns of the near-square grid count per-field images fill.
+    """
+    columns = math.ceil(math.sqrt(count))
+    return math.ceil(count / columns), columns
+
+def data_extent(plot, mode: RenderModeOption) -> tuple[float, float, float, float]:
+    """
+    Where the data sits in a field's image, as (left, top, right, bottom)
+    fractions of it. Annotated figures leave room for axes & colorbar, read
+    from the axes of the figure last rendered; other modes are all data.
+    """
+    if mode is not RenderModeOption.ANNOTATED or not getattr(plot, "_plot_valid", False):
+        return (0.0, 0.0, 1.0, 1.0)
+    axes = next(iter(plot.plots.values())).axes
+    left, bottom, right, top = axes.get_position().extents
+    return (float(left), float(1 - top), float(right), float(1 - bottom))
+
+def grid_rgba(images: list[np.ndarray], count: int) -> np.ndarray:
+    """
+    Lays out per-field images row by row in a near-square grid of count
+    cells, each as large as the largest image. Cells without an image yet
+    stay transparent.
+    """
+    rows, columns = grid_shape(count)
+    height = max(image.shape[0] for image in images)
+    width = max(image.shape[1] for image in images)
+    grid = np.zeros((rows * height, columns * width, 4), dtype="uint8")
+    for index, image in enumerate(images):
+        row, column = divmod(index, columns)
+        grid[row * height:row * height + image.shape[0],
+             column * width:column * width + image.shape[1]] = image
+    return grid
+
+def rgba_as(plot, mode: RenderModeOption, tiles=None,
+            on_partial: Optional[Callable[[np.ndarray], None]] = None) -> np.ndarray:
+    """
+    Renders a plot to a contiguous (height, width, 4) uint8 RGBA array, the
+    contents of Data.IMAGE. Tiled rendering needs a TilePyramid, without one
+    it is the same as interactive.
+
+    Plots of several fields render to a grid of per-field images, all read
+    from the data in one selection. on_partial gets the grid after every
+    field but the last, with the fields still to come left blank. Annotated
+    figures are all drawn by the first plot.render(), so their partial grids
+    only spread the compositing, not the rendering.
+    """
+    fields = plot_fields(plot)
+    if len(fields) == 1:
+        return field_rgba(plot, mode, fields[0], tiles)
+    select_fields(plot, fields)
+    images = list()
+    for field in fields:
+        images.append(field_rgba(plot, mode, field, tiles))
+        if on_partial is not None and len(images) < len(fields):
+            on_partial(grid_rgba(images, len(fields)))
+    return grid_rgba(images, len(fields))
+
+class ProgressiveRenderer:
+    """
+    Renders a coarse preview before the full image.
+
+    The preview goes through the fast path (frb_rgba) with the plot's buffer
+    size divided by a factor, which is made coarser whenever a preview takes
+    longer than `budget` seconds & finer when it takes under a quarter of it.
+    The full image is only rendered, & only returned, while the job is still
+    the newest on its worker, so a pan or zoom in the meantime drops it.
+    Previews of several fields cover all of them, so per-field partial
+    images only go to on_preview when no preview is made.
+    """
+    def __init__(self, budget: float = PREVIEW_BUDGET):
+        self.budget = budget
+        self.level = 1
+
+    def render(self, job, plot, mode: RenderModeOption,
+               on_preview: Callable[[np.ndarray], None], tiles=None) -> Optional[np.ndarray]:
+        full = getattr(plot, "buff_size", None)
+        # checked on the class, reading plot.frb would pixelize at full size
+        if full is None or not hasattr(type(plot), "frb"):
+            return rgba_as(plot, mode, tiles, on_preview)
+        # tiles only pixelize what is new, a preview would not be faster
+        if mode is RenderModeOption.TILED and tiles is not None:
+            return rgba_as(plot, mode, tiles, on_preview)
+        factor = PREVIEW_FACTORS[self.level]
+        start = time.perf_counter()
+        plot.set_buff_size(tuple(max(1, int(n) // factor) for n in full))
+        try:
+            preview = rgba_as(plot, RenderModeOption.INTERACTIVE)
+        finally:
+            plot.set_buff_size(full)
+        self.adapt(time.perf_counter() - start)
+        on_preview(preview)
+
+        if job.stale():
+            return None
+        image = rgba_as(plot, mode, tiles)
+        # a newer view arrived while refining, its own preview is on the way
+        return None if job.stale() else image
+
+    def adapt(self, seconds: float):
+        if seconds > self.budget:
+            self.level = min(self.level + 1, len(PREVIEW_FACTORS) - 1)
+        elif seconds < self.budget / 4:
+            self.level = max(self.level - 1, 0)
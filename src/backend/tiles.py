@@ -0,0 +1,156 @@
+from typing import *
+
+from backend.caching import LRUCache, dataset_lock
+from backend.fields import requested_parameters
+from backend.render_cache import canonical
+
+import hashlib
+import math
+import os
+import threading
+import numpy as np
+import yt
+
+TILE_SIZE = 256
+
+TILE_CACHE_BYTES = 512 << 20
+
+# 2**MAX_LEVEL tiles across the domain, ~1e8 times deeper than level 0
+MAX_LEVEL = 18
+
+TileKey = tuple[Hashable, int, int, int]
+
+def source_key(plot, field: tuple[str, str]) -> Optional[Hashable]:
+    """
+    Describes the 2D data an axis-aligned slice or projection plot pixelizes,
+    stable across plots & processes. None for plots that can't be tiled.
+
+    Like the projection cache key, the center only counts if the field
+    depends on it, e.g. radial velocity, so other fields share tiles across
+    centers.
+    """
+    if not isinstance(plot, (yt.AxisAlignedSlicePlot, yt.AxisAlignedProjectionPlot)):
+        return None
+    source = plot.data_source
+    ds = source.ds
+    selector = getattr(source, "data_source", None)
+    match source._type_name:
+        case "slice":
+            description = ("slice", source.axis, float(source.coord.to("code_length")))
+        case "proj" | "quad_proj":
+            description = ("proj", source.axis, repr(source.weight_field), source.method, source.moment,
+                           getattr(selector, "max_level", None))
+        case _:
+            return None
+    depends = requested_parameters(ds, [field], getattr(source, "weight_field", None))
+    parameters = {name: value for name, value in source.field_parameters.items() if name != "center"}
+    return (
+        ds.unique_identifier,
+        str(ds),
+        description,
+        repr(selector) if selector is not None else None,
+        repr(field),
+        canonical(parameters),
+        canonical(source.center) if "center" in depends else None,
+    )
+
+class TilePyramid:
+    """
+    Multi-resolution tiles of slice & projection plots.
+
+    Level L splits the domain's extent along the two image axes into 2**L x
+    2**L tiles of TILE_SIZE pixels, so tile (L, i, j) holds raw field values
+    pixelized over a fixed patch of the domain. Views are composited from the
+    coarsest level at least as fine as the view's pixels, so revisiting an
+    area, or zooming back out, reuses tiles & only newly exposed tiles are
+    pixelized.
+
+    Tiles are kept in memory up to max_bytes and, with a directory, saved as
+    .npy files that outlive the session. Values are stored in the field's
+    default units; colormap & scaling are applied when compositing.
+
+    Used from the render workers of every view pane, tiles are pixelized
+    holding the dataset's lock.
+    """
+    def __init__(self, max_bytes: int = TILE_CACHE_BYTES, directory: Optional[str] = None):
+        self.cache = LRUCache(max_bytes, lambda tile: tile.nbytes)
+        self.directory = directory
+        self.rendered = 0
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def path(self, key: TileKey) -> str:
+        name = hashlib.sha1(repr(key).encode()).hexdigest()
+        return os.path.join(self.directory, name + ".npy")
+
+    def tile(self, source, field: tuple[str, str], key: TileKey,
+             bounds: tuple[float, float, float, float]) -> np.ndarray:
+        tile = self.cache.get(key)
+        if tile is not None:
+            return tile
+        if self.directory is not None and os.path.exists(self.path(key)):
+            tile = np.load(self.path(key))
+        else:
+            with dataset_lock(source.ds):
+                frb = yt.FixedResolutionBuffer(source, bounds, (TILE_SIZE, TILE_SIZE))
+                tile = np.asarray(frb[field].d, dtype="float32")
+            self.rendered += 1
+            if self.directory is not None:
+                # another view pane may write the same tile
+                partial = f"{self.path(key)}.{threading.get_ident()}.part"
+                with open(partial, "wb") as f:
+                    np.save(f, tile)
+                os.replace(partial, self.path(key))
+        self.cache.put(key, tile)
+        return tile
+
+    def composite(self, plot, field: Optional[tuple[str, str]] = None) -> Optional[np.ndarray]:
+        """
+        Values of one of the plot's fields, the first by default, in its
+        current view, sized like its buffer, with the first row at the bottom
+        like a fixed resolution buffer. None if the plot can't be tiled.
+        """
+        if field is None:
+            field = plot.fields[0]
+        key = source_key(plot, field)
+        if key is None:
+            return None
+        source = plot.data_source
+        ds = source.ds
+        xax = ds.coordinates.x_axis[source.axis]
+        yax = ds.coordinates.y_axis[source.axis]
+        left = ds.domain_left_edge.to("code_length").d[[xax, yax]]
+        extent = ds.domain_width.to("code_length").d[[xax, yax]]
+        x0, x1 = (float(lim.to("code_length")) for lim in plot.xlim)
+        y0, y1 = (float(lim.to("code_length")) for lim in plot.ylim)
+        nx, ny = (int(n) for n in plot.buff_size)
+
+        # coarsest level whose pixels are no bigger than the view's
+        pixel = min((x1 - x0) / nx / extent[0], (y1 - y0) / ny / extent[1])
+        level = min(max(math.ceil(math.log2(1.0 / (pixel * TILE_SIZE))), 0), MAX_LEVEL)
+        tiles = 1 << level
+        tile_width = extent / tiles
+
+        # pixel centers of the view, in tile pixels of this level
+        px = ((x0 + (np.arange(nx) + 0.5) * (x1 - x0) / nx) - left[0]) / tile_width[0] * TILE_SIZE
+        py = ((y0 + (np.arange(ny) + 0.5) * (y1 - y0) / ny) - left[1]) / tile_width[1] * TILE_SIZE
+        px = np.floor(px).astype("int64")
+        py = np.floor(py).astype("int64")
+
+        values = np.full((ny, nx), np.nan, dtype="float32")
+        inside_x = (px >= 0) & (px < tiles * TILE_SIZE)
+        inside_y = (py >= 0) & (py < tiles * TILE_SIZE)
+        for i in np.unique(px[inside_x] // TILE_SIZE):
+            columns = np.nonzero(inside_x & (px // TILE_SIZE == i))[0]
+            for j in np.unique(py[inside_y] // TILE_SIZE):
+                rows = np.nonzero(inside_y & (py // TILE_SIZE == j))[0]
+                bounds = (
+                    left[0] + i * tile_width[0], left[0] + (i + 1) * tile_width[0],
+                    left[1] + j * tile_width[1], left[1] + (j + 1) * tile_width[1],
+                )
+                tile = self.tile(source, field, (key, level, int(i), int(j)), bounds)
+                values[np.ix_(rows, columns)] = tile[np.ix_(py[rows] % TILE_SIZE, px[columns] % TILE_SIZE)]
+        return values
+
+    def stats(self) -> dict[str, Any]:
+        return {**self.cache.stats(), "rendered": self.rendered}
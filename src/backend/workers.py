@@ -0,0 +1,173 @@
+from typing import *
+import queue
+import threading
+import traceback
+
+Dispatch = Callable[[Callable[[], None]], None]
+
+class Job:
+    """
+    Handle given to a task while it runs on a Worker.
+
+    A job becomes stale as soon as a newer job of the same kind is submitted to
+    the same worker (or the worker is cancelled). Tasks check stale() between
+    expensive steps and skip whatever work only matters for the newest request,
+    e.g. rendering pixels. Jobs of other kinds sharing the worker, e.g.
+    centering & loading, don't supersede each other.
+    """
+    def __init__(self, worker: "Worker", ticket: int, task: Callable[["Job"], Any],
+                 on_done: Optional[Callable[[Any], None]], kind: Hashable = None,
+                 on_error: Optional[Callable[[Exception], None]] = None):
+        self.worker = worker
+        self.ticket = ticket
+        self.task = task
+        self.on_done = on_done
+        self.on_error = on_error
+        self.kind = kind
+        # created on the submitting thread, see EventBroker.bind
+        self.call = worker.bind(lambda callback, *args: callback(*args))
+
+    def stale(self) -> bool:
+        return self.ticket != self.worker.newest.get(self.kind) or self.ticket <= self.worker.cancelled
+
+    def deliver(self, callback: Callable[..., None], *args):
+        """
+        Runs callback(*args) on the thread owning the broker.
+        """
+        self.worker.dispatch(lambda: self.call(callback, *args))
+
+    def fail(self, error: Exception) -> bool:
+        """
+        Delivers error to on_error, unless the job is stale. Returns whether
+        there was an on_error to deliver to.
+        """
+        if self.on_error is None:
+            return False
+        if not self.stale():
+            self.deliver(self.on_error, error)
+        return True
+
+class Worker:
+    """
+    Runs tasks one at a time, in submission order, on a dedicated thread.
+
+    yt plot objects are not thread safe, so every task touching a plot goes
+    through the same worker. Idle tasks, such as pre-rendering, only start
+    when no other task is queued. Results are handed to `dispatch`, which is
+    responsible for getting them back onto the GUI thread (see
+    components.ui.MainThreadDispatcher). The broker itself is only ever touched
+    from that thread. `bind` wraps the callbacks delivered for a job,
+    see EventBroker.bind.
+    """
+    def __init__(self, dispatch: Dispatch, name: str = "render-worker",
+                 bind: Callable[[Callable], Callable] = lambda callback: callback):
+        self.dispatch = dispatch
+        self.bind = bind
+        self.latest = 0
+        # newest ticket of each kind, & the newest cancelled
+        self.newest: dict[Hashable, int] = dict()
+        self.cancelled = 0
+        self.context: dict[str, Any] = dict()
+
+        self._lock = threading.Lock()
+        # (idle, ticket, job), idle jobs after the others & each in order
+        self._jobs: "queue.PriorityQueue[tuple[bool, int, Job]]" = queue.PriorityQueue()
+        self._waiting = 0
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, task: Callable[[Job], Any], on_done: Optional[Callable[[Any], None]] = None,
+               kind: Hashable = None, idle: bool = False,
+               on_error: Optional[Callable[[Exception], None]] = None) -> int:
+        """
+        Queues task(job). If it returns something other than None, on_done is
+        called with the result on the dispatch thread, if it raises, on_error
+        is called with the exception, unless the job went stale. Only a newer
+        job of the same kind makes it stale. Idle jobs wait for every other
+        queued job.
+        """
+        with self._lock:
+            self.latest += 1
+            self.newest[kind] = self.latest
+            job = Job(self, self.latest, task, on_done, kind, on_error)
+            self._jobs.put((idle, job.ticket, job))
+            if not idle:
+                self._waiting += 1
+        return job.ticket
+
+    def busy(self) -> bool:
+        """
+        Whether jobs other than idle ones are waiting, for idle jobs to give way.
+        """
+        return self._waiting > 0
+
+    def _next(self) -> Job:
+        idle, _, job = self._jobs.get()
+        if not idle:
+            with self._lock:
+                self._waiting -= 1
+        return job
+
+    def cancel(self):
+        """
+        Marks every queued & running job as stale, whatever its kind.
+        """
+        with self._lock:
+            self.cancelled = self.latest
+
+    def _run(self):
+        while True:
+            job = self._next()
+            try:
+                result = job.task(job)
+            except Exception as error:
+                traceback.print_exc()
+                job.fail(error)
+                continue
+            if result is not None and job.on_done is not None:
+                job.deliver(job.on_done, result)
+
+class InlineWorker(Worker):
+    """
+    Worker without a thread, for scripts & batch jobs with no event loop.
+
+    Submitted tasks are queued like on a Worker, and run on the calling thread
+    by run_pending(). Results are delivered immediately, so superseded jobs
+    are still skipped when several requests are published before running.
+    """
+    def __init__(self, name: str = "inline-worker",
+                 bind: Callable[[Callable], Callable] = lambda callback: callback):
+        self.dispatch: Dispatch = lambda callback: callback()
+        self.bind = bind
+        self.latest = 0
+        self.newest: dict[Hashable, int] = dict()
+        self.cancelled = 0
+        self.context: dict[str, Any] = dict()
+        self.name = name
+
+        self._lock = threading.Lock()
+        self._jobs: "queue.PriorityQueue[tuple[bool, int, Job]]" = queue.PriorityQueue()
+        self._waiting = 0
+
+    def pending(self) -> bool:
+        """
+        Whether tasks are queued, e.g. by another worker's callbacks.
+        """
+        return not self._jobs.empty()
+
+    def run_pending(self):
+        """
+        Runs queued tasks until none are left, including tasks submitted by
+        the callbacks of earlier ones. Exceptions of jobs without on_error
+        propagate to the caller.
+        """
+        while self.pending():
+            job = self._next()
+            try:
+                result = job.task(job)
+            except Exception as error:
+                if job.fail(error):
+                    continue
+                raise
+            if result is not None and job.on_done is not None:
+                job.deliver(job.on_done, result)
@@ -0,0 +1,65 @@
+"""
+Publish/notify/query throughput of EventBroker.
+
+    python -m benchmarks.broker_dispatch [--subscribers N] [--repeat N] [--instrument]
+
+Run from src. Subscribers do no work, so the numbers are the broker's own
+overhead per call.
+"""
+from typing import *
+
+from backend.info_handling import *
+from backend.options import *
+
+import argparse
+import timeit
+
+class Sink(Subscriber):
+    def handle_update(self, name: V3Option):
+        pass
+
+class Source(Publisher):
+    def __init__(self, broker: EventBroker):
+        super().__init__(broker)
+        for topic in (PlotOption, SliceProjPlotOption, ParticlePlotOption, Data, UserAction):
+            for op in topic:
+                self.add_field(op)
+
+def setup(subscribers: int, instrument: bool = False) -> EventBroker:
+    broker = EventBroker()
+    if instrument:
+        broker.instrument()
+    Source(broker)
+    for _ in range(subscribers):
+        Sink(broker).subscribe([PlotOption.CENTER, Data.IMAGE, UserAction.ZOOM])
+    return broker
+
+def cases(broker: EventBroker) -> dict[str, Callable[[], Any]]:
+    sink = Sink(broker)
+    return {
+        "publish + notify": lambda: broker.publish(PlotOption.CENTER, (0.5, 0.5, 0.5)),
+        "publish, no subscribers": lambda: broker.publish(PlotOption.WIDTH, 1.0),
+        "query": lambda: broker.query(PlotOption.CENTER),
+        "query default": lambda: broker.query(PlotOption.FONT_SIZE),
+        "query consumed": lambda: broker.query(UserAction.ZOOM),
+        "publish + query action": lambda: (broker.publish(UserAction.PAN_X, 1.0), broker.query(UserAction.PAN_X)),
+        "subscribe again": lambda: sink.subscribe([PlotOption.CENTER]),
+    }
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--subscribers", type=int, default=8, help="subscribers per topic")
+    parser.add_argument("--repeat", type=int, default=5, help="best of this many runs")
+    parser.add_argument("--number", type=int, default=100_000, help="calls per run")
+    parser.add_argument("--instrument", action="store_true", help="measure an instrumented broker")
+    args = parser.parse_args(argv)
+
+    broker = setup(args.subscribers, args.instrument)
+    instrumented = ", instrumented" if args.instrument else ""
+    print(f"{args.subscribers} subscribers, best of {args.repeat} x {args.number} calls{instrumented}")
+    for label, call in cases(broker).items():
+        best = min(timeit.repeat(call, number=args.number, repeat=args.repeat))
+        print(f"{label:>26}: {best / args.number * 1e9:8.1f} ns/call {args.number / best:12,.0f} calls/s")
+
+if __name__ == "__main__":
+    main()
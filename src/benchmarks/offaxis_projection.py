@@ -0,0 +1,81 @@
+"""
+Off-axis projection time, serial yt against an OffAxisPool.
+
+    python -m benchmarks.offaxis_projection [DATASET] [--field FIELD] [--workers N]
+                                            [--angles N] [--resolution N] [--size N]
+
+Run from src. Without a dataset, a random uniform grid of size**3 cells is
+written to a temporary folder. The view is rotated about the z axis through
+angles normals, the first projection of the pool includes loading the
+dataset in its workers. Images are compared with the serial ones.
+"""
+from typing import *
+
+from backend.offaxis import OffAxisPool
+from backend.plot_management import build_plot
+from backend.options import *
+
+from ast import literal_eval
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+import yt
+
+def synthetic_dataset(folder: str, size: int) -> str:
+    rng = np.random.default_rng(0)
+    ds = yt.load_uniform_grid({"density": (rng.random((size, size, size)), "g/cm**3")},
+                              (size, size, size), nprocs=64)
+    grid = ds.covering_grid(0, ds.domain_left_edge, ds.domain_dimensions)
+    return grid.save_as_dataset(os.path.join(folder, "grid.h5"), fields=[("gas", "density")])
+
+def normals(angles: int) -> list[tuple[float, float, float]]:
+    return [
+        (float(np.cos(theta)), float(np.sin(theta)), 0.3)
+        for theta in np.linspace(0.1, np.pi / 2, angles)
+    ]
+
+def project(ds, field, normal, resolution: int, off_axis: Optional[OffAxisPool]) -> tuple[np.ndarray, float]:
+    request = {
+        "plot_type": PlotTypeOption.PROJECTION_PLOT,
+        "args": (ds, normal, field),
+        "params": {"buff_size": (resolution, resolution)},
+    }
+    start = time.perf_counter()
+    plot = build_plot(request, off_axis=off_axis)
+    image = plot.frb[plot.fields[0]].d
+    return image, time.perf_counter() - start
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("dataset", nargs="?", help="dataset to project, a synthetic grid if left out")
+    parser.add_argument("--field", default="('grid', 'density')", help="field to project")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="pool processes")
+    parser.add_argument("--angles", type=int, default=4, help="normals to rotate through")
+    parser.add_argument("--resolution", type=int, default=512, help="image size in pixels")
+    parser.add_argument("--size", type=int, default=128, help="cells along each side of the synthetic grid")
+    args = parser.parse_args(argv)
+    yt.set_log_level(40)
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = args.dataset if args.dataset is not None else synthetic_dataset(folder, args.size)
+        ds = yt.load(path)
+        field = literal_eval(args.field) if args.field.startswith("(") else args.field
+        off_axis = OffAxisPool(args.workers)
+        print(f"{path}, {args.resolution}**2 pixels, {args.workers} workers")
+        try:
+            for i, normal in enumerate(normals(args.angles)):
+                serial, serial_time = project(ds, field, normal, args.resolution, None)
+                parallel, parallel_time = project(ds, field, normal, args.resolution, off_axis)
+                both = serial != 0
+                error = np.max(np.abs(parallel[both] - serial[both]) / np.abs(serial[both])) if both.any() else 0.0
+                cold = " (cold)" if i == 0 else ""
+                print(f"normal {np.round(normal, 2)}: serial {serial_time:7.3f} s, "
+                      f"pool {parallel_time:7.3f} s{cold}, speedup {serial_time / parallel_time:5.2f}, "
+                      f"max rel error {error:.1e}")
+        finally:
+            off_axis.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,15 @@
 from PySide6 import QtCore
 from PySide6.QtCore import QRegularExpression
-from PySide6.QtGui import QPixmap, QImage, QRegularExpressionValidator
+from PySide6.QtGui import QIcon, QPixmap, QImage, QRegularExpressionValidator
 from PySide6.QtWidgets import *
 
-from components.ui import QAdjustable
+from components.ui import FieldListModel, FieldListPicker, ImageViewport, QAdjustable, image_from_buffer
+from backend.history import HISTORY_BYTES, THUMBNAIL_SIZE, PlotHistory
 from backend.info_handling import *
+from backend.instrumentation import Instrumentation
+from backend.loading import LOAD_FAILED
 from backend.options import *
+from backend.regions import ellipsoid_axes
 
 from ast import literal_eval
 import yt, re
@@ -15,16 +19,21 @@ class MakePlotPanel(Publisher, Subscriber, QAdjustable):
     """
     Gives options related to plot creation, depending on selected plot type.
 
+    View panes share one field_model, made here if not given.
+
     TODO:
         Implement functionality for options in options.PlotOption
     """
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, field_model: Optional[FieldListModel] = None, **kwargs):
         super().__init__(*args, **kwargs)
         QAdjustable.__init__(self)
+        self.field_model = field_model
 
         for op in PlotOption:
             self.add_field(op)
+
+        self.subscribe([Data.LOAD_PROGRESS])
         
         self.__init_layout__()
 
@@ -43,10 +52,14 @@ class MakePlotPanel(Publisher, Subscriber, QAdjustable):
         self.widgets.update({PlotOption.PLOT_TYPE: plot_type})
         plot_type.currentIndexChanged.connect(self.plot_type_handler)
 
-        sliceprojpane = SliceProjectionPlotPanel(self.broker)
+        # one field list for every picker, filled once per dataset
+        if self.field_model is None:
+            self.field_model = FieldListModel(self.broker)
+
+        sliceprojpane = SliceProjectionPlotPanel(self.broker, self.field_model)
         self.widgets.update({PlotTypeOption.SLICE_PLOT: sliceprojpane})
 
-        particlepane = ParticlePlotPanel(self.broker)
+        particlepane = ParticlePlotPanel(self.broker, self.field_model)
         self.widgets.update({PlotTypeOption.PARTICLE_PLOT: particlepane})
         particlepane.setVisible(False)
 
@@ -54,28 +67,50 @@ class MakePlotPanel(Publisher, Subscriber, QAdjustable):
         fp_layout = QVBoxLayout(file_pane)
 
         self.f = QFileDialog(self)
+        self.f.fileSelected.connect(self.file_selected)
 
         self.open_type = QListWidget()
-        self.open_type.addItems(["Folder", "File"])
+        self.open_type.addItems(["Folder", "File", "Series folder"])
         self.open_type.currentItemChanged.connect(self.file_type_handler)
         h = self.open_type.sizeHintForRow(0)
-        self.open_type.setFixedHeight(2 * h + 10)
+        self.open_type.setFixedHeight(3 * h + 10)
 
         file_dialog = QPushButton("Open File/Folder")
         file_dialog.clicked.connect(self.open_file_dialog)
 
+        load_region = QWidget()
+        load_layout = QHBoxLayout(load_region)
+        self.load_progress = QProgressBar()
+        self.load_progress.setTextVisible(True)
+        cancel_load = QPushButton("Cancel")
+        cancel_load.clicked.connect(self.cancel_load)
+        load_layout.addWidget(self.load_progress)
+        load_layout.addWidget(cancel_load)
+        load_region.setVisible(False)
+        self.load_region = load_region
+
         fp_layout.addWidget(self.open_type)
         fp_layout.addWidget(file_dialog)
+        fp_layout.addWidget(load_region)
 
         file_pane.setLayout(fp_layout)
 
         self.widgets.update({PlotOption.DATASET: file_pane})
 
+        center_method = QComboBox()
+        center_method.addItems(["Center: star mean", "Center: star mass-weighted",
+                                "Center: max density", "Center: star subsampled"])
+        self.widgets.update({PlotOption.CENTER_METHOD: center_method})
+        center_method.currentIndexChanged.connect(self.center_method_handler)
+
+        data_object = DataObjectPanel(self.broker)
+        self.widgets.update({PlotOption.DATA_SOURCE: data_object})
+
         width_tuple = QLineEdit("")
         validator = QRegularExpressionValidator(QRegularExpression("^\([0-9]+(, k?pc)?\)(,\([0-9]+(, pc|kpc)?\))?$"))
         width_tuple.setValidator(validator)
         self.widgets.update({PlotOption.WIDTH: width_tuple})
-        width_tuple.textChanged.connect(self.width_handler())
+        width_tuple.textChanged.connect(self.width_handler)
 
         self.widgets.update({PlotOption.WIDTH: width_tuple})
         make_plot = QPushButton("Make plot")
@@ -107,31 +142,52 @@ class MakePlotPanel(Publisher, Subscriber, QAdjustable):
     @QtCore.Slot()
     def file_type_handler(self):
         index = self.open_type.currentRow()
-        if index == 0:
-            self.f.setFileMode(QFileDialog.FileMode.Directory)
-        else:
+        if index == 1:
             self.f.setFileMode(QFileDialog.FileMode.ExistingFile)
+        else:
+            self.f.setFileMode(QFileDialog.FileMode.Directory)
+
+    @QtCore.Slot()
+    def center_method_handler(self):
+        center_method = self.widgets.get(PlotOption.CENTER_METHOD)
+        if type(center_method) is QComboBox:
+            self.publish(PlotOption.CENTER_METHOD, list(CenterMethodOption)[center_method.currentIndex()])
 
     @QtCore.Slot()
     def open_file_dialog(self):
-        self.f.exec()
-        s = self.f.selectedFiles()[0]
-        if s is not None:
-            fields = self.query(PlotOption.CELL_FIELDS)
-            epf = self.query(PlotOption.EPF)
-            ds = yt.load(s, fields = fields, extra_particle_fields = epf)
-            self.calculate_center(ds)
-            center = self.query(PlotOption.CENTER)
-            self.publish(PlotOption.CENTER, center)
-            self.publish(PlotOption.DATASET, ds)
-
-    def calculate_center(self, ds):
-        ad = ds.all_data()
-        x = np.mean(np.array(ad["star", "particle_position_x"]))
-        y = np.mean(np.array(ad["star", "particle_position_y"]))
-        z = np.mean(np.array(ad["star", "particle_position_z"]))
-        ctr = np.array([x, y, z])
-        self.publish(PlotOption.CENTER, ctr)
+        self.f.open()
+
+    @QtCore.Slot(str)
+    def file_selected(self, path: str):
+        if path != "":
+            if self.open_type.currentRow() == 2:
+                self.publish(UserAction.LOAD_SERIES, path)
+            else:
+                self.load_region.setVisible(True)
+                self.publish(UserAction.LOAD_DATASET, path)
+
+    @QtCore.Slot()
+    def cancel_load(self):
+        self.load_region.setVisible(False)
+        self.publish(UserAction.CANCEL_LOAD, True)
+
+    def handle_update(self, name: V3Option):
+        match name:
+            case Data.LOAD_PROGRESS:
+                progress = self.query(name)
+                if progress is not None:
+                    done, total, description = progress
+                    self.load_progress.setRange(0, total)
+                    self.load_progress.setFormat(description)
+                    if done == LOAD_FAILED:
+                        # the error stays up until dismissed with cancel
+                        self.load_progress.setValue(0)
+                        self.load_region.setVisible(True)
+                    else:
+                        self.load_progress.setValue(done)
+                        self.load_region.setVisible(done < total)
+            case _:
+                pass
 
     @QtCore.Slot()
     def width_handler(self):
@@ -151,15 +207,14 @@ class SliceProjectionPlotPanel(Publisher, Subscriber, QAdjustable):
     TODO:
         Implement functionality for options in options.SliceProjPlotOption
     """
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
+    def __init__(self, broker: EventBroker, field_model: FieldListModel):
+        super().__init__(broker)
         QAdjustable.__init__(self)
+        self.field_model = field_model
 
         for op in SliceProjPlotOption:
             self.add_field(op)
 
-        self.subscribe([PlotOption.DATASET])
-
         self.__init_layout__()
 
     def __init_layout__(self):      
@@ -173,12 +228,13 @@ class SliceProjectionPlotPanel(Publisher, Subscriber, QAdjustable):
         self.widgets.update({SliceProjPlotOption.NORMAL: direction})
         direction.textChanged.connect(self.direction_manager)
         
-        field = QComboBox()
+        field = FieldListPicker()
         self.widgets.update({SliceProjPlotOption.FIELDS: field})
-        field.currentIndexChanged.connect(self.field_manager)
+        self.field_model.attach_list(field, self.field_manager)
 
         weight_field = QComboBox()
         self.widgets.update({PlotOption.WEIGHT_FIELD: weight_field})
+        self.field_model.attach(weight_field, self.weight_field_manager, optional=True)
         weight_field.currentIndexChanged.connect(self.weight_field_manager)
 
         for wgt in self.widgets.values():
@@ -199,34 +255,18 @@ class SliceProjectionPlotPanel(Publisher, Subscriber, QAdjustable):
     @QtCore.Slot()
     def field_manager(self):
         field = self.widgets.get(SliceProjPlotOption.FIELDS)
-        if type(field) is QComboBox:
-            if field.currentText() != "":
-                self.publish(SliceProjPlotOption.FIELDS, literal_eval(field.currentText()))
+        if type(field) is FieldListPicker:
+            fields = field.selected
+            if fields:
+                # one plot renders every selected field
+                self.publish(SliceProjPlotOption.FIELDS, fields if len(fields) > 1 else fields[0])
 
     @QtCore.Slot()
     def weight_field_manager(self):
         field = self.widgets.get(PlotOption.WEIGHT_FIELD)
         if type(field) is QComboBox:
-            if field.currentText() != "":
-                self.publish(PlotOption.WEIGHT_FIELD, literal_eval(field.currentText()))
-
-    def handle_update(self, name):
-        match name:
-            case PlotOption.DATASET:
-                ds = self.query(name)
-                if type(ds) is not None:
-                    field = self.widgets.get(SliceProjPlotOption.FIELDS)
-                    if type(field) is QComboBox:
-                        field.clear()
-                        for entry in ds.derived_field_list:
-                            field.addItem(str(entry))
-
-                    weight_field = self.widgets.get(PlotOption.WEIGHT_FIELD)
-                    if type(weight_field) is QComboBox:
-                        weight_field.clear()
-                        weight_field.addItem("None")
-                        for entry in ds.derived_field_list:
-                            weight_field.addItem(str(entry))
+            if field.currentData() is not None:
+                self.publish(PlotOption.WEIGHT_FIELD, field.currentData())
 
 class ParticlePlotPanel(Publisher, Subscriber, QAdjustable):
     """
@@ -235,15 +275,14 @@ class ParticlePlotPanel(Publisher, Subscriber, QAdjustable):
     TODO:
         Implement functionality for options in options.ParticlePlotOption
     """
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
+    def __init__(self, broker: EventBroker, field_model: FieldListModel):
+        super().__init__(broker)
         QAdjustable.__init__(self)
+        self.field_model = field_model
 
         for op in ParticlePlotOption:
             self.add_field(op)
 
-        self.subscribe([PlotOption.DATASET])
-
         self.__init_layout__()
 
     def __init_layout__(self):      
@@ -263,6 +302,11 @@ class ParticlePlotPanel(Publisher, Subscriber, QAdjustable):
         self.widgets.update({ParticlePlotOption.Z_FIELDS: z_field})
         self.widgets.update({PlotOption.WEIGHT_FIELD: weight_field})
 
+        self.field_model.attach(x_field, self.x_field_manager)
+        self.field_model.attach(y_field, self.y_field_manager)
+        self.field_model.attach(z_field, self.z_field_manager)
+        self.field_model.attach(weight_field, self.weight_field_manager, optional=True)
+
         x_field.currentIndexChanged.connect(self.x_field_manager)
         y_field.currentIndexChanged.connect(self.y_field_manager)
         z_field.currentIndexChanged.connect(self.z_field_manager)
@@ -275,117 +319,396 @@ class ParticlePlotPanel(Publisher, Subscriber, QAdjustable):
     def x_field_manager(self):
         field = self.widgets.get(ParticlePlotOption.X_FIELD)
         if type(field) is QComboBox:
-            if field.currentText() != "":
-                self.publish(ParticlePlotOption.X_FIELD, literal_eval(field.currentText()))
+            if field.currentData() is not None:
+                self.publish(ParticlePlotOption.X_FIELD, field.currentData())
     
     @QtCore.Slot()
     def y_field_manager(self):
         field = self.widgets.get(ParticlePlotOption.Y_FIELD)
         if type(field) is QComboBox:
-            if field.currentText() != "":
-                self.publish(ParticlePlotOption.Y_FIELD, literal_eval(field.currentText()))
+            if field.currentData() is not None:
+                self.publish(ParticlePlotOption.Y_FIELD, field.currentData())
 
     @QtCore.Slot()
     def z_field_manager(self):
         field = self.widgets.get(ParticlePlotOption.Z_FIELDS)
         if type(field) is QComboBox:
-            if field.currentText() != "":
-                self.publish(ParticlePlotOption.Z_FIELDS, literal_eval(field.currentText()))
+            if field.currentData() is not None:
+                self.publish(ParticlePlotOption.Z_FIELDS, field.currentData())
 
     @QtCore.Slot()
     def weight_field_manager(self):
         field = self.widgets.get(PlotOption.WEIGHT_FIELD)
         if type(field) is QComboBox:
-            if field.currentText() != "":
-                self.publish(PlotOption.WEIGHT_FIELD, literal_eval(field.currentText()))
+            if field.currentData() is not None:
+                self.publish(PlotOption.WEIGHT_FIELD, field.currentData())
     
-    def handle_update(self, name):
-        match name:
-            case PlotOption.DATASET:
-                ds = self.query(name)
-                if type(ds) is not None:
-                    boxes = [
-                        self.widgets.get(ParticlePlotOption.X_FIELD),
-                        self.widgets.get(ParticlePlotOption.Y_FIELD),
-                        self.widgets.get(ParticlePlotOption.Z_FIELDS),
-                             ]
-                    for field in boxes:
-                        if type(field) is QComboBox:
-                            field.clear()    
-                            for entry in ds.derived_field_list:
-                                field.addItem(str(entry))
-
-                    weight_field = self.widgets.get(PlotOption.WEIGHT_FIELD)
-                    if type(weight_field) is QComboBox:
-                        weight_field.clear()
-                        weight_field.addItem("None")
-                        for entry in ds.derived_field_list:
-                            weight_field.addItem(str(entry))
-
-                                
-class ImagePanel(Subscriber, QAdjustable):
+
+class ImagePanel(Publisher, Subscriber, QAdjustable):
     """
-    Renders the user-created image.
+    Renders the user-created image, with a strip of recently shown images
+    below it.
 
-    Subscribed to Data.IMAGE, writes new image to screen.
+    Subscribed to Data.IMAGE & Data.VIEW, writes new image to screen & records
+    it in a PlotHistory of history_bytes. Clicking a thumbnail shows its image
+    at once & publishes UserAction.SET_VIEW so the plot follows, rendered anew
+    only if the full image was already evicted.
 
-    TODO: 
-        add a plot history option? maybe should be its own class
+    Dragging the image pans it & the wheel zooms it, shown at once by an
+    ImageViewport; each settled gesture publishes one UserAction.PAN_REL_X,
+    PAN_REL_Y & ZOOM for the plot to follow.
     """
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, history_bytes: int = HISTORY_BYTES, **kwargs):
         super().__init__(*args, **kwargs)
         QAdjustable.__init__(self)
+        self.history = PlotHistory(history_bytes)
+        self.add_field(UserAction.SET_VIEW)
+        self.add_field(UserAction.PAN_REL_X)
+        self.add_field(UserAction.PAN_REL_Y)
+        self.add_field(UserAction.ZOOM)
         self.subscribe([Data.IMAGE])
         self.__init_layout__()
 
     def __init_layout__(self):
-        layout = QHBoxLayout(self)
-        image = self.add_widget("image", QLabel(self))
-        image.setScaledContents(True)
-        layout.addWidget(image)
-    
+        layout = QVBoxLayout(self)
+        image = self.add_widget("image", ImageViewport(self))
+        history = self.add_widget("history", QListWidget(self))
+        history.setViewMode(QListView.ViewMode.IconMode)
+        history.setFlow(QListView.Flow.LeftToRight)
+        history.setWrapping(False)
+        history.setMovement(QListView.Movement.Static)
+        history.setIconSize(QtCore.QSize(THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+        history.setFixedHeight(THUMBNAIL_SIZE + 2 * history.frameWidth() + 24)
+        history.setVisible(False)
+        layout.addWidget(image, 1)
+        layout.addWidget(history)
+
+        history.itemClicked.connect(self.history_handler)
+        image.settled.connect(self.view_handler)
+
     def handle_update(self, name: str):
         match name:
             case Data.IMAGE:
-                self.set_img(self.query(name))
+                image = self.query(name)
+                if image is not None:
+                    view = self.query(Data.VIEW) or {}
+                    self.set_img(image, view)
+                    self.record(view, image)
             case _:
                 pass
     
-    def set_img(self, img: QImage):
-        self.get_widget("image").setPixmap(QPixmap.fromImage(img))
-
-
-# class DataObjectPanel(Publisher, Subscriber, QAdjustable):
-#     def __init__(self, *args, **kwargs):
-#         super().__init__(*args, **kwargs)
-#         QAdjustable.__init__(self)
-#
-#         self.add_field(PlotOption.DATA_SOURCE)
-#         self.add_field(PlotOption.CENTER)
-#
-#         self.subscribe([PlotOption.DATASET])
-#
-#         self.__init_layout__()
-#
-#     def __init_layout__(self):
-#         layout = QVBoxLayout(self)
-#
-#         obj_type = QComboBox()
-#         objs = ["Box", "Disk", "Ellipsoid", "Sphere"]
-#         for obj in objs:
-#             obj_type.addItem(obj)
-#         self.widgets.update({PlotOption.DATA_SOURCE: obj_type})
-#         obj_type.currentIndexChanged.connect(self.object_handler)
-#
-#     def handle_update(self, name):
-#         match name:
-#             case PlotOption.DATASET:
-#                 ds = self.query(name)
-#                 if type(ds) is not None:
-#                     elts = self.widgets.get(PlotOption.DATASET)
-#                     if isinstance(elts, list):
+    def set_img(self, img: np.ndarray, view: dict[str, Any], reset: bool = False):
+        self.get_widget("image").show_image(QPixmap.fromImage(image_from_buffer(img)), view, reset)
+
+    def record(self, view: dict[str, Any], image: np.ndarray):
+        history: QListWidget = self.get_widget("history")
+        appended = self.history.add(view, image)
+        icon = QIcon(QPixmap.fromImage(image_from_buffer(self.history[-1].thumbnail)))
+        if appended:
+            history.addItem(QListWidgetItem(icon, ""))
+        else:
+            history.item(history.count() - 1).setIcon(icon)
+        # entries trimmed from the front of the history
+        while history.count() > len(self.history):
+            history.takeItem(0)
+        history.scrollToBottom()
+        history.setVisible(True)
+
+    @QtCore.Slot(QListWidgetItem)
+    def history_handler(self, item: QListWidgetItem):
+        entry = self.history[self.get_widget("history").row(item)]
+        self.set_img(entry.image if entry.image is not None else entry.thumbnail, entry.view, reset=True)
+        self.publish(UserAction.SET_VIEW, {"view": entry.view, "render": entry.image is None})
+
+    @QtCore.Slot(object)
+    def view_handler(self, change: dict[str, Any]):
+        dx, dy = change["pan_rel"]
+        if dx != 0:
+            self.publish(UserAction.PAN_REL_X, dx)
+        if dy != 0:
+            self.publish(UserAction.PAN_REL_Y, dy)
+        if change["zoom"] != 1:
+            self.publish(UserAction.ZOOM, change["zoom"])
+
+
+class ViewPane(QAdjustable):
+    """
+    One view pane: its ImagePanel under a header to make it the active pane,
+    the one the plot panels edit, & to link its pans & zooms to the other
+    linked panes. The window connects the header's widgets.
+    """
+    def __init__(self, broker: EventBroker, index: int):
+        super().__init__()
+        self.broker = broker
+        self.index = index
+        self.__init_layout__()
+
+    def __init_layout__(self):
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        header = self.add_widget("header", QAdjustable())
+        header_layout = QHBoxLayout(header)
+        header_layout.setContentsMargins(0, 0, 0, 0)
+        header_layout.addWidget(header.add_widget("active", QRadioButton(f"View {self.index + 1}")))
+        header_layout.addWidget(header.add_widget("linked", QCheckBox("Link pan/zoom")))
+
+        layout.addWidget(header)
+        layout.addWidget(self.add_widget("image", ImagePanel(self.broker)), 1)
+
+
+class TimeSeriesPanel(Publisher, Subscriber, QAdjustable):
+    """
+    Steps through the outputs of an opened series & exports them as frames.
+
+    Subscribed to Data.SERIES_POSITION & Data.EXPORT_PROGRESS, hidden until a
+    series is opened. Frames that failed to export are counted on the bar.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        QAdjustable.__init__(self)
+        self.subscribe([Data.SERIES_POSITION, Data.EXPORT_PROGRESS])
+        self.__init_layout__()
+        self.setVisible(False)
+
+    def __init_layout__(self):
+        layout = QVBoxLayout(self)
+
+        step_region = self.add_widget("step_region", QAdjustable())
+        step_layout = QHBoxLayout(step_region)
+        previous = step_region.add_widget("previous", QPushButton("<"))
+        position = step_region.add_widget("position", QLabel(""))
+        following = step_region.add_widget("next", QPushButton(">"))
+        position.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
+        for wgt in step_region.widgets.values():
+            step_layout.addWidget(wgt)
+
+        export_region = self.add_widget("export_region", QAdjustable())
+        export_layout = QHBoxLayout(export_region)
+        export = export_region.add_widget("export", QPushButton("Export frames"))
+        export_progress = export_region.add_widget("export_progress", QProgressBar())
+        cancel_export = export_region.add_widget("cancel_export", QPushButton("Cancel"))
+        export_progress.setVisible(False)
+        cancel_export.setVisible(False)
+        for wgt in export_region.widgets.values():
+            export_layout.addWidget(wgt)
+
+        layout.addWidget(step_region)
+        layout.addWidget(export_region)
+
+        previous.clicked.connect(self.previous_handler)
+        following.clicked.connect(self.next_handler)
+        export.clicked.connect(self.export_handler)
+        cancel_export.clicked.connect(self.cancel_export_handler)
+
+    @QtCore.Slot()
+    def previous_handler(self):
+        self.publish(UserAction.STEP_SERIES, -1)
+
+    @QtCore.Slot()
+    def next_handler(self):
+        self.publish(UserAction.STEP_SERIES, 1)
+
+    @QtCore.Slot()
+    def export_handler(self):
+        out_dir = QFileDialog.getExistingDirectory(self, "Export frames to")
+        if out_dir != "":
+            self.publish(UserAction.EXPORT_SERIES, out_dir)
+
+    @QtCore.Slot()
+    def cancel_export_handler(self):
+        self.publish(UserAction.CANCEL_EXPORT, True)
+
+    def handle_update(self, name: V3Option):
+        match name:
+            case Data.SERIES_POSITION:
+                position = self.query(name)
+                if position is not None:
+                    index, count = position
+                    self.get_widget("step_region").get_widget("position").setText(f"{index + 1} / {count}")
+                    self.setVisible(True)
+            case Data.EXPORT_PROGRESS:
+                progress = self.query(name)
+                if progress is not None:
+                    done, total, failed = progress
+                    export_region = self.get_widget("export_region")
+                    bar = export_region.get_widget("export_progress")
+                    bar.setRange(0, total)
+                    bar.setValue(done)
+                    bar.setFormat(f"%v / %m, {failed} failed" if failed else "%v / %m")
+                    # failures stay up until the next export
+                    bar.setVisible(done < total or failed > 0)
+                    export_region.get_widget("cancel_export").setVisible(done < total)
+            case _:
+                pass
+
+class InstrumentationPanel(QAdjustable):
+    """
+    Shows what an instrumented broker recorded: the slowest handlers, the
+    busiest topics & the most frequent publish chains, followed by the stats()
+    of the given caches. Refreshes every second while visible.
+    """
+    def __init__(self, instrumentation: Instrumentation,
+                 caches: Optional[dict[str, Callable[[], dict[str, Any]]]] = None):
+        super().__init__()
+        self.instrumentation = instrumentation
+        self.caches = caches if caches is not None else dict()
+        self.__init_layout__()
+
+    def __init_layout__(self):
+        layout = QVBoxLayout(self)
+
+        report = self.add_widget("report", QPlainTextEdit())
+        report.setReadOnly(True)
+        report.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap)
+
+        button_region = self.add_widget("button_region", QAdjustable())
+        button_layout = QHBoxLayout(button_region)
+        clear = button_region.add_widget("clear", QPushButton("Clear"))
+        dump = button_region.add_widget("dump", QPushButton("Dump JSON"))
+        for wgt in button_region.widgets.values():
+            button_layout.addWidget(wgt)
+
+        layout.addWidget(report)
+        layout.addWidget(button_region)
+
+        self.timer = QtCore.QTimer(self)
+        self.timer.setInterval(1000)
+        self.timer.timeout.connect(self.refresh)
+        clear.clicked.connect(self.clear_handler)
+        dump.clicked.connect(self.dump_handler)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+        self.timer.start()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.timer.stop()
+
+    @QtCore.Slot()
+    def refresh(self):
+        stats = self.instrumentation.as_dict()
+        lines = ["handlers (ms)         count     mean      max"]
+        for sub, topics in stats["handlers"].items():
+            for topic, handler in topics.items():
+                lines.append(f"{sub} <- {topic}")
+                lines.append(f"    {handler['count']:>24} {handler['mean_ms']:8.2f} {handler['max_ms']:8.2f}")
+        lines += ["", "publishes"]
+        lines += [f"{count:>8} {topic}" for topic, count in stats["publishes"].items()]
+        lines += ["", "chains"]
+        lines += [f"{chain['count']:>8} {' -> '.join(chain['chain'])}" for chain in stats["chains"]]
+        lines += ["", "caches"]
+        for label, cache_stats in self.caches.items():
+            cache = cache_stats()
+            hit_rate = "-" if cache.get("hit_rate") is None else f"{cache['hit_rate']:.0%}"
+            lines.append(f"{label:>14}: {cache['entries']} entries, {cache['nbytes'] / 2**20:.1f} MiB, "
+                         f"{cache['hits']} hits, {cache['misses']} misses, hit rate {hit_rate}")
+        self.get_widget("report").setPlainText("\n".join(lines))
+
+    @QtCore.Slot()
+    def clear_handler(self):
+        self.instrumentation.clear()
+        self.refresh()
+
+    @QtCore.Slot()
+    def dump_handler(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Dump instrumentation", "", "JSON (*.json)")
+        if path != "":
+            self.instrumentation.dump(path)
+
+
+class DataObjectPanel(Publisher, QAdjustable):
+    """
+    Restricts plots to a region around PlotOption.CENTER: a sphere, box, disk
+    or ellipsoid, published as PlotOption.REGION. yt then only reads the data
+    intersecting it.
+
+    Size is one number or a tuple, see backend.regions for what it means per
+    shape. The normal only applies to disks & ellipsoids. Sizes yt would
+    reject, like ellipsoid semi-axes not longest first, are shown as an
+    error & not published.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        QAdjustable.__init__(self)
+
+        self.add_field(PlotOption.REGION)
+
+        self.__init_layout__()
 
+    def __init_layout__(self):
+        layout = QVBoxLayout(self)
 
+        obj_type = QComboBox()
+        obj_type.addItems(["Region: whole domain", "Region: sphere", "Region: box", "Region: disk",
+                           "Region: ellipsoid"])
+        self.widgets.update({PlotOption.REGION: obj_type})
+
+        size_region = self.add_widget("size_region", QAdjustable())
+        size_layout = QHBoxLayout(size_region)
+        size = size_region.add_widget("size", QLineEdit("10"))
+        number = r"\s*[0-9]+(?:\.[0-9]*)?\s*"
+        size.setValidator(QRegularExpressionValidator(QRegularExpression(
+            f"^(?:{number}|\\({number}(?:,{number}){{0,2}}\\))$"
+        )))
+        unit = size_region.add_widget("unit", QComboBox())
+        unit.addItems(["kpc", "pc", "Mpc", "code_length"])
+        normal = size_region.add_widget("normal", QLineEdit("z"))
+        for wgt in size_region.widgets.values():
+            size_layout.addWidget(wgt)
+        size_region.setVisible(False)
+        error = self.add_widget("error", QLabel(""))
+        error.setVisible(False)
+
+        layout.addWidget(obj_type)
+        layout.addWidget(size_region)
+        layout.addWidget(error)
+
+        obj_type.currentIndexChanged.connect(self.object_handler)
+        size.textChanged.connect(self.object_handler)
+        unit.currentIndexChanged.connect(self.object_handler)
+        normal.textChanged.connect(self.object_handler)
+
+    @QtCore.Slot()
+    def object_handler(self):
+        obj_type = self.widgets.get(PlotOption.REGION)
+        size_region = self.get_widget("size_region")
+        error = self.get_widget("error")
+        error.setVisible(False)
+        if type(obj_type) is QComboBox:
+            shape = list(RegionOption)[obj_type.currentIndex()]
+            size_region.setVisible(shape is not RegionOption.DOMAIN)
+            size_region.get_widget("normal").setEnabled(shape in (RegionOption.DISK, RegionOption.ELLIPSOID))
+            if shape is RegionOption.DOMAIN:
+                self.publish(PlotOption.REGION, {"shape": shape})
+                return
+            size = size_region.get_widget("size")
+            normal = size_region.get_widget("normal").text()
+            if not size.hasAcceptableInput():
+                return
+            size = literal_eval(size.text())
+            if shape is RegionOption.ELLIPSOID:
+                try:
+                    ellipsoid_axes(size)
+                except ValueError as e:
+                    error.setText(str(e))
+                    error.setVisible(True)
+                    return
+            if re.fullmatch(r"x|y|z", normal) is None:
+                try:
+                    normal = tuple(float(n) for n in literal_eval(normal))
+                except (ValueError, SyntaxError, TypeError):
+                    return
+                if len(normal) != 3 or not any(normal):
+                    return
+            self.publish(PlotOption.REGION, {
+                "shape": shape,
+                "size": size if isinstance(size, tuple) else (size,),
+                "unit": size_region.get_widget("unit").currentText(),
+                "normal": normal,
+            })
 
 class EditPlotPanel(Publisher, QAdjustable):
     """
@@ -440,12 +763,29 @@ class EditPlotPanel(Publisher, QAdjustable):
         layout.addWidget(QLabel("zoom"))
         layout.addWidget(zoom_region)
 
+        render_mode = self.add_widget("render_mode", QComboBox())
+        render_mode.addItems([
+            "Annotated rendering",
+            "Interactive rendering (no axes or colorbar)",
+            "Tiled rendering (cached tiles, no axes or colorbar)",
+        ])
+        layout.addWidget(render_mode)
+
+        progressive = self.add_widget("progressive", QCheckBox("Progressive rendering (coarse preview first)"))
+        layout.addWidget(progressive)
+
+        save = self.add_widget("save", QPushButton("Save plot"))
+        layout.addWidget(save)
+
         x_region.get_widget("x_minus").clicked.connect(self.x_minus_update_handler)
         x_region.get_widget("x_plus").clicked.connect(self.x_plus_update_handler)
         y_region.get_widget("y_minus").clicked.connect(self.y_minus_update_handler)
         y_region.get_widget("y_plus").clicked.connect(self.y_plus_update_handler)
         zoom_region.get_widget("zoom_minus").clicked.connect(self.zoom_minus_update_handler)
         zoom_region.get_widget("zoom_plus").clicked.connect(self.zoom_plus_update_handler)
+        render_mode.currentIndexChanged.connect(self.render_mode_handler)
+        progressive.toggled.connect(self.progressive_handler)
+        save.clicked.connect(self.save_handler)
 
 
     @QtCore.Slot()
@@ -477,3 +817,19 @@ class EditPlotPanel(Publisher, QAdjustable):
     def zoom_minus_update_handler(self):
         data = 1 - abs(float(self.get_widget("zoom_region").get_widget("zoom_input").text()))
         self.publish(UserAction.ZOOM,data)
+
+    @QtCore.Slot()
+    def render_mode_handler(self):
+        i = self.get_widget("render_mode").currentIndex()
+        self.publish(PlotOption.RENDER_MODE, list(RenderModeOption)[i])
+
+    @QtCore.Slot()
+    def progressive_handler(self):
+        self.publish(PlotOption.PROGRESSIVE, self.get_widget("progressive").isChecked())
+
+    @QtCore.Slot()
+    def save_handler(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Save plot", "", "Images (*.png *.pdf *.svg)")
+        if path != "":
+            self.publish(PlotOption.SAVE_TO, path)
+            self.publish(UserAction.SAVE_PLOT, True)
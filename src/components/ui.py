@@ -3,7 +3,12 @@ from PySide6.QtCore import Qt
 from PySide6.QtWidgets import *
 from PySide6.QtGui import QPixmap, QImage
 from typing import *
+from backend.fields import FieldKey, field_groups
+from backend.history import View
+from backend.info_handling import *
 from backend.options import *
+import numpy as np
+import time
 
 class QAdjustable(QWidget):
     """
@@ -26,3 +31,463 @@ class QAdjustable(QWidget):
 
     def get_widget(self, name: V3Option) -> QWidget:
         return self.widgets[name]
+
+def image_from_buffer(buffer: np.ndarray) -> QImage:
+    """
+    Wraps a contiguous (height, width, 4) RGBA array in a QImage without
+    copying it.
+
+    The QImage keeps a reference to the buffer for as long as it is alive.
+    """
+    height, width = buffer.shape[:2]
+    return QImage(memoryview(buffer), width, height, 4 * width, QImage.Format.Format_RGBA8888)
+
+class FieldListModel(Subscriber, QtGui.QStandardItemModel):
+    """
+    Derived fields of PlotOption.DATASET, shared by every field picker.
+
+    Fields are grouped under a non-selectable row per field type, & store
+    their (field type, field name) key as item data so pickers never parse
+    text. Attached pickers are editable with a substring completer, and their
+    signals are blocked while the model is rebuilt; afterwards each keeps its
+    field if the new dataset has it, & its manager is called if not. Attached
+    lists pick several fields & keep whichever of them the new dataset has.
+    """
+    def __init__(self, broker: EventBroker):
+        Subscriber.__init__(self, broker)
+        QtGui.QStandardItemModel.__init__(self)
+        self.groups: dict[str, list[FieldKey]] = dict()
+        self.rows: dict[FieldKey, int] = dict()
+        self.pickers: list[tuple[QComboBox, Callable[[], None]]] = list()
+        self.lists: list[tuple["FieldListPicker", Callable[[], None]]] = list()
+        self.subscribe([PlotOption.DATASET])
+
+    def attach(self, box: QComboBox, manager: Callable[[], None], optional: bool = False):
+        """
+        Makes box pick from this model, with a "None" entry first if optional.
+        """
+        if optional:
+            none_model = QtGui.QStandardItemModel(box)
+            none_model.appendRow(QtGui.QStandardItem("None"))
+            model = QtCore.QConcatenateTablesProxyModel(box)
+            model.addSourceModel(none_model)
+            model.addSourceModel(self)
+            box.setModel(model)
+        else:
+            box.setModel(self)
+        box.setEditable(True)
+        box.setInsertPolicy(QComboBox.InsertPolicy.NoInsert)
+        completer = box.completer()
+        completer.setFilterMode(Qt.MatchFlag.MatchContains)
+        completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+        completer.setCompletionMode(QCompleter.CompletionMode.PopupCompletion)
+        self.pickers.append((box, manager))
+        # pickers attached after the dataset was loaded, e.g. in a new view pane
+        if self.rows:
+            box.setCurrentIndex(self.first_selectable(box))
+            manager()
+
+    def attach_list(self, picker: "FieldListPicker", manager: Callable[[], None]):
+        """
+        Makes picker pick any number of fields from this model, manager is
+        called whenever the picked fields change.
+        """
+        picker.set_model(self)
+        if self.rows:
+            picker.set_selected([self.first_field()])
+            manager()
+        picker.changed.connect(manager)
+        self.lists.append((picker, manager))
+
+    @staticmethod
+    def selected_fields(view: QAbstractItemView) -> list[FieldKey]:
+        rows = sorted(view.selectionModel().selectedRows(), key=lambda index: index.row())
+        return [index.data(Qt.ItemDataRole.UserRole) for index in rows]
+
+    def handle_update(self, name: V3Option):
+        match name:
+            case PlotOption.DATASET:
+                ds = self.query(name)
+                if ds is not None:
+                    self.set_groups(field_groups(ds))
+            case _:
+                pass
+
+    def set_groups(self, groups: dict[str, list[FieldKey]]):
+        if groups == self.groups:
+            return
+        selected = [box.currentData() for box, _ in self.pickers]
+        for box, _ in self.pickers:
+            box.blockSignals(True)
+        selected_lists = [list(picker.selected) for picker, _ in self.lists]
+        for picker, _ in self.lists:
+            picker.view.selectionModel().blockSignals(True)
+
+        self.groups = groups
+        self.rows = dict()
+        self.clear()
+        for ftype, fields in groups.items():
+            header = QtGui.QStandardItem(ftype)
+            header.setFlags(Qt.ItemFlag.NoItemFlags)
+            font = header.font()
+            font.setBold(True)
+            header.setFont(font)
+            rows = [header]
+            for field in fields:
+                item = QtGui.QStandardItem(str(field))
+                item.setData(field, Qt.ItemDataRole.UserRole)
+                self.rows[field] = self.rowCount() + len(rows)
+                rows.append(item)
+            for row in rows:
+                self.appendRow(row)
+
+        changed = list()
+        for (box, manager), field in zip(self.pickers, selected):
+            index = box.findData(field) if field is not None else -1
+            if index < 0:
+                index = self.first_selectable(box)
+            box.setCurrentIndex(index)
+            box.blockSignals(False)
+            if box.currentData() != field:
+                changed.append(manager)
+        for (picker, manager), fields in zip(self.lists, selected_lists):
+            kept = [field for field in fields if field in self.rows]
+            first = self.first_field()
+            picker.set_selected(kept or ([first] if first is not None else []))
+            picker.view.selectionModel().blockSignals(False)
+            if picker.selected != fields:
+                changed.append(manager)
+        for manager in changed:
+            manager()
+
+    def row_of(self, field: FieldKey) -> int:
+        return self.rows.get(field, -1)
+
+    def first_field(self) -> Optional[FieldKey]:
+        return next(iter(self.rows), None)
+
+    @staticmethod
+    def first_selectable(box: Union[QComboBox, QAbstractItemView]) -> int:
+        model = box.model()
+        for row in range(model.rowCount()):
+            if model.flags(model.index(row, 0)) & Qt.ItemFlag.ItemIsEnabled:
+                return row
+        return -1
+
+class FieldListPicker(QWidget):
+    """
+    List picking any number of fields from a FieldListModel, under a box
+    filtering them by a case-insensitive substring like the pickers'
+    completers. Picked fields the filter hides stay picked, `selected` holds
+    them all in the order they were picked.
+    """
+    changed = QtCore.Signal()
+
+    def __init__(self, parent: Optional[QWidget] = None):
+        super().__init__(parent)
+        self.selected: list[FieldKey] = list()
+        self.model: Optional[FieldListModel] = None
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.filter = QLineEdit(self)
+        self.filter.setPlaceholderText("Filter fields")
+        self.filter.setClearButtonEnabled(True)
+        self.view = QListView(self)
+        self.view.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.proxy = QtCore.QSortFilterProxyModel(self)
+        self.proxy.setFilterCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+        layout.addWidget(self.filter)
+        layout.addWidget(self.view)
+        self.filter.textChanged.connect(self.filter_changed)
+
+    def set_model(self, model: FieldListModel):
+        self.model = model
+        self.proxy.setSourceModel(model)
+        self.view.setModel(self.proxy)
+        self.view.selectionModel().selectionChanged.connect(self.selection_changed)
+
+    def visible_fields(self) -> set[FieldKey]:
+        rows = (self.proxy.index(row, 0) for row in range(self.proxy.rowCount()))
+        return {index.data(Qt.ItemDataRole.UserRole) for index in rows} - {None}
+
+    def set_selected(self, fields: list[FieldKey]):
+        self.selected = list(fields)
+        self.show_selection()
+
+    def show_selection(self):
+        """
+        Selects the picked fields the filter shows, without signals.
+        """
+        selection = self.view.selectionModel()
+        blocked = selection.blockSignals(True)
+        selection.clear()
+        for field in self.selected:
+            index = self.proxy.mapFromSource(self.model.index(self.model.row_of(field), 0))
+            if index.isValid():
+                selection.select(index, QtCore.QItemSelectionModel.SelectionFlag.Select)
+        selection.blockSignals(blocked)
+        # the view missed the selection signals
+        self.view.viewport().update()
+
+    @QtCore.Slot()
+    def selection_changed(self):
+        visible = self.visible_fields()
+        shown = FieldListModel.selected_fields(self.view)
+        kept = [field for field in self.selected if field not in visible or field in shown]
+        self.selected = kept + [field for field in shown if field not in kept]
+        self.changed.emit()
+
+    @QtCore.Slot(str)
+    def filter_changed(self, text: str):
+        selection = self.view.selectionModel()
+        blocked = selection.blockSignals(True)
+        self.proxy.setFilterFixedString(text)
+        selection.blockSignals(blocked)
+        self.show_selection()
+
+class MainThreadDispatcher(QtCore.QObject):
+    """
+    Runs callables on the GUI thread.
+
+    Background workers call dispatch() from their own thread; the queued
+    connection makes Qt invoke the callable from the GUI event loop instead.
+    """
+    posted = QtCore.Signal(object)
+
+    def __init__(self):
+        super().__init__()
+        self.posted.connect(self._run, Qt.ConnectionType.QueuedConnection)
+
+    def dispatch(self, fn: Callable[[], None]):
+        self.posted.emit(fn)
+
+    @QtCore.Slot(object)
+    def _run(self, fn: Callable[[], None]):
+        fn()
+
+# a wheel step zooms in or out by this factor
+WHEEL_ZOOM = 1.25
+
+# milliseconds without wheel steps before a wheel zoom is sent
+WHEEL_SETTLE_MS = 200
+
+# seconds a sent pan or zoom may go unanswered before images are shown as is again
+SETTLE_TIMEOUT = 10.0
+
+# x limits & y limits in code units
+Limits = tuple[tuple[float, float], tuple[float, float]]
+
+def view_limits(view: View) -> Optional[Limits]:
+    if "xlim" not in view:
+        return None
+    return tuple(view["xlim"]), tuple(view["ylim"])
+
+def same_limits(a: Limits, b: Limits, tolerance: float = 1e-6) -> bool:
+    """
+    Equal to a fraction tolerance of their widths, the backend's limits come
+    back through yt's units.
+    """
+    return all(
+        abs(p - q) <= tolerance * abs(lims[1] - lims[0])
+        for lims, other in zip(a, b) for p, q in zip(lims, other)
+    )
+
+class ImageViewport(QWidget):
+    """
+    Shows an image of a view (Data.VIEW), stretched to the widget, that the
+    mouse pans by dragging & zooms with the wheel about the cursor.
+
+    Gestures move a target view at once, painted by scaling & shifting the
+    data area of each field's cell of the image shown. Once a drag is
+    released, or the wheel rests for WHEEL_SETTLE_MS, settled is emitted with
+    the relative pan & zoom from where the plot was last sent, see
+    PlotManager.apply_edit(). Images of earlier views keep being drawn at the
+    target until the one of the target arrives.
+
+    Only plot windows, whose views have limits, take gestures.
+    """
+    settled = QtCore.Signal(object)
+
+    def __init__(self, parent: Optional[QWidget] = None):
+        super().__init__(parent)
+        self.pixmap: Optional[QPixmap] = None
+        self.view: View = dict()
+        # shown, & where the plot was last sent
+        self.target: Optional[Limits] = None
+        self.sent: Optional[Limits] = None
+        self.sent_at: Optional[float] = None
+        self.drag: Optional[QtCore.QPointF] = None
+        self.wheel_timer = QtCore.QTimer(self)
+        self.wheel_timer.setSingleShot(True)
+        self.wheel_timer.setInterval(WHEEL_SETTLE_MS)
+        self.wheel_timer.timeout.connect(self.settle)
+
+    def show_image(self, pixmap: QPixmap, view: View, reset: bool = False):
+        """
+        Shows a new image of view. Unless reset, e.g. when going back to an
+        earlier view, a gesture in progress or sent but not rendered yet
+        keeps its target.
+        """
+        limits = view_limits(view)
+        gesture = self.drag is not None or self.wheel_timer.isActive()
+        if limits is None or reset or self.target is None or view.get("plot") != self.view.get("plot"):
+            self.target = limits
+            self.sent_at = None
+            self.drag = None
+            self.wheel_timer.stop()
+        elif self.sent_at is not None and (same_limits(limits, self.sent)
+                                           or time.monotonic() - self.sent_at > SETTLE_TIMEOUT):
+            self.sent_at = None
+            if not gesture:
+                self.target = limits
+        elif self.sent_at is None and not gesture:
+            self.target = limits
+        if self.sent_at is None:
+            self.sent = limits
+        self.pixmap = pixmap
+        self.view = view
+        self.setCursor(Qt.CursorShape.OpenHandCursor if limits is not None else Qt.CursorShape.ArrowCursor)
+        self.updateGeometry()
+        self.update()
+
+    def sizeHint(self) -> QtCore.QSize:
+        return self.pixmap.size() if self.pixmap is not None else super().sizeHint()
+
+    def cells(self) -> list[QtCore.QRectF]:
+        """
+        Data area of each field's cell, in image pixels.
+        """
+        rows, columns = self.view.get("grid", (1, 1))
+        left, top, right, bottom = self.view.get("extent", (0.0, 0.0, 1.0, 1.0))
+        width = self.pixmap.width() / columns
+        height = self.pixmap.height() / rows
+        return [
+            QtCore.QRectF((column + left) * width, (row + top) * height,
+                          (right - left) * width, (bottom - top) * height)
+            for row in range(rows) for column in range(columns)
+        ]
+
+    def to_widget(self, rect: QtCore.QRectF) -> QtCore.QRectF:
+        sx = self.width() / self.pixmap.width()
+        sy = self.height() / self.pixmap.height()
+        return QtCore.QRectF(rect.x() * sx, rect.y() * sy, rect.width() * sx, rect.height() * sy)
+
+    def axes(self, limits: Limits) -> tuple[tuple[float, float], tuple[float, float]]:
+        """
+        Limits along the image's horizontal & vertical, which swap_axes
+        exchanges.
+        """
+        x, y = limits
+        return (y, x) if self.view.get("swap_axes") else (x, y)
+
+    def fractions(self, limits: Limits) -> tuple[float, float, float, float]:
+        """
+        Where limits fall in the shown image's data area, as (left, top,
+        right, bottom) fractions of it. The image's horizontal runs up its
+        data axis & its vertical down, unless flipped.
+        """
+        (h0, h1), (v0, v1) = self.axes(view_limits(self.view))
+        (th0, th1), (tv0, tv1) = self.axes(limits)
+        us = [(h - h0) / (h1 - h0) for h in (th0, th1)]
+        vs = [(v1 - v) / (v1 - v0) for v in (tv0, tv1)]
+        if self.view.get("flip_horizontal"):
+            us = [1 - u for u in us]
+        if self.view.get("flip_vertical"):
+            vs = [1 - v for v in vs]
+        return min(us), min(vs), max(us), max(vs)
+
+    def point(self, u: float, v: float) -> tuple[float, float]:
+        """
+        Data point at fractions u across & v down the target's data area.
+        """
+        (h0, h1), (v0, v1) = self.axes(self.target)
+        if self.view.get("flip_horizontal"):
+            u = 1 - u
+        if self.view.get("flip_vertical"):
+            v = 1 - v
+        h, w = h0 + u * (h1 - h0), v1 - v * (v1 - v0)
+        return (w, h) if self.view.get("swap_axes") else (h, w)
+
+    def paintEvent(self, event: QtGui.QPaintEvent):
+        if self.pixmap is None:
+            return
+        painter = QtGui.QPainter(self)
+        painter.setRenderHint(QtGui.QPainter.RenderHint.SmoothPixmapTransform)
+        painter.drawPixmap(self.rect(), self.pixmap)
+        if self.target is None or same_limits(self.target, view_limits(self.view), 1e-9):
+            return
+        u0, v0, u1, v1 = self.fractions(self.target)
+        for cell in self.cells():
+            area = self.to_widget(cell)
+            # the part of the cell the target covers is stretched over its data area
+            sx = area.width() / ((u1 - u0) * cell.width())
+            sy = area.height() / ((v1 - v0) * cell.height())
+            placed = QtCore.QRectF(area.x() - u0 * cell.width() * sx, area.y() - v0 * cell.height() * sy,
+                                   cell.width() * sx, cell.height() * sy)
+            painter.setClipRect(area)
+            painter.fillRect(area, self.palette().window())
+            painter.drawPixmap(placed, self.pixmap, cell)
+
+    def mousePressEvent(self, event: QtGui.QMouseEvent):
+        if self.target is None or event.button() != Qt.MouseButton.LeftButton:
+            return super().mousePressEvent(event)
+        self.drag = event.position()
+        self.setCursor(Qt.CursorShape.ClosedHandCursor)
+
+    def mouseMoveEvent(self, event: QtGui.QMouseEvent):
+        if self.drag is None:
+            return super().mouseMoveEvent(event)
+        area = self.to_widget(self.cells()[0])
+        delta = event.position() - self.drag
+        self.drag = event.position()
+        # the point under the cursor follows it
+        x0, y0 = self.point(0, 0)
+        x1, y1 = self.point(delta.x() / area.width(), delta.y() / area.height())
+        (a0, a1), (b0, b1) = self.target
+        self.target = (a0 - (x1 - x0), a1 - (x1 - x0)), (b0 - (y1 - y0), b1 - (y1 - y0))
+        self.update()
+
+    def mouseReleaseEvent(self, event: QtGui.QMouseEvent):
+        if self.drag is None or event.button() != Qt.MouseButton.LeftButton:
+            return super().mouseReleaseEvent(event)
+        self.drag = None
+        self.setCursor(Qt.CursorShape.OpenHandCursor)
+        self.settle()
+
+    def wheelEvent(self, event: QtGui.QWheelEvent):
+        steps = event.angleDelta().y() / 120
+        if self.target is None or steps == 0:
+            return super().wheelEvent(event)
+        cells = self.cells()
+        rows, columns = self.view.get("grid", (1, 1))
+        position = event.position()
+        column = min(max(int(position.x() / self.width() * columns), 0), columns - 1)
+        row = min(max(int(position.y() / self.height() * rows), 0), rows - 1)
+        area = self.to_widget(cells[row * columns + column])
+        # the point under the cursor stays put
+        x, y = self.point((position.x() - area.x()) / area.width(), (position.y() - area.y()) / area.height())
+        factor = WHEEL_ZOOM ** steps
+        (a0, a1), (b0, b1) = self.target
+        self.target = ((x + (a0 - x) / factor, x + (a1 - x) / factor),
+                       (y + (b0 - y) / factor, y + (b1 - y) / factor))
+        self.wheel_timer.start()
+        self.update()
+
+    @QtCore.Slot()
+    def settle(self):
+        """
+        Emits the pan & zoom taking the plot from where it was last sent to
+        the target: {"pan_rel": (dx, dy), "zoom": factor}, a pan in widths
+        before zooming & a zoom about the panned center, as yt applies them.
+        """
+        if self.drag is not None or self.target is None or same_limits(self.target, self.sent, 1e-9):
+            return
+        self.wheel_timer.stop()
+        (x0, x1), (y0, y1) = self.sent
+        (tx0, tx1), (ty0, ty1) = self.target
+        self.settled.emit({
+            "pan_rel": (((tx0 + tx1) - (x0 + x1)) / 2 / (x1 - x0), ((ty0 + ty1) - (y0 + y1)) / 2 / (y1 - y0)),
+            "zoom": (x1 - x0) / (tx1 - tx0),
+        })
+        self.sent = self.target
+        self.sent_at = time.monotonic()
@@ -3,11 +3,20 @@ import yt
 from typing import *
 
 from components.panels import *
-from components.ui import QAdjustable
-
-from backend.plot_management import PlotMaker, PlotManager
+from components.ui import FieldListModel, QAdjustable, MainThreadDispatcher
+
+from backend import particles, regions
+from backend.caching import LRUCache
+from backend.column_cache import column_cache
+from backend.export import SeriesExporter
+from backend.loading import DatasetLoader, DatasetRegistry, TimeSeriesLoader
+from backend.offaxis import OffAxisPool
+from backend.plot_management import PROJECTION_CACHE_BYTES, PlotMaker, PlotManager, ViewLink, projection_size
+from backend.render_cache import RenderCache
+from backend.tiles import TilePyramid
 from backend.options import *
 from backend.info_handling import *
+from backend.workers import Worker
 
 PlotType = Union[ 
     yt.AxisAlignedSlicePlot,
@@ -23,10 +32,35 @@ class YtWindow(QAdjustable):
     Frontend handler.
 
     Contains top-level widgets, leaves information processing to its children.
+    With instrument=True, broker activity is recorded & shown in a debug tab.
+    With off_axis_workers > 1, off-axis projections run on that many processes.
+    Rendered images are only cached on disk with a render_cache.
+
+    Holds any number of view panes, each with its own plot state, render
+    worker & plot panels; the dataset, the field list & the projection, tile
+    & render caches are shared. The plot panels show the active pane's.
     """
-    def __init__(self):
+    def __init__(self, instrument: bool = False, off_axis_workers: int = 1,
+                 render_cache: Optional[RenderCache] = None):
         super().__init__()
         self.broker = EventBroker()
+        self.instrumentation = self.broker.instrument() if instrument else None
+        self.dispatcher = MainThreadDispatcher()
+        dispatch = self.dispatcher.dispatch
+        self.render_worker = Worker(dispatch, bind=self.broker.bind)
+        self.load_worker = Worker(dispatch, "load-worker", self.broker.bind)
+        self.prefetch_worker = Worker(dispatch, "prefetch-worker", self.broker.bind)
+        self.export_worker = Worker(dispatch, "export-worker", self.broker.bind)
+        self.registry = DatasetRegistry()
+        # shared by every view pane
+        self.projections = LRUCache(PROJECTION_CACHE_BYTES, projection_size)
+        self.tiles = TilePyramid()
+        self.render_cache = render_cache
+        self.off_axis = OffAxisPool(off_axis_workers) if off_axis_workers > 1 else None
+        self.link = ViewLink()
+        self.panes: list[ViewPane] = list()
+        self.plot_makers: list[PlotMaker] = list()
+        self.plot_managers: list[PlotManager] = list()
         self.__init_layout__()
 
     def __init_layout__(self):
@@ -44,19 +78,50 @@ class YtWindow(QAdjustable):
         self.add_widget("tabbar", tabbar)
         tabbar.currentChanged.connect(self.tab_bar_clicked)
 
-        img_pane = self.add_widget("img_pane", ImagePanel(self.broker))
-        make_plot_pane = self.add_widget("make_plot_panel", MakePlotPanel(self.broker))
-        edit_plot_pane = self.add_widget("edit_plot_panel", EditPlotPanel(self.broker))
-
-        self.plot_maker = PlotMaker(self.broker)
-        self.plot_manager = PlotManager(self.broker)
-
-        left_layout.addWidget(img_pane)
+        views = self.add_widget("views", QWidget())
+        self.views_layout = QGridLayout(views)
+        self.active_group = QButtonGroup(self)
+        self.active_group.idClicked.connect(self.set_active_pane)
+        add_view = self.add_widget("add_view", QPushButton("Add view"))
+        add_view.clicked.connect(self.add_pane)
+        make_plot_pane = self.add_widget("make_plot_panel", QStackedWidget())
+        edit_plot_pane = self.add_widget("edit_plot_panel", QStackedWidget())
+        series_pane = self.add_widget("series_panel", TimeSeriesPanel(self.broker))
+        self.field_model = FieldListModel(self.broker)
+
+        self.dataset_loader = DatasetLoader(self.broker, self.load_worker, self.registry)
+        self.series_loader = TimeSeriesLoader(self.broker, self.load_worker, self.prefetch_worker, self.registry)
+        self.add_pane()
+        self.plot_maker = self.plot_makers[0]
+        self.plot_manager = self.plot_managers[0]
+        self.series_exporter = SeriesExporter(self.broker, self.export_worker, self.plot_maker)
+        self.set_active_pane(0)
+
+        left_layout.addWidget(views, 1)
+        left_layout.addWidget(add_view)
+        left_layout.addWidget(series_pane)
         right_layout.addWidget(tabbar)
         right_layout.addWidget(make_plot_pane)
         right_layout.addWidget(edit_plot_pane)
         edit_plot_pane.setVisible(False)
 
+        if self.instrumentation is not None:
+            caches = {
+                "projections": self.projections.stats,
+                "tiles": self.tiles.stats,
+                "particle columns": particles.columns.stats,
+                "regions": regions.regions.stats,
+                "datasets": self.registry.stats,
+            }
+            if self.render_cache is not None:
+                caches["render cache"] = self.render_cache.stats
+            if column_cache() is not None:
+                caches["column cache"] = column_cache().stats
+            debug_pane = self.add_widget("debug_panel", InstrumentationPanel(self.instrumentation, caches))
+            tabbar.addTab("debug")
+            right_layout.addWidget(debug_pane)
+            debug_pane.setVisible(False)
+
         layout.addWidget(left)
         layout.addWidget(right)
 
@@ -67,23 +132,60 @@ class YtWindow(QAdjustable):
         left.setFixedWidth(self.width()//2-1)
         left.setFixedHeight(self.width()//2-1)
     
+    @QtCore.Slot()
+    def add_pane(self):
+        """
+        The first pane uses the window's broker & render worker. Later ones
+        get a PaneBroker & a render worker of their own, so panes, linked ones
+        especially, render concurrently.
+        """
+        index = len(self.panes)
+        if index == 0:
+            broker, worker = self.broker, self.render_worker
+        else:
+            broker = PaneBroker(self.broker, label=f"view {index + 1}")
+            worker = Worker(self.dispatcher.dispatch, f"render-worker-{index}", broker.bind)
+            self.series_loader.follow(broker)
+
+        pane = ViewPane(broker, index)
+        header = pane.get_widget("header")
+        self.active_group.addButton(header.get_widget("active"), index)
+        header.get_widget("linked").toggled.connect(
+            lambda linked, broker=broker: self.link.set_linked(broker, linked)
+        )
+        self.views_layout.addWidget(pane, index // 2, index % 2)
+        self.panes.append(pane)
+
+        self.get_widget("make_plot_panel").addWidget(MakePlotPanel(broker, field_model=self.field_model))
+        self.get_widget("edit_plot_panel").addWidget(EditPlotPanel(broker))
+        self.plot_makers.append(PlotMaker(broker, worker, projections=self.projections,
+                                          prerender=True, tiles=self.tiles,
+                                          render_cache=self.render_cache, off_axis=self.off_axis))
+        self.plot_managers.append(PlotManager(broker, worker, tiles=self.tiles, link=self.link))
+        if index > 0:
+            self.set_active_pane(index)
+
+    @QtCore.Slot(int)
+    def set_active_pane(self, index: int):
+        self.active_group.button(index).setChecked(True)
+        self.get_widget("make_plot_panel").setCurrentIndex(index)
+        self.get_widget("edit_plot_panel").setCurrentIndex(index)
+        # exports follow the plot being edited
+        self.series_exporter.plot_maker = self.plot_makers[index]
+
     @QtCore.Slot()
     def tab_bar_clicked(self):
         tabbar = self.get_widget("tabbar")
         if type(tabbar) is QTabBar:
-            match tabbar.currentIndex():
-                case 0:
-                    mpp = self.get_widget("make_plot_panel")
-                    epp = self.get_widget("edit_plot_panel")
-                    if isinstance(mpp, QWidget) and isinstance(epp, QWidget):
-                        mpp.setVisible(True)
-                        epp.setVisible(False)
-                case 1:
-                    mpp = self.get_widget("make_plot_panel")
-                    epp = self.get_widget("edit_plot_panel")
-                    if isinstance(mpp, QWidget) and isinstance(epp, QWidget):
-                        mpp.setVisible(False)
-                        epp.setVisible(True)
+            tabs = ["make_plot_panel", "edit_plot_panel", "debug_panel"]
+            current = tabs[tabbar.currentIndex()]
+            for tab in tabs:
+                pane = self.widgets.get(tab)
+                if isinstance(pane, QWidget) and tab != current:
+                    pane.setVisible(False)
+            pane = self.widgets.get(current)
+            if isinstance(pane, QWidget):
+                pane.setVisible(True)
 
     def resizeEvent(self, event):
         super().resizeEvent(event)
@@ -0,0 +1,244 @@
+"""
+Batch entry point, drives the backend without Qt or a display.
+
+    python headless.py spec.json [--dataset PATH] [--output DIR] [--instrument JSON]
+                                 [--render-cache DIR | --no-render-cache]
+                                 [--column-cache [DIR]] [--off-axis-workers N]
+
+A spec is a JSON object:
+
+    {
+        "dataset": "output_00080",
+        "options": {
+            "PLOT_TYPE": "PROJECTION_PLOT",
+            "SliceProjPlotOption.FIELDS": "('gas', 'density')",
+            "WIDTH": "(10, 'kpc')"
+        },
+        "actions": [
+            ["CREATE_PLOT", true],
+            ["ZOOM", 2],
+            ["SAVE_PLOT", "density.png"]
+        ],
+        "output": "frames"
+    }
+
+Option & action names are the broker topics, optionally qualified by their
+enum. Unqualified names are looked up in PlotOption, SliceProjPlotOption,
+ParticlePlotOption then UserAction. Strings are read with literal_eval like
+the panels' text inputs, and options with enum defaults take a member name.
+The image each entry ends up showing is written to the output folder, the
+partial & preview images published on the way are not.
+"""
+from typing import *
+
+from backend.export import SeriesExporter
+from backend.info_handling import *
+from backend.loading import LOAD_FAILED, DatasetLoader, DatasetRegistry, TimeSeriesLoader
+from backend.offaxis import OffAxisPool
+from backend.options import *
+from backend.plot_management import PlotMaker, PlotManager
+from backend.column_cache import COLUMN_CACHE_DIR, ColumnCache, column_cache, use_column_cache
+from backend.render_cache import RENDER_CACHE_DIR, RenderCache
+from backend.workers import InlineWorker
+
+from ast import literal_eval
+from enum import Enum
+import argparse
+import json
+import os
+import sys
+import matplotlib.image
+import numpy as np
+
+IMAGE_NAME = "image_{:04d}.png"
+
+TOPICS = [PlotOption, SliceProjPlotOption, ParticlePlotOption, UserAction]
+
+def resolve_topic(name: str) -> V3Option:
+    """
+    Broker topic for "ZOOM" or "UserAction.ZOOM".
+    """
+    enum_name, _, member = name.rpartition(".")
+    for topic in TOPICS:
+        if enum_name in ("", topic.__name__) and member in topic.__members__:
+            return topic[member]
+    raise KeyError(f"unknown option or action {name!r}")
+
+def resolve_value(name: V3Option, value: Any) -> Any:
+    if not isinstance(value, str):
+        return value
+    (_, (_, default),) = name.value
+    if isinstance(default, Enum) and value in type(default).__members__:
+        return type(default)[value]
+    try:
+        return literal_eval(value)
+    except (ValueError, SyntaxError):
+        return value
+
+class SpecPublisher(Publisher):
+    """
+    Publishes a spec's options & actions, in place of the panels.
+    """
+    def __init__(self, broker: EventBroker):
+        super().__init__(broker)
+        for topic in TOPICS:
+            for op in topic:
+                self.add_field(op)
+
+    def apply(self, name: str, value: Any):
+        option = resolve_topic(name)
+        value = resolve_value(option, value)
+        match option:
+            case UserAction.SAVE_PLOT:
+                # the path travels separately, like in EditPlotPanel
+                if isinstance(value, str):
+                    self.publish(PlotOption.SAVE_TO, value)
+                    value = True
+                self.publish(option, value)
+            case _:
+                self.publish(option, value)
+
+class ImageWriter(Subscriber):
+    """
+    Subscribed to Data.IMAGE. write() saves the newest image to out_dir,
+    once, so the partial grids of multi-field plots & progressive previews
+    published on the way to it are left out.
+    """
+    def __init__(self, broker: EventBroker, out_dir: str):
+        super().__init__(broker)
+        self.out_dir = out_dir
+        self.written: list[str] = list()
+        self.latest: Optional[np.ndarray] = None
+        self.subscribe([Data.IMAGE])
+
+    def handle_update(self, name: V3Option):
+        match name:
+            case Data.IMAGE:
+                image = self.query(name)
+                if image is not None:
+                    self.latest = image
+            case _:
+                pass
+
+    def write(self):
+        if self.latest is not None:
+            os.makedirs(self.out_dir, exist_ok=True)
+            path = os.path.join(self.out_dir, IMAGE_NAME.format(len(self.written)))
+            matplotlib.image.imsave(path, self.latest, format="png")
+            self.written.append(path)
+            self.latest = None
+
+class HeadlessSession:
+    """
+    The backend half of YtWindow, with inline workers.
+
+    Every step publishes to the broker, then runs the work it queued to
+    completion, so a script sees the same sequence of Data updates as the GUI.
+    """
+    def __init__(self, out_dir: str = ".", instrument: bool = False,
+                 render_cache: Optional[RenderCache] = None, off_axis: Optional[OffAxisPool] = None):
+        self.broker = EventBroker()
+        self.instrumentation = self.broker.instrument() if instrument else None
+        self.render_worker = InlineWorker("render-worker", self.broker.bind)
+        self.load_worker = InlineWorker("load-worker", self.broker.bind)
+        self.prefetch_worker = InlineWorker("prefetch-worker", self.broker.bind)
+        self.export_worker = InlineWorker("export-worker", self.broker.bind)
+        self.registry = DatasetRegistry()
+
+        self.publisher = SpecPublisher(self.broker)
+        self.writer = ImageWriter(self.broker, out_dir)
+        self.plot_maker = PlotMaker(self.broker, self.render_worker, prerender=True,
+                                    render_cache=render_cache, off_axis=off_axis)
+        self.plot_manager = PlotManager(self.broker, self.render_worker, debounce=0, tiles=self.plot_maker.tiles)
+        self.dataset_loader = DatasetLoader(self.broker, self.load_worker, self.registry)
+        self.series_loader = TimeSeriesLoader(self.broker, self.load_worker, self.prefetch_worker, self.registry)
+        self.series_exporter = SeriesExporter(self.broker, self.export_worker, self.plot_maker)
+
+    def run_pending(self):
+        workers = [self.load_worker, self.render_worker, self.prefetch_worker, self.export_worker]
+        while any(worker.pending() for worker in workers):
+            for worker in workers:
+                worker.run_pending()
+
+    def apply(self, name: str, value: Any):
+        """
+        Publishes a spec entry, runs the work it queued & writes the image it
+        ended up showing, if any.
+        """
+        self.publisher.apply(name, value)
+        self.run_pending()
+        self.writer.write()
+
+    def run(self, spec: dict[str, Any]) -> list[str]:
+        """
+        Options are published before the dataset is loaded, so CELL_FIELDS,
+        EPF & CENTER_METHOD apply to it. Returns the images written.
+        """
+        for name, value in spec.get("options", {}).items():
+            self.apply(name, value)
+        if spec.get("dataset") is not None:
+            self.apply("LOAD_DATASET", spec["dataset"])
+            if self.broker.query(PlotOption.DATASET) is None:
+                progress = self.broker.query(Data.LOAD_PROGRESS)
+                if progress is not None and progress[0] == LOAD_FAILED:
+                    raise RuntimeError(progress[2])
+                raise RuntimeError(f"could not load {spec['dataset']!r}")
+        for name, value in spec.get("actions", []):
+            self.apply(name, value)
+        return self.writer.written
+
+def run(spec: dict[str, Any], instrument: Optional[str] = None,
+        render_cache: Optional[RenderCache] = None, off_axis: Optional[OffAxisPool] = None) -> list[str]:
+    """
+    Runs a spec, writing broker instrumentation to the instrument path if
+    given.
+    """
+    session = HeadlessSession(spec.get("output", "."), instrument is not None, render_cache, off_axis)
+    try:
+        return session.run(spec)
+    finally:
+        if session.instrumentation is not None:
+            session.instrumentation.dump(instrument)
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Render plots from a spec without a display.")
+    parser.add_argument("spec", help="JSON plot spec")
+    parser.add_argument("--dataset", help="overrides the spec's dataset")
+    parser.add_argument("--output", help="overrides the spec's output folder")
+    parser.add_argument("--instrument", metavar="JSON", help="writes broker instrumentation here")
+    parser.add_argument("--render-cache", metavar="DIR", default=RENDER_CACHE_DIR,
+                        help="shared render cache folder, default %(default)s")
+    parser.add_argument("--no-render-cache", action="store_true", help="always render")
+    parser.add_argument("--column-cache", metavar="DIR", nargs="?", const=COLUMN_CACHE_DIR,
+                        help="memory-map particle columns from this folder, default %(const)s")
+    parser.add_argument("--off-axis-workers", metavar="N", type=int, default=1,
+                        help="processes per off-axis projection, default %(default)s")
+    args = parser.parse_args(argv)
+
+    with open(args.spec) as f:
+        spec = json.load(f)
+    if args.dataset is not None:
+        spec["dataset"] = args.dataset
+    if args.output is not None:
+        spec["output"] = args.output
+
+    render_cache = None if args.no_render_cache else RenderCache(args.render_cache)
+    if args.column_cache is not None:
+        use_column_cache(ColumnCache(args.column_cache))
+    off_axis = OffAxisPool(args.off_axis_workers) if args.off_axis_workers > 1 else None
+    try:
+        for path in run(spec, args.instrument, render_cache, off_axis):
+            print(path)
+    finally:
+        if off_axis is not None:
+            off_axis.shutdown()
+    if render_cache is not None:
+        stats = render_cache.stats()
+        print(f"render cache: {stats['hits']} hits, {stats['misses']} misses", file=sys.stderr)
+    if args.column_cache is not None:
+        stats = column_cache().stats()
+        print(f"column cache: {stats['hits']} hits, {stats['misses']} misses", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,29 @@
 from PySide6 import QtWidgets
 from components.window import YtWindow
+from backend.column_cache import COLUMN_CACHE_DIR, ColumnCache, use_column_cache
+from backend.render_cache import RENDER_CACHE_DIR, RenderCache
+import argparse
 import sys
 
 if __name__ == "__main__":
-    app = QtWidgets.QApplication([])
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--instrument", action="store_true",
+                        help="record broker activity & show it in a debug tab")
+    parser.add_argument("--render-cache", metavar="DIR", default=RENDER_CACHE_DIR,
+                        help="shared render cache folder, default %(default)s")
+    parser.add_argument("--no-render-cache", action="store_true", help="always render")
+    parser.add_argument("--column-cache", metavar="DIR", nargs="?", const=COLUMN_CACHE_DIR,
+                        help="memory-map particle columns from this folder, default %(const)s")
+    parser.add_argument("--off-axis-workers", metavar="N", type=int, default=1,
+                        help="processes per off-axis projection, default %(default)s")
+    args, qt_args = parser.parse_known_args()
+    if args.column_cache is not None:
+        use_column_cache(ColumnCache(args.column_cache))
+    app = QtWidgets.QApplication(sys.argv[:1] + qt_args)
 
-    ytw = YtWindow()
+    render_cache = None if args.no_render_cache else RenderCache(args.render_cache)
+    ytw = YtWindow(instrument=args.instrument, off_axis_workers=args.off_axis_workers,
+                   render_cache=render_cache)
     ytw.resize(600,600)
     ytw.show()
 
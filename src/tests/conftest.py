@@ -0,0 +1,45 @@
+import os
+import sys
+
+# the backend is imported from src, the way main.py & headless.py run
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pytest
+import yt
+
+@pytest.fixture(scope="session")
+def grid_path(tmp_path_factory) -> str:
+    """
+    A small uniform grid dataset saved to a file, with an ("grid", "density")
+    field, for code that needs datasets loaded from disk.
+    """
+    rng = np.random.default_rng(0)
+    ds = yt.load_uniform_grid({"density": (rng.random((16, 16, 16)) + 0.1, "g/cm**3")}, (16, 16, 16))
+    grid = ds.covering_grid(0, ds.domain_left_edge, ds.domain_dimensions)
+    return grid.save_as_dataset(str(tmp_path_factory.mktemp("grid") / "grid.h5"), fields=[("gas", "density")])
+
+@pytest.fixture(scope="session")
+def particle_path(tmp_path_factory) -> str:
+    """
+    1000 random "io" particles with positions & masses, saved to a file.
+    """
+    rng = np.random.default_rng(0)
+    n = 1000
+    ds = yt.load_particles({
+        "particle_position_x": rng.random(n),
+        "particle_position_y": rng.random(n),
+        "particle_position_z": rng.random(n),
+        "particle_mass": np.ones(n),
+    })
+    fields = [("io", f"particle_position_{ax}") for ax in "xyz"] + [("io", "particle_mass")]
+    return ds.all_data().save_as_dataset(str(tmp_path_factory.mktemp("particles") / "particles.h5"), fields=fields)
+
+@pytest.fixture(scope="session")
+def qapp():
+    """
+    QApplication for widget tests, without a display.
+    """
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    QtWidgets = pytest.importorskip("PySide6.QtWidgets")
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
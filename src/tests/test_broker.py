@@ -0,0 +1,83 @@
+from backend.info_handling import *
+from backend.options import *
+
+class Recorder(Subscriber):
+    def __init__(self, broker: EventBroker, topics: list[V3Option], log: list):
+        super().__init__(broker)
+        self.log = log
+        self.subscribe(topics)
+
+    def handle_update(self, name: V3Option):
+        self.log.append((self, name, self.query(name)))
+
+def test_publish_reaches_subscribers_in_order():
+    broker = EventBroker()
+    log = list()
+    first = Recorder(broker, [PlotOption.WIDTH], log)
+    second = Recorder(broker, [PlotOption.WIDTH, PlotOption.CENTER], log)
+    broker.publish(PlotOption.WIDTH, 3)
+    broker.publish(PlotOption.CENTER, [0, 0, 0])
+    broker.publish(PlotOption.ORIGIN, "domain")
+    assert log == [(first, PlotOption.WIDTH, 3), (second, PlotOption.WIDTH, 3),
+                   (second, PlotOption.CENTER, [0, 0, 0])]
+
+def test_subscribing_twice_notifies_once():
+    broker = EventBroker()
+    log = list()
+    recorder = Recorder(broker, [PlotOption.WIDTH], log)
+    recorder.subscribe([PlotOption.WIDTH])
+    broker.publish(PlotOption.WIDTH, 3)
+    assert len(log) == 1
+
+def test_none_is_not_published():
+    broker = EventBroker()
+    log = list()
+    Recorder(broker, [PlotOption.WIDTH], log)
+    broker.publish(PlotOption.WIDTH, None)
+    assert log == []
+
+def test_actions_are_consumed_by_queries():
+    broker = EventBroker()
+    Publisher(broker).add_field(UserAction.ZOOM)
+    Publisher(broker).add_field(PlotOption.FONT_SIZE)
+    broker.publish(UserAction.ZOOM, 2.0)
+    broker.publish(PlotOption.FONT_SIZE, 12)
+    assert broker.query(UserAction.ZOOM) == 2.0
+    assert broker.query(UserAction.ZOOM) == 1.0
+    assert broker.query(PlotOption.FONT_SIZE) == 12
+    assert broker.query(PlotOption.FONT_SIZE) == 12
+
+def test_topics_subscribed_before_declaration_get_their_default():
+    broker = EventBroker()
+    Recorder(broker, [PlotOption.FONT_SIZE], list())
+    assert broker.query(PlotOption.FONT_SIZE) is None
+    Publisher(broker).add_field(PlotOption.FONT_SIZE)
+    assert broker.query(PlotOption.FONT_SIZE) == 18
+    # the first declaration wins
+    broker.add_field(PlotOption.FONT_SIZE, None, 10, False)
+    assert broker.query(PlotOption.FONT_SIZE) == 18
+
+def test_handlers_may_subscribe_while_notified():
+    broker = EventBroker()
+    log = list()
+
+    class Subscribing(Recorder):
+        def handle_update(self, name: V3Option):
+            super().handle_update(name)
+            if len(log) == 1:
+                Recorder(broker, [PlotOption.WIDTH], log)
+
+    Subscribing(broker, [PlotOption.WIDTH], log)
+    broker.publish(PlotOption.WIDTH, 3)
+    broker.publish(PlotOption.WIDTH, 4)
+    assert [data for _, _, data in log][-2:] == [4, 4]
+
+def test_pane_brokers_share_only_shared_topics():
+    parent = EventBroker()
+    pane = PaneBroker(parent)
+    log = list()
+    recorder = Recorder(pane, [PlotOption.DATASET, PlotOption.WIDTH], log)
+    parent.publish(PlotOption.DATASET, "ds")
+    parent.publish(PlotOption.WIDTH, 3)
+    assert log == [(recorder, PlotOption.DATASET, "ds")]
+    assert pane.query(PlotOption.WIDTH) is None
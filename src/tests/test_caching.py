@@ -0,0 +1,41 @@
+from backend.caching import LRUCache
+
+def test_least_recently_used_is_evicted_first():
+    cache = LRUCache(3, lambda value: value)
+    cache.put("a", 1)
+    cache.put("b", 1)
+    cache.put("c", 1)
+    cache.get("a")
+    cache.put("d", 1)
+    assert "b" not in cache
+    assert all(key in cache for key in "acd")
+    assert cache.nbytes == 3
+
+def test_values_bigger_than_the_budget_are_not_stored():
+    cache = LRUCache(3, lambda value: value)
+    cache.put("a", 1)
+    cache.put("big", 4)
+    assert "big" not in cache
+    assert "a" in cache
+
+def test_replacing_a_value_updates_its_size():
+    cache = LRUCache(10, lambda value: value)
+    cache.put("a", 4)
+    cache.put("a", 2)
+    assert cache.nbytes == 2
+    assert len(cache) == 1
+
+def test_max_entries_without_byte_budget():
+    cache = LRUCache(None, max_entries=2)
+    for key in "abc":
+        cache.put(key, key)
+    assert list(key for key in "abc" if key in cache) == ["b", "c"]
+
+def test_get_or_create_only_creates_on_a_miss():
+    cache = LRUCache(None)
+    calls = list()
+    create = lambda: calls.append(1) or "value"
+    assert cache.get_or_create("a", create) == "value"
+    assert cache.get_or_create("a", create) == "value"
+    assert len(calls) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
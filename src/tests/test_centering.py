@@ -0,0 +1,47 @@
+from backend.centering import find_center, particle_center
+from backend.column_cache import ColumnCache, use_column_cache
+from backend.options import CenterMethodOption
+
+import numpy as np
+import pytest
+import yt
+
+def positions(ds) -> np.ndarray:
+    ad = ds.all_data()
+    return np.stack([ad["io", f"particle_position_{ax}"].to("code_length").d for ax in "xyz"], axis=1)
+
+def test_streamed_center_is_the_mean(particle_path):
+    ds = yt.load(particle_path)
+    np.testing.assert_allclose(particle_center(ds, "io"), positions(ds).mean(axis=0))
+
+def test_weighted_center_is_the_weighted_mean():
+    rng = np.random.default_rng(1)
+    n = 1000
+    ds = yt.load_particles({
+        **{f"particle_position_{ax}": rng.random(n) for ax in "xyz"},
+        "particle_mass": rng.random(n),
+    })
+    expected = np.average(positions(ds), axis=0, weights=ds.all_data()["io", "particle_mass"].d)
+    assert not np.allclose(expected, positions(ds).mean(axis=0))
+    np.testing.assert_allclose(particle_center(ds, "io", weight="particle_mass"), expected)
+
+def test_subsampled_center_uses_every_stride_th_particle(particle_path):
+    ds = yt.load(particle_path)
+    chunks = list(ds.all_data().chunks([], "io"))
+    assert len(chunks) == 1
+    np.testing.assert_allclose(particle_center(ds, "io", stride=4), positions(ds)[::4].mean(axis=0))
+
+def test_column_cache_gives_the_same_center(particle_path, tmp_path):
+    ds = yt.load(particle_path)
+    expected = particle_center(ds, "io")
+    use_column_cache(ColumnCache(str(tmp_path)))
+    try:
+        np.testing.assert_allclose(particle_center(ds, "io"), expected)
+    finally:
+        use_column_cache(None)
+
+def test_no_stars_centers_on_the_domain(particle_path):
+    ds = yt.load(particle_path)
+    for method in CenterMethodOption:
+        if method is not CenterMethodOption.MAX_DENSITY:
+            np.testing.assert_array_equal(find_center(ds, method), ds.domain_center.to("code_length").d)
@@ -0,0 +1,70 @@
+from backend.column_cache import ColumnCache, SnapshotColumns
+
+import numpy as np
+import os
+import shutil
+import yt
+
+POSITIONS = [("io", f"particle_position_{ax}") for ax in "xyz"]
+
+def counted(cache: ColumnCache, ds) -> tuple[SnapshotColumns, list]:
+    """
+    SnapshotColumns recording every read yt makes.
+    """
+    columns = SnapshotColumns(cache, ds)
+    reads = list()
+    get_data = columns.dd.get_data
+    columns.dd.get_data = lambda fields=None: (reads.append(fields), get_data(fields))[1]
+    return columns, reads
+
+def read_all(columns: SnapshotColumns) -> list[np.ndarray]:
+    columns.get_data(POSITIONS)
+    return [columns[field].d.copy() for field in POSITIONS]
+
+def test_columns_are_read_once_then_cached(particle_path, tmp_path):
+    ds = yt.load(particle_path)
+    cache = ColumnCache(str(tmp_path))
+    columns, reads = counted(cache, ds)
+    first = read_all(columns)
+    assert len(reads) == 1
+    assert (cache.hits, cache.misses) == (0, 3)
+
+    columns, reads = counted(cache, ds)
+    second = read_all(columns)
+    assert reads == []
+    assert (cache.hits, cache.misses) == (3, 3)
+    for a, b in zip(first, second):
+        np.testing.assert_array_equal(a, b)
+
+def test_oversized_columns_are_not_stored(particle_path, tmp_path):
+    ds = yt.load(particle_path)
+    cache = ColumnCache(str(tmp_path), max_bytes=100)
+    columns, reads = counted(cache, ds)
+    values = read_all(columns)
+    assert len(reads) == 1
+    assert cache.stats()["entries"] == 0
+    np.testing.assert_array_equal(values[0], ds.all_data()[POSITIONS[0]].d)
+
+def test_column_just_written_is_kept(particle_path, tmp_path):
+    ds = yt.load(particle_path)
+    # room for a single column
+    cache = ColumnCache(str(tmp_path), max_bytes=8000 + 200)
+    columns, reads = counted(cache, ds)
+    read_all(columns)
+    assert len(reads) == 1
+    assert cache.stats()["entries"] == 1
+
+def test_rewritten_snapshot_invalidates_its_columns(particle_path, tmp_path):
+    path = str(tmp_path / "particles.h5")
+    shutil.copy(particle_path, path)
+    cache = ColumnCache(str(tmp_path / "cache"))
+    read_all(SnapshotColumns(cache, yt.load(path)))
+    read_all(SnapshotColumns(cache, yt.load(path)))
+    assert (cache.hits, cache.misses) == (3, 3)
+
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+    columns, reads = counted(cache, yt.load(path))
+    read_all(columns)
+    assert len(reads) == 1
+    assert (cache.hits, cache.misses) == (3, 6)
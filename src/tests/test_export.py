@@ -0,0 +1,49 @@
+from backend.export import FRAME_NAME, export_frames
+from backend.options import *
+
+import os
+
+SPEC = {
+    "plot_type": PlotTypeOption.SLICE_PLOT,
+    "args": ("z", ("grid", "density")),
+    "params": dict(),
+    "region": None,
+    "mode": RenderModeOption.INTERACTIVE,
+    "cell_fields": None,
+    "epf": None,
+}
+
+def test_failing_frame_does_not_stop_the_export(grid_path, tmp_path):
+    paths = [str(tmp_path / "missing"), grid_path]
+    progress = list()
+    frames = export_frames(SPEC, paths, str(tmp_path / "out"), workers=1,
+                           progress=lambda *args: progress.append(args))
+    assert frames == [str(tmp_path / "out" / FRAME_NAME.format(1))]
+    assert os.path.exists(frames[0])
+    assert progress[-1] == (2, 2, 1)
+
+def test_resumed_export_skips_frames_on_disk(grid_path, tmp_path):
+    out_dir = str(tmp_path / "out")
+    frames = export_frames(SPEC, [grid_path, grid_path], out_dir, workers=1)
+    assert len(frames) == 2
+    stamps = [os.stat(frame).st_mtime_ns for frame in frames]
+    os.remove(frames[1])
+    progress = list()
+    assert export_frames(SPEC, [grid_path, grid_path], out_dir, workers=1,
+                         progress=lambda *args: progress.append(args)) == frames
+    assert progress[0] == (1, 2, 0)
+    assert os.stat(frames[0]).st_mtime_ns == stamps[0]
+
+def test_export_of_another_spec_starts_over(grid_path, tmp_path):
+    out_dir = str(tmp_path / "out")
+    frames = export_frames(SPEC, [grid_path], out_dir, workers=1)
+    progress = list()
+    spec = {**SPEC, "args": ("x", ("grid", "density"))}
+    assert export_frames(spec, [grid_path], out_dir, workers=1,
+                         progress=lambda *args: progress.append(args)) == frames
+    assert progress[0] == (0, 1, 0)
+
+def test_cancelled_export_returns_no_frames(grid_path, tmp_path):
+    out_dir = str(tmp_path / "out")
+    assert export_frames(SPEC, [grid_path], out_dir, workers=1, cancelled=lambda: True) == []
+    assert not os.path.exists(os.path.join(out_dir, FRAME_NAME.format(0)))
@@ -0,0 +1,42 @@
+from backend.fields import field_groups, requested_parameters
+from backend.info_handling import *
+from backend.options import *
+
+import pytest
+from yt.testing import fake_random_ds
+
+@pytest.fixture(scope="module")
+def ds():
+    return fake_random_ds(8)
+
+def test_fields_are_grouped_by_type_and_sorted(ds):
+    groups = field_groups(ds)
+    assert set(groups) == {ftype for ftype, _ in ds.derived_field_list}
+    for ftype, fields in groups.items():
+        assert all(field[0] == ftype for field in fields)
+        assert fields == sorted(fields)
+    assert field_groups(ds) is groups
+
+def test_requested_parameters_follow_dependencies(ds):
+    assert "center" in requested_parameters(ds, [("index", "radius")])
+    assert "center" not in requested_parameters(ds, [("gas", "density")])
+    assert "center" in requested_parameters(ds, [("gas", "density")], ("index", "radius"))
+
+def test_pickers_keep_their_field_across_datasets(qapp):
+    from PySide6.QtWidgets import QComboBox
+    from components.ui import FieldListModel
+
+    broker = EventBroker()
+    model = FieldListModel(broker)
+    box, calls = QComboBox(), list()
+    model.attach(box, lambda: calls.append(box.currentData()))
+    model.set_groups({"gas": [("gas", "density"), ("gas", "temperature")]})
+    # headers can't be picked
+    assert box.currentData() == ("gas", "density")
+    box.setCurrentIndex(box.findData(("gas", "temperature")))
+    calls.clear()
+
+    model.set_groups({"gas": [("gas", "pressure"), ("gas", "temperature")]})
+    assert box.currentData() == ("gas", "temperature") and calls == []
+    model.set_groups({"gas": [("gas", "pressure")]})
+    assert calls == [("gas", "pressure")]
@@ -0,0 +1,51 @@
+from backend.options import *
+from headless import IMAGE_NAME, HeadlessSession, main, resolve_topic, resolve_value
+
+import json
+import matplotlib.image
+import pytest
+
+OPTIONS = {
+    "CELL_FIELDS": [],
+    "EPF": [],
+    "PLOT_TYPE": "SLICE_PLOT",
+    "SliceProjPlotOption.FIELDS": "('grid', 'density')",
+    "RENDER_MODE": "INTERACTIVE",
+}
+
+@pytest.mark.parametrize("options", [
+    {"SliceProjPlotOption.FIELDS": "[('grid', 'density'), ('gas', 'density'), ('index', 'x')]"},
+    {"PROGRESSIVE": True},
+], ids=["multi-field", "progressive"])
+def test_only_final_images_are_written(tmp_path, grid_path, options):
+    session = HeadlessSession(str(tmp_path))
+    written = session.run({
+        "options": {**OPTIONS, **options},
+        "dataset": grid_path,
+        "actions": [("CREATE_PLOT", True), ("ZOOM", 2), ("FLIP_HORIZONTAL", True)],
+    })
+    assert len(written) == 3
+    final = matplotlib.image.imread(written[-1])
+    assert final.shape[:2] == matplotlib.image.imread(written[0]).shape[:2]
+    # nothing left blank for fields still to come
+    assert final[..., 3].min() == 1.0
+
+def test_topics_and_values_are_resolved():
+    assert resolve_topic("ZOOM") is UserAction.ZOOM
+    assert resolve_topic("SliceProjPlotOption.FIELDS") is SliceProjPlotOption.FIELDS
+    with pytest.raises(KeyError):
+        resolve_topic("PlotOption.ZOOM")
+    assert resolve_value(PlotOption.PLOT_TYPE, "PROJECTION_PLOT") is PlotTypeOption.PROJECTION_PLOT
+    assert resolve_value(PlotOption.WIDTH, "(10, 'kpc')") == (10, "kpc")
+    assert resolve_value(PlotOption.SAVE_TO, "out.png") == "out.png"
+
+def test_main_runs_a_spec(tmp_path, grid_path, capsys):
+    spec = tmp_path / "spec.json"
+    spec.write_text(json.dumps({
+        "options": OPTIONS,
+        "actions": [["CREATE_PLOT", True], ["SAVE_PLOT", str(tmp_path / "saved.png")]],
+    }))
+    out_dir = tmp_path / "frames"
+    assert main([str(spec), "--dataset", grid_path, "--output", str(out_dir), "--no-render-cache"]) == 0
+    assert capsys.readouterr().out.split() == [str(out_dir / IMAGE_NAME.format(0))]
+    assert (tmp_path / "saved.png").exists()
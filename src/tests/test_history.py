@@ -0,0 +1,36 @@
+from backend.history import THUMBNAIL_SIZE, PlotHistory, thumbnail
+
+import numpy as np
+
+def image(size: int = 200) -> np.ndarray:
+    return np.zeros((size, size, 4), dtype=np.uint8)
+
+def view(zoom: float, **layout) -> dict:
+    return {"plot": 1, "xlim": (0, 1 / zoom), "ylim": (0, 1 / zoom), **layout}
+
+def test_thumbnails_fit_the_size():
+    small = thumbnail(np.zeros((300, 150, 4), dtype=np.uint8))
+    assert max(small.shape[:2]) <= THUMBNAIL_SIZE and small.flags["C_CONTIGUOUS"]
+    assert thumbnail(image(50)).shape == (50, 50, 4)
+
+def test_oldest_full_images_are_dropped_first():
+    budget = 2 * image().nbytes + 3 * thumbnail(image()).nbytes
+    history = PlotHistory(max_bytes=budget)
+    for zoom in (1, 2, 3):
+        assert history.add(view(zoom), image())
+    assert history[0].image is None
+    assert history[1].image is not None and history[2].image is not None
+    assert all(entry.thumbnail is not None for entry in history)
+    assert history.nbytes <= budget
+
+def test_entries_beyond_the_length_are_dropped():
+    history = PlotHistory(max_entries=2)
+    for zoom in (1, 2, 3):
+        history.add(view(zoom), image())
+    assert [entry.view["xlim"][1] for entry in history] == [1 / 2, 1 / 3]
+
+def test_new_layout_of_the_same_view_replaces_it():
+    history = PlotHistory()
+    history.add(view(1, grid=(1, 1)), image(20))
+    assert not history.add(view(1, grid=(1, 2)), image())
+    assert len(history) == 1 and history[0].image.shape == image().shape
@@ -0,0 +1,72 @@
+from backend.instrumentation import HISTOGRAM_BUCKETS, HandlerStats
+from backend.info_handling import *
+from backend.options import *
+
+class Counter(Subscriber):
+    def __init__(self, broker: EventBroker):
+        super().__init__(broker)
+        self.subscribe([UserAction.ZOOM])
+
+def test_handlers_of_each_pane_are_kept_apart():
+    broker = EventBroker()
+    instrumentation = broker.instrument()
+    pane = PaneBroker(broker, label="view 2")
+    Counter(broker)
+    Counter(pane)
+    broker.publish(UserAction.ZOOM, 2)
+    pane.publish(UserAction.ZOOM, 2)
+    pane.publish(UserAction.ZOOM, 2)
+    handlers = instrumentation.as_dict()["handlers"]
+    assert handlers["Counter"]["UserAction.ZOOM"]["count"] == 1
+    assert handlers["Counter [view 2]"]["UserAction.ZOOM"]["count"] == 2
+
+class Relay(Subscriber, Publisher):
+    """
+    Publishes the zoom on as the width, like handlers publishing results.
+    """
+    def __init__(self, broker: EventBroker):
+        super().__init__(broker)
+        self.subscribe([UserAction.ZOOM])
+
+    def handle_update(self, name: V3Option):
+        self.publish(PlotOption.WIDTH, self.query(name))
+
+def test_publishes_and_chains_are_counted():
+    broker = EventBroker()
+    instrumentation = broker.instrument()
+    Relay(broker)
+    Counter(broker)
+    broker.publish(UserAction.ZOOM, 2)
+    broker.publish(UserAction.ZOOM, 2)
+    broker.publish(PlotOption.WIDTH, 3)
+    stats = instrumentation.as_dict()
+    assert stats["publishes"] == {"PlotOption.WIDTH": 3, "UserAction.ZOOM": 2}
+    assert stats["chains"] == [{"chain": ["UserAction.ZOOM", "PlotOption.WIDTH"], "count": 2}]
+    relay = stats["handlers"]["Relay"]["UserAction.ZOOM"]
+    assert relay["count"] == 2 and sum(relay["histogram_us"].values()) == 2
+
+def test_bound_callbacks_continue_the_chain():
+    broker = EventBroker()
+    instrumentation = broker.instrument()
+    later = list()
+
+    class Submitter(Subscriber):
+        def __init__(self, broker: EventBroker):
+            super().__init__(broker)
+            self.subscribe([UserAction.CREATE_PLOT])
+
+        def handle_update(self, name: V3Option):
+            later.append(self.broker.bind(lambda: self.broker.publish(Data.IMAGE, "image")))
+
+    Submitter(broker)
+    broker.publish(UserAction.CREATE_PLOT, True)
+    later[0]()
+    assert instrumentation.chains == {("UserAction.CREATE_PLOT", "Data.IMAGE"): 1}
+
+def test_latencies_are_bucketed_by_powers_of_two():
+    stats = HandlerStats()
+    for ns in (500, 1_500, 3_000, 10 ** 15):
+        stats.add(ns)
+    assert stats.buckets[:3] == [1, 1, 1]
+    assert stats.buckets[-1] == 1
+    assert stats.as_dict()["histogram_us"] == {"<1": 1, "<2": 1, "<4": 1, f"<{1 << (HISTOGRAM_BUCKETS - 1)}": 1}
@@ -0,0 +1,74 @@
+from backend.info_handling import *
+from backend.loading import LOAD_FAILED, LOAD_STAGES, DatasetRegistry
+from backend.options import *
+from headless import HeadlessSession
+
+import pytest
+
+def test_failed_load_publishes_failure(tmp_path):
+    session = HeadlessSession(str(tmp_path))
+    missing = str(tmp_path / "missing")
+    with pytest.raises(RuntimeError, match="missing"):
+        session.run({"dataset": missing})
+    done, total, description = session.broker.query(Data.LOAD_PROGRESS)
+    assert (done, total) == (LOAD_FAILED, len(LOAD_STAGES))
+    assert description.startswith(f"could not load {missing}")
+
+class ProgressRecorder(Subscriber):
+    def __init__(self, broker: EventBroker):
+        super().__init__(broker)
+        self.progress = list()
+        self.subscribe([Data.LOAD_PROGRESS])
+
+    def handle_update(self, name: V3Option):
+        self.progress.append(self.query(name))
+
+def test_load_reports_each_stage(tmp_path, grid_path):
+    session = HeadlessSession(str(tmp_path))
+    recorder = ProgressRecorder(session.broker)
+    session.run({"options": {"CELL_FIELDS": [], "EPF": []}, "dataset": grid_path})
+    assert [done for done, _, _ in recorder.progress] == list(range(len(LOAD_STAGES) + 1))
+    assert [description for _, _, description in recorder.progress[1:]] == LOAD_STAGES
+    assert session.broker.query(Data.DATASET_CENTER) is not None
+
+def test_cancelled_load_publishes_no_dataset(tmp_path, grid_path):
+    session = HeadlessSession(str(tmp_path))
+    recorder = ProgressRecorder(session.broker)
+    for name, value in {"CELL_FIELDS": [], "EPF": []}.items():
+        session.apply(name, value)
+    # cancelled before the worker gets to it
+    session.publisher.apply("LOAD_DATASET", grid_path)
+    session.publisher.apply("CANCEL_LOAD", True)
+    session.run_pending()
+    assert session.broker.query(PlotOption.DATASET) is None
+    assert [done for done, _, _ in recorder.progress] == [0]
+
+def test_registry_reuses_datasets_per_field_configuration(grid_path):
+    registry = DatasetRegistry()
+    ds = registry.open(grid_path, [], [])
+    assert registry.open(grid_path, [], []) is ds
+    # another configuration is another dataset, even if yt is left to pick
+    # the fields of both
+    other = registry.open(grid_path, None, None)
+    assert other is not ds
+    assert registry.open(grid_path, None, None) is other
+    assert registry.stats()["hits"] == 2
+
+def test_registry_evicts_least_recently_used(grid_path, particle_path):
+    registry = DatasetRegistry(max_entries=2)
+    grid = registry.open(grid_path, [], [])
+    registry.open(particle_path, [], [])
+    registry.open(grid_path, [], [])
+    registry.open(grid_path, None, None)
+    assert registry.get(registry.key(grid_path, [], [])) is grid
+    assert registry.get(registry.key(particle_path, [], [])) is None
+
+def test_registered_dataset_skips_loading(tmp_path, grid_path):
+    session = HeadlessSession(str(tmp_path))
+    session.run({"options": {"CELL_FIELDS": [], "EPF": []}, "dataset": grid_path})
+    ds = session.broker.query(PlotOption.DATASET)
+    recorder = ProgressRecorder(session.broker)
+    session.apply("LOAD_DATASET", grid_path)
+    assert session.broker.query(PlotOption.DATASET) is ds
+    # straight past the header
+    assert [done for done, _, _ in recorder.progress] == [0, 2, 3, 4]
@@ -0,0 +1,90 @@
+from backend.offaxis import OffAxisPool, ParallelOffAxisProjectionPlot, slab_bounds
+from backend.options import PlotTypeOption, RegionOption
+from backend.plot_management import build_projection_plot
+
+import numpy as np
+import pytest
+import yt
+from yt.testing import fake_random_ds
+
+ORIGIN = np.zeros(3)
+CELL = np.full(3, 0.125)
+
+def test_slabs_split_the_longest_axis_on_cell_edges():
+    left, right = np.array([0.1, 0.0, 0.0]), np.array([0.9, 0.5, 0.5])
+    slabs = slab_bounds(left, right, 3, ORIGIN, CELL)
+    assert len(slabs) == 3
+    for slab_left, slab_right in slabs:
+        np.testing.assert_array_equal(slab_left[1:], left[1:])
+        np.testing.assert_array_equal(slab_right[1:], right[1:])
+        for edge in (slab_left[0], slab_right[0]):
+            assert np.isclose(edge / CELL[0], round(edge / CELL[0]))
+    # contiguous, & covering every cell the box touches
+    for (_, previous), (following, _) in zip(slabs[:-1], slabs[1:]):
+        assert previous[0] == following[0]
+    assert slabs[0][0][0] <= left[0] and slabs[-1][1][0] >= right[0]
+
+def test_no_more_slabs_than_cells():
+    left, right = np.zeros(3), np.array([0.25, 0.1, 0.1])
+    assert len(slab_bounds(left, right, 8, ORIGIN, CELL)) == 2
+
+# off-axis parallel projections against yt's serial ones
+NORMAL = (1, 1, 0.3)
+FIELD = ("gas", "density")
+BUFF_SIZE = (64, 64)
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = OffAxisPool(2, min_cells=0)
+    yield pool
+    pool.shutdown()
+
+@pytest.fixture(scope="module")
+def random_path(tmp_path_factory) -> str:
+    ds = fake_random_ds(16, fields=("density", "temperature"), units=("g/cm**3", "K"))
+    grid = ds.covering_grid(0, ds.domain_left_edge, ds.domain_dimensions)
+    return grid.save_as_dataset(str(tmp_path_factory.mktemp("random") / "random.h5"),
+                                fields=[("gas", "density"), ("gas", "temperature")])
+
+def serial_image(ds, field, **params) -> np.ndarray:
+    return yt.OffAxisProjectionPlot(ds, NORMAL, field, buff_size=BUFF_SIZE, **params).frb[field].d
+
+def parallel_image(pool, ds, field, **params) -> np.ndarray:
+    plot = ParallelOffAxisProjectionPlot(pool, ds, NORMAL, field, buff_size=BUFF_SIZE, **params)
+    return plot.frb[field].d
+
+@pytest.mark.parametrize("field, params", [
+    (FIELD, {}),
+    (("gas", "temperature"), {"weight_field": FIELD}),
+], ids=["unweighted", "weighted"])
+def test_parallel_projection_matches_serial(pool, random_path, field, params):
+    ds = yt.load(random_path)
+    expected = serial_image(ds, field, **params)
+    image = parallel_image(pool, ds, field, **params)
+    assert pool._pool is not None
+    assert np.any(expected != 0)
+    np.testing.assert_allclose(image, expected, rtol=1e-6, atol=1e-12 * np.abs(expected).max())
+
+def test_parallel_projection_of_region_matches_serial(pool, random_path):
+    ds = yt.load(random_path)
+    region = {"shape": RegionOption.SPHERE, "size": (0.3,), "unit": "code_length"}
+    center = [0.5, 0.5, 0.5]
+    expected = serial_image(ds, FIELD, center=center, data_source=ds.sphere(center, 0.3))
+    image = parallel_image(pool, ds, FIELD, center=center, region=region, region_center=center)
+    np.testing.assert_allclose(image, expected, rtol=1e-6, atol=1e-12 * np.abs(expected).max())
+
+def test_datasets_without_a_file_are_projected_serially():
+    ds = fake_random_ds(16, fields=("density", "temperature"), units=("g/cm**3", "K"))
+    pool = OffAxisPool(2, min_cells=0)
+    image = parallel_image(pool, ds, ("gas", "temperature"), weight_field=FIELD)
+    assert pool._pool is None
+    np.testing.assert_array_equal(image, serial_image(ds, ("gas", "temperature"), weight_field=FIELD))
+
+def test_small_datasets_stay_serial(random_path):
+    ds = yt.load(random_path)
+    request = {"plot_type": PlotTypeOption.PROJECTION_PLOT, "args": (ds, NORMAL, FIELD),
+               "params": {"buff_size": BUFF_SIZE}, "region": None}
+    plot = build_projection_plot(request, None, OffAxisPool(2))
+    assert not isinstance(plot, ParallelOffAxisProjectionPlot)
+    plot = build_projection_plot(request, None, OffAxisPool(2, min_cells=16 ** 3))
+    assert isinstance(plot, ParallelOffAxisProjectionPlot)
@@ -0,0 +1,87 @@
+from backend.caching import LRUCache
+from backend.info_handling import *
+from backend.options import *
+from backend.plot_management import PROJECTION_CACHE_BYTES, PlotMaker, PlotManager, ViewLink, projection_size
+from backend.workers import InlineWorker, Worker
+from headless import HeadlessSession, SpecPublisher
+
+import numpy as np
+import queue
+import yt
+
+OPTIONS = {
+    "CELL_FIELDS": [],
+    "EPF": [],
+    "PLOT_TYPE": "PROJECTION_PLOT",
+    "SliceProjPlotOption.FIELDS": "('grid', 'density')",
+    "RENDER_MODE": "INTERACTIVE",
+}
+
+class Images(Subscriber):
+    def __init__(self, broker: EventBroker):
+        super().__init__(broker)
+        self.images: list[np.ndarray] = list()
+        self.subscribe([Data.IMAGE])
+
+    def handle_update(self, name: V3Option):
+        self.images.append(self.query(name))
+
+def reference(grid_path: str, tmp_path) -> list[np.ndarray]:
+    session = HeadlessSession(str(tmp_path))
+    images = Images(session.broker)
+    session.run({"options": OPTIONS, "dataset": grid_path, "actions": [("CREATE_PLOT", True), ("ZOOM", 2)]})
+    return images.images
+
+def test_linked_panes_render_one_dataset_concurrently(grid_path, tmp_path):
+    expected = reference(grid_path, tmp_path)
+    # results of both render workers, run here like on the GUI thread
+    results: "queue.Queue[Callable[[], None]]" = queue.Queue()
+    broker = EventBroker()
+    link = ViewLink()
+    projections = LRUCache(PROJECTION_CACHE_BYTES, projection_size)
+    panes = list()
+    for index in range(2):
+        pane = broker if index == 0 else PaneBroker(broker, label=f"view {index + 1}")
+        worker = Worker(results.put, f"render-worker-{index}", pane.bind)
+        publisher = SpecPublisher(pane)
+        for name, value in OPTIONS.items():
+            publisher.apply(name, value)
+        PlotMaker(pane, worker, projections=projections)
+        PlotManager(pane, worker, debounce=0, link=link)
+        link.set_linked(pane, True)
+        panes.append((pane, publisher, Images(pane)))
+
+    ds = yt.load(grid_path)
+    broker.publish(PlotOption.CENTER, ds.domain_center.to("code_length").d)
+    broker.publish(PlotOption.DATASET, ds)
+    for pane, publisher, _ in panes:
+        publisher.apply("CREATE_PLOT", True)
+    while any(len(images.images) < 1 for _, _, images in panes):
+        results.get(timeout=60)()
+    # relayed to the other pane, both re-render at once
+    panes[0][1].apply("ZOOM", 2)
+    while any(len(images.images) < 2 for _, _, images in panes):
+        results.get(timeout=60)()
+
+    for _, _, images in panes:
+        for image, reference_image in zip(images.images, expected):
+            np.testing.assert_array_equal(image, reference_image)
+
+def test_each_pane_keeps_its_own_center():
+    broker = EventBroker()
+    pane = PaneBroker(broker)
+    for b in (broker, pane):
+        PlotMaker(b, InlineWorker())
+    broker.publish(Data.DATASET_CENTER, (0.5, 0.5, 0.5))
+    assert pane.query(PlotOption.CENTER) == (0.5, 0.5, 0.5)
+
+    # e.g. restoring a view of the first pane
+    broker.publish(PlotOption.CENTER, (0.25, 0.5, 0.5))
+    assert pane.query(PlotOption.CENTER) == (0.5, 0.5, 0.5)
+
+    later = PaneBroker(broker)
+    PlotMaker(later, InlineWorker())
+    assert later.query(PlotOption.CENTER) == (0.5, 0.5, 0.5)
+
+    broker.publish(Data.DATASET_CENTER, (0.1, 0.1, 0.1))
+    assert broker.query(PlotOption.CENTER) == pane.query(PlotOption.CENTER) == (0.1, 0.1, 0.1)
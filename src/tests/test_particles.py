@@ -0,0 +1,53 @@
+from backend.particles import ParticleColumns, deposit, particle_plot
+
+import numpy as np
+import pytest
+import yt
+
+MASS = ("io", "particle_mass")
+
+def test_ngp_adds_each_particle_to_its_pixel():
+    px = np.array([0.1, 0.15, 0.9])
+    py = np.array([0.1, 0.1, 0.6])
+    buff, hits = deposit(px, py, np.array([1.0, 2.0, 4.0]), (2, 4), "ngp")
+    expected = np.zeros((2, 4))
+    expected[0, 0] = 3.0
+    expected[1, 3] = 4.0
+    np.testing.assert_array_equal(buff, expected)
+    np.testing.assert_array_equal(hits, expected > 0)
+
+def test_cic_shares_between_nearest_pixel_centers():
+    # halfway between the centers of the four middle pixels
+    buff, hits = deposit(np.array([0.5]), np.array([0.5]), np.array([4.0]), (4, 4), "cic")
+    np.testing.assert_allclose(buff[1:3, 1:3], 1.0)
+    assert buff.sum() == pytest.approx(4.0)
+    assert hits.sum() == 4
+
+def test_cic_drops_shares_outside_the_image():
+    buff, _ = deposit(np.array([0.0]), np.array([0.0]), np.array([4.0]), (4, 4), "cic")
+    assert buff.sum() == pytest.approx(1.0)
+
+def test_unknown_deposition_raises():
+    with pytest.raises(ValueError):
+        deposit(np.zeros(1), np.zeros(1), np.ones(1), (2, 2), "sph")
+
+def test_periodic_window_wraps_around_the_domain():
+    positions = np.array([[0.05, 0.5, 0.95], [0.5, 0.5, 0.5], [0.5, 0.5, 0.5]], dtype="float32")
+    column = ParticleColumns(None, positions, np.ones(3, dtype="float32"), None, "g", 0)
+    bounds = (0.8, 1.2, 0.3, 0.7)
+    np.testing.assert_array_equal(column.window(bounds, (0.0, 1.0), 1, 2), [2])
+    np.testing.assert_array_equal(column.window(bounds, (0.0, 1.0), 1, 2, (1.0, 1.0)), [0, 2])
+
+def test_window_across_the_domain_edge_matches_yt():
+    rng = np.random.default_rng(0)
+    n = 2000
+    ds = yt.load_particles({
+        "particle_position_x": rng.random(n),
+        "particle_position_y": rng.random(n),
+        "particle_position_z": rng.random(n),
+        "particle_mass": np.ones(n),
+    }, periodicity=(True, True, True))
+    params = {"center": [0.95, 0.9, 0.5], "width": (0.4, 0.4)}
+    plot = particle_plot(ds, ("io", "particle_position_x"), ("io", "particle_position_y"), z_fields=MASS, **params)
+    reference = yt.ParticleProjectionPlot(ds, "z", MASS, **params)
+    np.testing.assert_allclose(np.nan_to_num(plot.frb[MASS].d), np.nan_to_num(reference.frb[MASS].d))
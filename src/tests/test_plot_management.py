@@ -0,0 +1,99 @@
+from backend import plot_management
+from backend.options import *
+from headless import HeadlessSession
+
+import numpy as np
+import pytest
+
+OPTIONS = {
+    "CELL_FIELDS": [],
+    "EPF": [],
+    "PLOT_TYPE": "SLICE_PLOT",
+    "SliceProjPlotOption.FIELDS": "('grid', 'density')",
+    "RENDER_MODE": "INTERACTIVE",
+}
+
+@pytest.fixture
+def session(tmp_path, grid_path) -> HeadlessSession:
+    s = HeadlessSession(str(tmp_path))
+    s.run({"options": OPTIONS, "dataset": grid_path})
+    return s
+
+def width(view) -> float:
+    return view["xlim"][1] - view["xlim"][0]
+
+def test_restoring_an_earlier_plot_makes_it_current(session):
+    session.apply("CREATE_PLOT", True)
+    session.apply("ZOOM", 2)
+    earlier = session.broker.query(Data.VIEW)
+    session.apply("SliceProjPlotOption.NORMAL", "x")
+    session.apply("CREATE_PLOT", True)
+    assert session.broker.query(Data.VIEW)["plot"] != earlier["plot"]
+
+    session.apply("SET_VIEW", {"view": earlier, "render": False})
+    session.apply("ZOOM", 2)
+    view = session.broker.query(Data.VIEW)
+    assert view["plot"] == earlier["plot"]
+    assert np.isclose(width(view), width(earlier) / 2)
+    assert np.isclose(sum(view["xlim"]) / 2, sum(earlier["xlim"]) / 2)
+
+def test_restored_view_is_written_to_options(session):
+    session.apply("SliceProjPlotOption.NORMAL", "z")
+    session.apply("CREATE_PLOT", True)
+    session.apply("PAN_REL_X", 0.25)
+    session.apply("ZOOM", 4)
+    restored = session.broker.query(Data.VIEW)
+    session.apply("ZOOM", 0.5)
+    session.apply("SET_VIEW", {"view": restored, "render": True})
+
+    (w, unit), (h, _) = session.broker.query(PlotOption.WIDTH)
+    assert unit == "code_length"
+    assert np.isclose(w, width(restored))
+    center = session.broker.query(PlotOption.CENTER)
+    # a slice along z, its plane is x & y
+    assert np.allclose(center[:2], [sum(restored["xlim"]) / 2, sum(restored["ylim"]) / 2])
+
+def test_forgotten_plot_shows_the_current_one(session, monkeypatch):
+    monkeypatch.setattr(plot_management, "RECENT_PLOTS", 1)
+    session.apply("CREATE_PLOT", True)
+    forgotten = session.broker.query(Data.VIEW)
+    session.apply("SliceProjPlotOption.NORMAL", "y")
+    session.apply("CREATE_PLOT", True)
+    current = session.broker.query(Data.VIEW)
+
+    images = len(session.writer.written)
+    session.apply("SET_VIEW", {"view": forgotten, "render": False})
+    assert session.broker.query(Data.VIEW)["plot"] == current["plot"]
+    assert len(session.writer.written) == images + 1
+
+def test_view_change_scales_relative_pans_by_earlier_zooms():
+    change = plot_management.ViewChange()
+    change.add(UserAction.PAN_X, 1.0)
+    change.add(UserAction.ZOOM, 2.0)
+    change.add(UserAction.PAN_REL_X, 0.5)
+    change.add(UserAction.ZOOM, 2.0)
+    change.add(UserAction.ZOOM, 0)
+    assert change.edits() == [
+        (UserAction.PAN_X, 1.0), (UserAction.PAN_Y, 0.0),
+        (UserAction.PAN_REL_X, 0.25), (UserAction.PAN_REL_Y, 0.0),
+        (UserAction.ZOOM, 4.0),
+    ]
+
+def test_empty_view_change_has_no_edits():
+    change = plot_management.ViewChange()
+    change.add(UserAction.ZOOM, 1.0)
+    assert change.edits() == []
+
+@pytest.mark.parametrize("mode", ["ANNOTATED", "INTERACTIVE"])
+def test_image_is_published_as_rgba_array(tmp_path, grid_path, monkeypatch, mode):
+    monkeypatch.chdir(tmp_path)
+    s = HeadlessSession(str(tmp_path / "out"))
+    s.run({"options": {**OPTIONS, "RENDER_MODE": mode, "BUFF_SIZE": (64, 48)}, "dataset": grid_path,
+           "actions": [("CREATE_PLOT", True)]})
+    image = s.broker.query(Data.IMAGE)
+    assert isinstance(image, np.ndarray) and image.dtype == np.uint8
+    assert image.ndim == 3 and image.shape[2] == 4 and image.flags["C_CONTIGUOUS"]
+    if mode == "INTERACTIVE":
+        assert image.shape[:2] == (48, 64)
+    # nothing goes through a file
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["out"]
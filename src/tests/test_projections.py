@@ -0,0 +1,80 @@
+from backend.caching import LRUCache
+from backend.options import PlotTypeOption
+from backend.plot_management import build_projection_plot
+from backend.tiles import TilePyramid, source_key
+
+import numpy as np
+import pytest
+import yt
+from yt.testing import fake_random_ds
+
+@pytest.fixture(scope="module")
+def ds():
+    return fake_random_ds(16, fields=("density", "velocity_x", "velocity_y", "velocity_z"),
+                          units=("g/cm**3", "cm/s", "cm/s", "cm/s"), negative=(False, True, True, True))
+
+def request(ds, field, center, **params):
+    return {
+        "plot_type": PlotTypeOption.PROJECTION_PLOT,
+        "args": (ds, "z", field),
+        "params": {"center": center, "width": (0.5, "code_length"), **params},
+    }
+
+def image(plot, field):
+    return plot.frb[field].d
+
+def test_center_dependent_field_is_projected_about_the_plot_center(ds):
+    field = ("gas", "radial_velocity")
+    center = [0.3, 0.6, 0.4]
+    projections = LRUCache(None)
+    cached = build_projection_plot(request(ds, field, center), projections)
+    assert np.allclose(cached.data_source.center.to_value("code_length"), center)
+    assert np.allclose(image(cached, field), image(yt.ProjectionPlot(ds, "z", field, center=center,
+                                                                     width=(0.5, "code_length")), field))
+
+def test_recentered_plot_reprojects_center_dependent_fields(ds):
+    field = ("gas", "radial_velocity")
+    projections = LRUCache(None)
+    build_projection_plot(request(ds, field, [0.3, 0.6, 0.4]), projections)
+    build_projection_plot(request(ds, field, [0.6, 0.3, 0.4]), projections)
+    assert len(projections) == 2
+
+def test_recentered_plot_shares_other_projections(ds):
+    field = ("gas", "density")
+    projections = LRUCache(None)
+    build_projection_plot(request(ds, field, [0.3, 0.6, 0.4]), projections)
+    build_projection_plot(request(ds, field, [0.6, 0.3, 0.4]), projections)
+    assert len(projections) == 1
+
+def test_proj_parameters_reach_the_projection(ds):
+    field = ("gas", "density")
+    projections = LRUCache(None)
+    plot = build_projection_plot(request(ds, field, [0.5, 0.5, 0.5], method="max"), projections)
+    assert plot.data_source.method == "max"
+    build_projection_plot(request(ds, field, [0.5, 0.5, 0.5]), projections)
+    assert len(projections) == 2
+
+def slice_plot(ds, field, center):
+    return yt.SlicePlot(ds, "z", field, center=center, width=(0.5, "code_length"))
+
+def test_recentered_plot_retiles_center_dependent_fields(ds):
+    field = ("gas", "radial_velocity")
+    tiles = TilePyramid()
+    tiles.composite(slice_plot(ds, field, [0.3, 0.6, 0.4]), field)
+    second = slice_plot(ds, field, [0.4, 0.5, 0.4])
+    np.testing.assert_allclose(tiles.composite(second, field), TilePyramid().composite(second, field),
+                               equal_nan=True)
+
+def test_recentered_plot_shares_other_tiles(ds):
+    field = ("gas", "density")
+    first = slice_plot(ds, field, [0.3, 0.6, 0.4])
+    second = slice_plot(ds, field, [0.4, 0.5, 0.4])
+    assert source_key(first, field) == source_key(second, field)
+
+def test_projection_parameters_are_keyed(ds):
+    field = ("gas", "density")
+    projections = LRUCache(None)
+    plots = [build_projection_plot(request(ds, field, [0.5, 0.5, 0.5], **params), projections)
+             for params in ({"weight_field": field}, {"weight_field": field, "moment": 2},
+                            {"method": "max"})]
+    assert len({source_key(plot, field) for plot in plots}) == 3
@@ -0,0 +1,22 @@
+from backend.options import RegionOption
+from backend.regions import build_region
+
+import numpy as np
+import pytest
+from yt.testing import fake_random_ds
+
+@pytest.fixture(scope="module")
+def ds():
+    return fake_random_ds(16)
+
+def test_ellipsoid_keeps_its_semi_axes(ds):
+    region = {"shape": RegionOption.ELLIPSOID, "size": (0.3, 0.2, 0.1), "unit": "code_length", "normal": "y"}
+    ellipsoid = build_region(ds, region, [0.5, 0.5, 0.5])
+    assert [float(r) for r in (ellipsoid._A, ellipsoid._B, ellipsoid._C)] == pytest.approx([0.3, 0.2, 0.1])
+    np.testing.assert_allclose(ellipsoid._e0, [0, 1, 0])
+
+@pytest.mark.parametrize("size", [(0.1, 0.2, 0.3), (0.3, 0.1, 0.2), (0.3, 0.2)])
+def test_ellipsoid_rejects_other_sizes(ds, size):
+    region = {"shape": RegionOption.ELLIPSOID, "size": size, "unit": "code_length", "normal": "z"}
+    with pytest.raises(ValueError, match="semi-axes"):
+        build_region(ds, region, [0.5, 0.5, 0.5])
@@ -0,0 +1,69 @@
+from backend import plot_management
+from backend.options import *
+from backend.plot_management import DeferredPlot
+from backend.render_cache import RenderCache
+from headless import HeadlessSession
+
+import numpy as np
+import yt
+
+OPTIONS = {
+    "CELL_FIELDS": [],
+    "EPF": [],
+    "PLOT_TYPE": "PROJECTION_PLOT",
+    "SliceProjPlotOption.FIELDS": "('grid', 'density')",
+    "RENDER_MODE": "INTERACTIVE",
+}
+
+def session(tmp_path, cache: RenderCache) -> HeadlessSession:
+    s = HeadlessSession(str(tmp_path / "out"), render_cache=cache)
+    s.run({"options": OPTIONS})
+    return s
+
+def test_view_is_stored_with_image(tmp_path):
+    cache = RenderCache(str(tmp_path / "cache"))
+    view = {"plot": 3, "xlim": (0.0, 1.0), "grid": (1, 2), "swap_axes": False}
+    cache.put("key", np.zeros((2, 2, 4), dtype="uint8"), view)
+    image, stored = cache.get("key")
+    assert image.shape == (2, 2, 4)
+    assert stored == {"xlim": (0.0, 1.0), "grid": (1, 2), "swap_axes": False}
+    assert cache.get("missing") is None
+
+def test_hit_defers_building_until_edited(tmp_path, grid_path, monkeypatch):
+    cache = RenderCache(str(tmp_path / "cache"))
+    first = session(tmp_path, cache)
+    first.run({"dataset": grid_path, "actions": [["CREATE_PLOT", True]]})
+    rendered_view = first.broker.query(Data.VIEW)
+
+    builds = list()
+    build_plot = plot_management.build_plot
+    monkeypatch.setattr(plot_management, "build_plot", lambda *args: builds.append(1) or build_plot(*args))
+    views = list()
+    second = session(tmp_path, cache)
+    second.broker.subscribe(type("Views", (), {"notify": lambda self, name: views.append(second.broker.query(name))})(),
+                            [Data.VIEW])
+    second.run({"dataset": grid_path, "actions": [["CREATE_PLOT", True]]})
+
+    assert cache.hits == 1
+    assert builds == []
+    assert isinstance(second.broker.query(Data.PLOT), DeferredPlot)
+    assert len(views) == 1
+    assert {k: v for k, v in views[0].items() if k != "plot"} == \
+        {k: v for k, v in rendered_view.items() if k != "plot"}
+
+    second.apply("ZOOM", 2)
+    assert len(builds) == 1
+    (x0, x1) = second.broker.query(Data.VIEW)["xlim"]
+    assert np.isclose(x1 - x0, (rendered_view["xlim"][1] - rendered_view["xlim"][0]) / 2)
+    assert len(second.writer.written) == 2
+
+def test_key_follows_field_configuration(tmp_path, grid_path):
+    cache = RenderCache(str(tmp_path / "cache"))
+    keys = list()
+    for epf in (None, [("particle_birth_time", "d")]):
+        ds = yt.load(grid_path)
+        ds._extra_particle_fields = epf
+        request = {"plot_type": PlotTypeOption.SLICE_PLOT, "args": (ds, "z", ("grid", "density")), "params": dict()}
+        keys.append(cache.key(request, RenderModeOption.INTERACTIVE))
+    assert keys[0] is not None
+    assert keys[0] != keys[1]
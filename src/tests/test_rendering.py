@@ -0,0 +1,127 @@
+from backend.options import RenderModeOption
+from backend.rendering import PREVIEW_FACTORS, ProgressiveRenderer, grid_shape, resolve_norm, rgba_as
+
+from matplotlib.colors import LogNorm, SymLogNorm
+import numpy as np
+import pytest
+import yt
+from yt.testing import fake_random_ds
+
+@pytest.fixture(scope="module")
+def ds():
+    return fake_random_ds(16, fields=("density", "velocity_x"), units=("g/cm**3", "cm/s"),
+                          negative=(False, True))
+
+def plot_norm(plot, field):
+    handler = plot.plots[field].norm_handler
+    return handler, plot.frb[field].d
+
+def test_positive_field_is_log(ds):
+    plot = yt.SlicePlot(ds, "z", ("gas", "density"))
+    handler, values = plot_norm(plot, ("gas", "density"))
+    assert type(resolve_norm(handler, values)) is LogNorm
+
+def test_signed_field_follows_yt(ds):
+    field = ("gas", "velocity_x")
+    plot = yt.SlicePlot(ds, "z", field)
+    handler, values = plot_norm(plot, field)
+    assert (values < 0).any()
+    norm = resolve_norm(handler, values)
+    assert type(norm) is type(handler.get_norm(plot.frb[field]))
+    assert not isinstance(norm, LogNorm)
+
+def test_signed_values_of_log_field_are_symlog(ds):
+    plot = yt.SlicePlot(ds, "z", ("gas", "density"))
+    handler, values = plot_norm(plot, ("gas", "density"))
+    assert type(resolve_norm(handler, values - values.mean())) is SymLogNorm
+
+@pytest.mark.parametrize("mode", [RenderModeOption.INTERACTIVE, RenderModeOption.TILED])
+def test_signed_field_has_no_transparent_pixels(ds, mode):
+    plot = yt.SlicePlot(ds, "z", ("gas", "velocity_x"))
+    rgba = rgba_as(plot, mode)
+    assert (rgba[..., 3] > 0).all()
+
+def test_linear_norm_type_is_kept(ds):
+    field = ("gas", "velocity_x")
+    plot = yt.SlicePlot(ds, "z", field)
+    plot.set_log(field, False)
+    handler, values = plot_norm(plot, field)
+    norm = resolve_norm(handler, values)
+    assert not isinstance(norm, (LogNorm, SymLogNorm))
+    assert norm.vmin == pytest.approx(values.min())
+
+class FakeJob:
+    def __init__(self, stale_after: int = -1):
+        self.checks = 0
+        self.stale_after = stale_after
+
+    def stale(self) -> bool:
+        self.checks += 1
+        return self.stale_after >= 0 and self.checks > self.stale_after
+
+def test_preview_comes_before_the_full_image(ds):
+    plot = yt.SlicePlot(ds, "z", ("gas", "density"), buff_size=(64, 64))
+    renderer = ProgressiveRenderer(budget=float("inf"))
+    factor = PREVIEW_FACTORS[renderer.level]
+    previews = list()
+    image = renderer.render(FakeJob(), plot, RenderModeOption.INTERACTIVE, previews.append)
+    assert [preview.shape[:2] for preview in previews] == [(64 // factor, 64 // factor)]
+    assert image.shape[:2] == (64, 64)
+    assert tuple(plot.buff_size) == (64, 64)
+    np.testing.assert_array_equal(image, rgba_as(plot, RenderModeOption.INTERACTIVE))
+
+def test_stale_job_stops_after_the_preview(ds):
+    plot = yt.SlicePlot(ds, "z", ("gas", "density"), buff_size=(64, 64))
+    previews = list()
+    assert ProgressiveRenderer().render(FakeJob(0), plot, RenderModeOption.INTERACTIVE, previews.append) is None
+    assert len(previews) == 1
+
+def test_preview_resolution_follows_its_time():
+    renderer = ProgressiveRenderer(budget=1.0)
+    level = renderer.level
+    renderer.adapt(2.0)
+    assert renderer.level == level + 1
+    renderer.adapt(0.5)
+    assert renderer.level == level + 1
+    renderer.adapt(0.1)
+    renderer.adapt(0.1)
+    assert renderer.level == 0
+    for _ in PREVIEW_FACTORS:
+        renderer.adapt(2.0)
+    assert renderer.level == len(PREVIEW_FACTORS) - 1
+
+FIELDS = [("gas", "density"), ("gas", "velocity_x"), ("gas", "temperature")]
+
+@pytest.fixture(scope="module")
+def ds3():
+    return fake_random_ds(16, fields=("density", "velocity_x", "temperature"), units=("g/cm**3", "cm/s", "K"),
+                          negative=(False, True, False))
+
+def test_fields_fill_a_near_square_grid():
+    assert [grid_shape(count) for count in (1, 2, 3, 4, 5)] == [(1, 1), (1, 2), (2, 2), (2, 2), (2, 3)]
+
+def test_fields_are_read_in_one_selection(ds3):
+    plot = yt.SlicePlot(ds3, "z", FIELDS, buff_size=(32, 32))
+    # as after the slice moved
+    for field in FIELDS:
+        del plot.data_source.field_data[field]
+    reads = list()
+    get_data = plot.data_source.get_data
+    plot.data_source.get_data = lambda fields=None: (reads.append(fields), get_data(fields))[1]
+    image = rgba_as(plot, RenderModeOption.INTERACTIVE)
+    assert reads[0] == FIELDS
+    assert image.shape == (64, 64, 4)
+    for index, field in enumerate(FIELDS):
+        row, column = divmod(index, 2)
+        single = rgba_as(yt.SlicePlot(ds3, "z", field, buff_size=(32, 32)), RenderModeOption.INTERACTIVE)
+        np.testing.assert_array_equal(image[row * 32:(row + 1) * 32, column * 32:(column + 1) * 32], single)
+    # the empty cell
+    assert not image[32:, 32:].any()
+
+def test_partial_grids_leave_fields_to_come_blank(ds3):
+    plot = yt.SlicePlot(ds3, "z", FIELDS, buff_size=(32, 32))
+    partials = list()
+    image = rgba_as(plot, RenderModeOption.INTERACTIVE, on_partial=partials.append)
+    assert len(partials) == len(FIELDS) - 1
+    np.testing.assert_array_equal(partials[0][:32, :32], image[:32, :32])
+    assert not partials[0][:32, 32:].any() and not partials[1][32:, :32].any()
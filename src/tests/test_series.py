@@ -0,0 +1,65 @@
+from backend import loading
+from backend.options import *
+from headless import HeadlessSession
+
+import numpy as np
+import os
+import pytest
+import yt
+
+OPTIONS = {
+    "CELL_FIELDS": [],
+    "EPF": [],
+    "PLOT_TYPE": "SLICE_PLOT",
+    "SliceProjPlotOption.FIELDS": "('grid', 'density')",
+    "RENDER_MODE": "INTERACTIVE",
+}
+
+@pytest.fixture(scope="module")
+def series_path(tmp_path_factory) -> str:
+    """
+    Three outputs of a uniform grid, the density of the i-th is i + 1.
+    """
+    folder = tmp_path_factory.mktemp("series")
+    for i in range(3):
+        ds = yt.load_uniform_grid({"density": (np.full((8, 8, 8), i + 1.0), "g/cm**3")}, (8, 8, 8))
+        grid = ds.covering_grid(0, ds.domain_left_edge, ds.domain_dimensions)
+        grid.save_as_dataset(str(folder / f"output_{i:05d}.h5"), fields=[("gas", "density")])
+    return str(folder)
+
+@pytest.fixture
+def session(tmp_path, series_path, monkeypatch) -> HeadlessSession:
+    # yt only recognises saved datasets by their extension
+    monkeypatch.setattr(loading, "SERIES_PATTERN", "output_?????.h5")
+    s = HeadlessSession(str(tmp_path))
+    s.run({"options": OPTIONS, "actions": [("LOAD_SERIES", series_path)]})
+    return s
+
+def density(session: HeadlessSession) -> float:
+    return float(session.broker.query(PlotOption.DATASET).r[:]["grid", "density"].max())
+
+def test_series_opens_its_first_output(session):
+    assert len(session.broker.query(Data.SERIES)) == 3
+    assert session.broker.query(Data.SERIES_POSITION) == (0, 3)
+    assert density(session) == 1.0
+
+def test_stepping_swaps_the_dataset_and_replots(session):
+    session.apply("CREATE_PLOT", True)
+    plot = session.broker.query(Data.PLOT)
+    session.apply("STEP_SERIES", 1)
+    assert session.broker.query(Data.SERIES_POSITION) == (1, 3)
+    assert density(session) == 2.0
+    assert session.broker.query(Data.PLOT) is not plot
+    assert session.broker.query(Data.PLOT).ds.parameter_filename.endswith("output_00001.h5")
+    # clamped to the last output
+    session.apply("STEP_SERIES", 5)
+    assert session.broker.query(Data.SERIES_POSITION) == (2, 3)
+
+def test_neighbours_are_prefetched_and_prerendered(session):
+    session.apply("CREATE_PLOT", True)
+    prefetched = session.broker.query(Data.PREFETCHED)
+    assert os.path.basename(prefetched.parameter_filename) == "output_00001.h5"
+    assert len(session.plot_maker.prerendered) == 1
+    session.apply("STEP_SERIES", 1)
+    # the prefetched dataset is the one stepped to
+    assert session.broker.query(PlotOption.DATASET) is prefetched
@@ -0,0 +1,72 @@
+import pytest
+
+pytest.importorskip("PySide6")
+
+from PySide6.QtCore import QEvent, QPoint, QPointF, Qt
+from PySide6.QtGui import QMouseEvent, QPixmap, QWheelEvent
+
+from components.ui import WHEEL_ZOOM, ImageViewport
+
+import numpy as np
+
+VIEW = {"plot": 1, "xlim": (0.0, 1.0), "ylim": (0.0, 1.0)}
+
+@pytest.fixture
+def viewport(qapp):
+    viewport = ImageViewport()
+    viewport.resize(100, 100)
+    pixmap = QPixmap(100, 100)
+    pixmap.fill()
+    viewport.show_image(pixmap, VIEW)
+    settled = list()
+    viewport.settled.connect(settled.append)
+    viewport.settled_edits = settled
+    return viewport
+
+def mouse(kind: QEvent.Type, x: float, y: float) -> QMouseEvent:
+    buttons = Qt.MouseButton.NoButton if kind is QEvent.Type.MouseButtonRelease else Qt.MouseButton.LeftButton
+    return QMouseEvent(kind, QPointF(x, y), QPointF(x, y), Qt.MouseButton.LeftButton, buttons,
+                       Qt.KeyboardModifier.NoModifier)
+
+def drag(viewport: ImageViewport, start: tuple[float, float], end: tuple[float, float]):
+    viewport.mousePressEvent(mouse(QEvent.Type.MouseButtonPress, *start))
+    viewport.mouseMoveEvent(mouse(QEvent.Type.MouseMove, *end))
+    viewport.mouseReleaseEvent(mouse(QEvent.Type.MouseButtonRelease, *end))
+
+def wheel(viewport: ImageViewport, x: float, y: float, steps: int):
+    viewport.wheelEvent(QWheelEvent(QPointF(x, y), QPointF(x, y), QPoint(), QPoint(0, 120 * steps),
+                                    Qt.MouseButton.NoButton, Qt.KeyboardModifier.NoModifier,
+                                    Qt.ScrollPhase.NoScrollPhase, False))
+
+def test_dragged_point_follows_the_cursor(viewport):
+    drag(viewport, (50, 50), (75, 40))
+    # dragging the data right & up shows what is left of & below it
+    np.testing.assert_allclose(viewport.target, ((-0.25, 0.75), (-0.1, 0.9)))
+    [edit] = viewport.settled_edits
+    assert edit["pan_rel"] == pytest.approx((-0.25, -0.1))
+    assert edit["zoom"] == pytest.approx(1.0)
+
+def test_flipped_image_pans_the_other_way(viewport):
+    viewport.show_image(viewport.pixmap, {**VIEW, "flip_horizontal": True}, reset=True)
+    drag(viewport, (50, 50), (75, 50))
+    assert viewport.settled_edits[0]["pan_rel"] == pytest.approx((0.25, 0.0))
+
+def test_wheel_zooms_about_the_cursor(viewport):
+    wheel(viewport, 25, 50, 1)
+    (x0, x1), (y0, y1) = viewport.target
+    assert x1 - x0 == pytest.approx(1 / WHEEL_ZOOM)
+    # the point under the cursor stays under it
+    assert x0 + 0.25 * (x1 - x0) == pytest.approx(0.25)
+    assert viewport.settled_edits == []
+    viewport.settle()
+    [edit] = viewport.settled_edits
+    assert edit["zoom"] == pytest.approx(WHEEL_ZOOM)
+
+def test_target_is_kept_until_its_image_arrives(viewport):
+    drag(viewport, (50, 50), (75, 50))
+    target = viewport.target
+    # an image rendered before the pan was sent
+    viewport.show_image(viewport.pixmap, {**VIEW, "xlim": (0.1, 1.1)})
+    assert viewport.target == target
+    viewport.show_image(viewport.pixmap, {**VIEW, "xlim": target[0], "ylim": target[1]})
+    assert viewport.target == target and viewport.sent_at is None
@@ -0,0 +1,100 @@
+from backend.workers import InlineWorker, Worker
+
+import queue
+import threading
+
+def test_newer_job_of_same_kind_supersedes():
+    worker = InlineWorker()
+    results = list()
+    worker.submit(lambda job: results.append(("first", job.stale())))
+    worker.submit(lambda job: results.append(("second", job.stale())))
+    worker.run_pending()
+    assert results == [("first", True), ("second", False)]
+
+def test_other_kinds_do_not_supersede():
+    worker = InlineWorker()
+    results = list()
+    worker.submit(lambda job: results.append(("load", job.stale())), kind="load")
+    worker.submit(lambda job: results.append(("center", job.stale())), kind="center")
+    worker.run_pending()
+    assert results == [("load", False), ("center", False)]
+
+def test_cancel_marks_every_kind_stale():
+    worker = InlineWorker()
+    results = list()
+    worker.submit(lambda job: results.append(job.stale()), kind="load")
+    worker.submit(lambda job: results.append(job.stale()), kind="center")
+    worker.cancel()
+    worker.submit(lambda job: results.append(job.stale()), kind="load")
+    worker.run_pending()
+    assert results == [True, True, False]
+
+def test_idle_jobs_wait_for_the_others():
+    worker = InlineWorker()
+    order = list()
+    worker.submit(lambda job: order.append(("idle", worker.busy())), kind="prerender", idle=True)
+    worker.submit(lambda job: order.append(("render", worker.busy())))
+    worker.submit(lambda job: order.append(("edit", worker.busy())), kind="edit")
+    worker.run_pending()
+    assert order == [("render", True), ("edit", False), ("idle", False)]
+
+def test_errors_reach_on_error():
+    worker = InlineWorker()
+    errors = list()
+    worker.submit(lambda job: 1 / 0, on_error=errors.append)
+    worker.run_pending()
+    assert [type(error) for error in errors] == [ZeroDivisionError]
+
+def test_errors_of_stale_jobs_are_dropped():
+    worker = InlineWorker()
+    errors = list()
+    worker.submit(lambda job: 1 / 0, on_error=errors.append)
+    worker.cancel()
+    worker.run_pending()
+    assert errors == []
+
+def test_pending_follows_jobs_queued_by_other_workers():
+    first, second = InlineWorker(), InlineWorker()
+    results = list()
+    first.submit(lambda job: "done",
+                 on_done=lambda result: second.submit(lambda job: results.append(result)))
+    assert first.pending() and not second.pending()
+    first.run_pending()
+    assert not first.pending() and second.pending()
+    second.run_pending()
+    assert results == ["done"] and not second.pending()
+
+def test_threaded_worker_delivers_through_dispatch():
+    delivered = queue.Queue()
+    worker = Worker(lambda callback: delivered.put(callback))
+    started, release = threading.Event(), threading.Event()
+
+    def first(job):
+        started.set()
+        release.wait(5)
+        return "first", job.stale()
+
+    worker.submit(first, on_done=lambda result: result)
+    started.wait(5)
+    # superseded while it runs, & while it waits
+    worker.submit(lambda job: ("second", job.stale()), on_done=lambda result: result)
+    worker.submit(lambda job: ("third", job.stale()), on_done=lambda result: result)
+    release.set()
+    results = [delivered.get(timeout=5)() for _ in range(3)]
+    assert results == [("first", True), ("second", True), ("third", False)]
+
+def test_threaded_worker_cancel_reaches_a_running_job():
+    delivered = queue.Queue()
+    worker = Worker(lambda callback: delivered.put(callback))
+    started, release = threading.Event(), threading.Event()
+
+    def task(job):
+        started.set()
+        release.wait(5)
+        return job.stale()
+
+    worker.submit(task, on_done=lambda stale: stale, kind="load")
+    started.wait(5)
+    worker.cancel()
+    release.set()
+    assert delivered.get(timeout=5)() is True